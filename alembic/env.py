@@ -5,6 +5,11 @@ from sqlalchemy import pool
 
 from alembic import context
 from app.models.user_model import Base  # adjust "myapp.models" to the actual location of your Base
+import app.models.notification_job_model  # noqa: F401 - registers the table on Base.metadata
+import app.models.archived_user_model  # noqa: F401 - registers the table on Base.metadata
+import app.models.scheduled_job_model  # noqa: F401 - registers the table on Base.metadata
+import app.models.user_stat_model  # noqa: F401 - registers the table on Base.metadata
+import app.models.idempotency_key_model  # noqa: F401 - registers the table on Base.metadata
 
 
 # this is the Alembic Config object, which provides
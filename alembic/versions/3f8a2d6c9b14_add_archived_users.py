@@ -0,0 +1,51 @@
+"""add archived users
+
+Revision ID: 3f8a2d6c9b14
+Revises: 7c1e4b9a2f60
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8a2d6c9b14'
+down_revision: Union[str, None] = '7c1e4b9a2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('archived_users',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('nickname', sa.String(length=50), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('first_name', sa.String(length=100), nullable=True),
+    sa.Column('last_name', sa.String(length=100), nullable=True),
+    sa.Column('bio', sa.String(length=500), nullable=True),
+    sa.Column('profile_picture_url', sa.String(length=255), nullable=True),
+    sa.Column('linkedin_profile_url', sa.String(length=255), nullable=True),
+    sa.Column('github_profile_url', sa.String(length=255), nullable=True),
+    # The enum type already exists; it was created with the users table.
+    sa.Column('role', postgresql.ENUM('ANONYMOUS', 'AUTHENTICATED', 'MANAGER', 'ADMIN', name='UserRole', create_type=False), nullable=False),
+    sa.Column('is_professional', sa.Boolean(), nullable=True),
+    sa.Column('professional_status_updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_login_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('failed_login_attempts', sa.Integer(), nullable=True),
+    sa.Column('is_locked', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('verification_token', sa.String(), nullable=True),
+    sa.Column('email_verified', sa.Boolean(), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('archived_users')
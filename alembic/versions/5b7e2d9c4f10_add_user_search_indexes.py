@@ -0,0 +1,42 @@
+"""add user search indexes
+
+Revision ID: 5b7e2d9c4f10
+Revises: c2a9f4e6d813
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2d9c4f10'
+down_revision: Union[str, None] = 'c2a9f4e6d813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Trigram GIN indexes behind GET /users/search (UserService.search); one per searched column so
+# each ILIKE / <% condition gets its own bitmap index scan.
+SEARCH_INDEXES = {
+    'ix_users_nickname_trgm': 'nickname',
+    'ix_users_first_name_trgm': 'first_name',
+    'ix_users_last_name_trgm': 'last_name',
+    'ix_users_email_trgm': 'email',
+}
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Built concurrently, outside the migration transaction, so writes to users are not blocked meanwhile.
+    with op.get_context().autocommit_block():
+        for name, column in SEARCH_INDEXES.items():
+            op.create_index(name, 'users', [column], unique=False, if_not_exists=True, postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    # The extension is left installed; other objects may depend on it.
+    with op.get_context().autocommit_block():
+        for name in SEARCH_INDEXES:
+            op.drop_index(name, table_name='users', if_exists=True, postgresql_concurrently=True)
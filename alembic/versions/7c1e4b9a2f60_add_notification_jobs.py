@@ -0,0 +1,42 @@
+"""add notification jobs
+
+Revision ID: 7c1e4b9a2f60
+Revises: 25d814bc83ed
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4b9a2f60'
+down_revision: Union[str, None] = '25d814bc83ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('email_type', sa.String(length=50), nullable=False),
+    sa.Column('filters', sa.JSON(), nullable=False),
+    sa.Column('context', sa.JSON(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'COMPLETED', 'FAILED', name='NotificationJobStatus', create_constraint=True), nullable=False),
+    sa.Column('last_user_id', sa.UUID(), nullable=True),
+    sa.Column('sent_count', sa.Integer(), nullable=False),
+    sa.Column('failed_count', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('notification_jobs')
+    sa.Enum(name='NotificationJobStatus').drop(op.get_bind(), checkfirst=True)
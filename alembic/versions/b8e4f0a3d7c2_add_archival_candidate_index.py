@@ -0,0 +1,32 @@
+"""add archival candidate index
+
+Revision ID: b8e4f0a3d7c2
+Revises: f1c3a8e5b720
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f0a3d7c2'
+down_revision: Union[str, None] = 'f1c3a8e5b720'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Partial index over the archival candidates only (anonymous, never verified), so finding and
+    # counting them does not scan users. Built concurrently, outside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_unverified_created_at', 'users', ['created_at'], unique=False, if_not_exists=True,
+                        postgresql_where=sa.text("role = 'ANONYMOUS' AND email_verified IS false"),
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_unverified_created_at', table_name='users', if_exists=True, postgresql_concurrently=True)
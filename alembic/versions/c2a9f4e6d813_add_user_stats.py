@@ -0,0 +1,47 @@
+"""add user stats
+
+Revision ID: c2a9f4e6d813
+Revises: 9d4e7b1c5a38
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a9f4e6d813'
+down_revision: Union[str, None] = '9d4e7b1c5a38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_stats',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Seed the counters from the existing users in one scan, with the names UserStatsService uses;
+    # from here on they are adjusted by the writes themselves and corrected by reconciliation.
+    op.execute("""
+        INSERT INTO user_stats (name, value)
+        SELECT name, count(*)
+        FROM users
+        CROSS JOIN LATERAL (VALUES
+            ('role:' || users.role::text),
+            (CASE WHEN users.email_verified THEN 'verified' ELSE 'unverified' END),
+            (CASE WHEN users.is_locked THEN 'locked' END),
+            (CASE WHEN users.is_professional THEN 'professional' END),
+            ('signups:' || to_char(users.created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD'))
+        ) AS counters (name)
+        WHERE name IS NOT NULL
+        GROUP BY name
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
@@ -0,0 +1,43 @@
+"""notify user changes
+
+Revision ID: e4b7c1d9a2f3
+Revises: 5b7e2d9c4f10
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7c1d9a2f3'
+down_revision: Union[str, None] = '5b7e2d9c4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NOTIFY user_changes with the user's id on every committed write, for the per-worker user
+    # caches (UserChangeListener). Identical notifications in one transaction are delivered once.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_user_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('user_changes', OLD.id::text);
+            ELSE
+                PERFORM pg_notify('user_changes', NEW.id::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER users_notify_change AFTER INSERT OR UPDATE OR DELETE ON users "
+        "FOR EACH ROW EXECUTE PROCEDURE notify_user_change()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS users_notify_change ON users")
+    op.execute("DROP FUNCTION IF EXISTS notify_user_change()")
@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from app.utils.query_stats import instrument_engine
 
 Base = declarative_base()
 
@@ -9,14 +10,30 @@ class Database:
     _session_factory = None
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
+    def initialize(cls, database_url: str, echo: bool = False, pool_size: int = 5, max_overflow: int = 10):
         """Initialize the async engine and sessionmaker."""
         if cls._engine is None:  # Ensure engine is created once
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
+            cls._engine = create_async_engine(database_url, echo=echo, future=True, pool_size=pool_size, max_overflow=max_overflow)
+            instrument_engine(cls._engine)
             cls._session_factory = sessionmaker(
                 bind=cls._engine, class_=AsyncSession, expire_on_commit=False, future=True
             )
 
+    @classmethod
+    async def dispose(cls):
+        """Close every pooled connection and forget the engine."""
+        if cls._engine is not None:
+            await cls._engine.dispose()
+            cls._engine = None
+            cls._session_factory = None
+
+    @classmethod
+    def get_engine(cls):
+        """Returns the engine, ensuring it's initialized."""
+        if cls._engine is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        return cls._engine
+
     @classmethod
     def get_session_factory(cls):
         """Returns the session factory, ensuring it's initialized."""
@@ -1,17 +1,20 @@
-from builtins import Exception, dict, str
-from fastapi import Depends, HTTPException
+from builtins import Exception, ValueError, dict, hasattr, str
+from typing import List
+from uuid import UUID
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import Database
+from app.models.user_model import User
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import decode_token
-from settings.config import Settings
+from settings.config import Settings, get_settings as get_cached_settings
 from fastapi import Depends
 
 def get_settings() -> Settings:
     """Return application settings."""
-    return Settings()
+    return get_cached_settings()
 
 def get_email_service() -> EmailService:
     template_manager = TemplateManager()
@@ -50,3 +53,52 @@ def require_role(role: str):
             raise HTTPException(status_code=403, detail="Operation not permitted")
         return current_user
     return role_checker
+
+async def get_current_user_model(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+    """
+    Resolve the full User behind the access token once per request and keep it on `request.state`.
+
+    Tokens carrying a `uid` claim are resolved by primary key; older tokens fall back to the
+    email stored in `sub`. The user is always read from the database, never the user cache, so
+    a user deleted, locked or demoted by another worker is refused at once: a deleted user gets
+    401 and a locked one 403.
+    """
+    if hasattr(request.state, "current_user"):
+        return request.state.current_user
+    # Imported here because user_service depends on this module.
+    from app.services.user_service import UserService
+
+    credentials_exception = HTTPException(
+        status_code=401,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = decode_token(token)
+    if payload is None:
+        raise credentials_exception
+    user = None
+    if payload.get("uid"):
+        try:
+            user = await UserService.get_by_id(db, UUID(payload["uid"]), fresh=True)
+        except ValueError:
+            raise credentials_exception
+    elif payload.get("sub"):
+        user = await UserService.get_by_email(db, payload["sub"], fresh=True)
+    if user is None:
+        raise credentials_exception
+    if user.is_locked:
+        raise HTTPException(status_code=403, detail="Account locked")
+    request.state.current_user = user
+    return user
+
+def require_current_role(roles: List[str]):
+    """
+    Like `require_role`, but checks the role stored on the resolved user rather than the token
+    claim, so a demoted user is refused before their token expires. No query is added because the
+    user is already loaded by `get_current_user_model`.
+    """
+    async def role_checker(current_user: User = Depends(get_current_user_model)):
+        if current_user.role.name not in roles:
+            raise HTTPException(status_code=403, detail="Operation not permitted")
+        return current_user
+    return role_checker
@@ -0,0 +1,143 @@
+"""
+Serving state of a worker process: start-up readiness, in-flight requests and shutdown drain.
+
+The lifespan handler in `app.main` marks the worker ready once warm-up finishes. The worker
+switches to draining the moment SIGTERM (or SIGINT) arrives, from a signal handler chained in
+front of the server's own: readiness fails and new requests, including ones on kept-alive
+connections, are refused with 503 while the server is still closing its sockets. The lifespan
+shutdown then gives in-flight requests and background notification jobs until the drain
+deadline to finish, and only then closes the database pools.
+"""
+from builtins import Exception, bool, callable, dict, float, int, max
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import functools
+import logging
+import signal
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Probes must keep answering while the worker drains, or the orchestrator cannot see it go.
+PROBE_PATHS = ("/healthz", "/readyz")
+# Signals that stop the worker, from Gunicorn (SIGTERM to each worker) or a terminal.
+DRAIN_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class Lifecycle:
+    """Readiness, drain state and the count of requests in flight for one worker."""
+
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._database_ok = False
+        self._database_checked_at: Optional[float] = None
+        self._check_lock = asyncio.Lock()
+        self._previous_handlers: Dict[int, Any] = {}
+
+    def request_started(self):
+        self.in_flight += 1
+        self._idle.clear()
+
+    def request_finished(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    def begin_drain(self):
+        """Stop reporting ready and refuse new requests."""
+        self.ready = False
+        self.draining = True
+
+    def install_signal_handlers(self):
+        """
+        Begin draining as soon as a stop signal arrives, then pass the signal on to the handler
+        it replaces (Uvicorn's, which makes the server stop). Call from the lifespan, after the
+        server has installed its handlers; only the main thread can set signal handlers.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for sig in DRAIN_SIGNALS:
+            previous = signal.getsignal(sig)
+            self._previous_handlers[sig] = previous
+            signal.signal(sig, functools.partial(self._on_signal, previous))
+
+    def restore_signal_handlers(self):
+        for sig, previous in self._previous_handlers.items():
+            signal.signal(sig, previous)
+        self._previous_handlers.clear()
+
+    def _on_signal(self, previous: Any, sig: int, frame: Any):
+        self.begin_drain()
+        if callable(previous):
+            previous(sig, frame)
+        elif previous == signal.SIG_DFL:
+            signal.signal(sig, signal.SIG_DFL)
+            signal.raise_signal(sig)
+
+    async def wait_for_requests(self, timeout: float) -> bool:
+        """Wait until no request is in flight. Returns False if some were still running at the deadline."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), max(timeout, 0))
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("%d request(s) still in flight at the drain deadline.", self.in_flight)
+            return False
+
+    async def check_database(self, engine: AsyncEngine, max_age: float, timeout: float) -> Tuple[bool, float]:
+        """
+        Check that the pool can hand out a working connection. Returns (ok, age of the result in seconds).
+
+        The result is reused for `max_age` seconds and concurrent probes share one check, so a
+        burst of readiness probes costs at most one round trip.
+        """
+        async with self._check_lock:
+            now = time.monotonic()
+            if self._database_checked_at is None or now - self._database_checked_at >= max_age:
+                try:
+                    await asyncio.wait_for(self._ping(engine), timeout)
+                    self._database_ok = True
+                except Exception as e:
+                    logger.warning("Readiness check could not reach the database: %r", e)
+                    self._database_ok = False
+                self._database_checked_at = now = time.monotonic()
+            return self._database_ok, now - self._database_checked_at
+
+    @staticmethod
+    async def _ping(engine: AsyncEngine):
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+
+class DrainMiddleware:
+    """Counts in-flight HTTP requests and answers 503 to new ones once the worker is draining."""
+
+    def __init__(self, app: ASGIApp, lifecycle: Lifecycle):
+        self.app = app
+        self.lifecycle = lifecycle
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in PROBE_PATHS:
+            await self.app(scope, receive, send)
+            return
+        if self.lifecycle.draining:
+            response = JSONResponse(
+                status_code=503,
+                content={"message": "Server is shutting down."},
+                headers={"Connection": "close", "Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        self.lifecycle.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.lifecycle.request_finished()
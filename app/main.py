@@ -1,42 +1,142 @@
-from builtins import Exception
+from builtins import AttributeError, Exception, str
+from contextlib import asynccontextmanager
+import logging
+import time
 from fastapi import FastAPI
 from starlette.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware  # Import the CORSMiddleware
-from app.database import Database
-from app.dependencies import get_settings
-from app.routers import user_routes
-from app.utils.api_description import getDescription
-app = FastAPI(
-    title="User Management",
-    description=getDescription(),
-    version="0.0.1",
-    contact={
-        "name": "API Support",
-        "url": "http://www.example.com/support",
-        "email": "support@example.com",
-    },
-    license_info={"name": "MIT", "url": "https://opensource.org/licenses/MIT"},
-)
-# CORS middleware configuration
-# This middleware will enable CORS and allow requests from any origin
-# It can be configured to allow specific methods, headers, and origins
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # List of origins that are allowed to access the server, ["*"] allows all
-    allow_credentials=True,  # Support credentials (cookies, authorization headers, etc.)
-    allow_methods=["*"],  # Allowed HTTP methods
-    allow_headers=["*"],  # Allowed HTTP headers
-)
-
-@app.on_event("startup")
-async def startup_event():
+
+logger = logging.getLogger(__name__)
+
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application.
+
+    Routers, services and their dependencies are imported here rather than at module level, so
+    importing `app.main` (or any module below it) does not pull in the whole application.
+    """
+    from app.database import Database
+    from app.dependencies import get_email_service, get_settings
+    from app.lifecycle import DrainMiddleware, Lifecycle
+    from app.routers import admin_routes, health_routes, notification_routes, trace_routes, user_routes
+    from app.scheduler import build_scheduler
+    from app.services.notification_service import NotificationService
+    from app.services.suggest_index import suggest_index
+    from app.services.user_changes import user_change_listener
+    from app.utils.api_description import getDescription
+    from app.utils.common import setup_logging
+    from app.utils.content_negotiation import ContentNegotiationMiddleware
+    from app.utils.idempotency import IdempotencyMiddleware, IdempotentReplay, replay_response
+    from app.utils.query_stats import QueryStatsMiddleware
+    from app.utils.structured_logging import CorrelationIdMiddleware
+    from app.utils.tracing import TracingMiddleware, build_tracer
+    from app.warmup import warm_up
+
+    setup_logging()
+    lifecycle = Lifecycle()
+    scheduler = build_scheduler(get_settings())
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Own the database engine and background jobs for the lifetime of the worker."""
+        settings = get_settings()
+        lifecycle.install_signal_handlers()
+        Database.initialize(settings.database_url, settings.debug, settings.db_pool_size, settings.db_max_overflow)
+        # Pick up fan-out jobs left pending or abandoned by a previous process.
+        try:
+            await NotificationService.resume_stale_jobs(get_email_service())
+        except Exception as e:
+            logger.error("Could not resume notification jobs: %s", e)
+        if settings.user_change_listener_enabled:
+            user_change_listener.start(Database.get_engine())
+        if settings.warmup_enabled:
+            await warm_up(app, Database.get_engine(), settings.warmup_db_connections, settings.warmup_timeout_seconds)
+        if settings.suggest_index_enabled:
+            try:
+                async with Database.get_session_factory()() as session:
+                    await suggest_index.rebuild(session)
+            except Exception as e:
+                # Suggestions are read from the database until the next scheduled rebuild succeeds.
+                logger.error("Could not build the suggest index: %s", e)
+        if settings.scheduler_enabled:
+            scheduler.start(Database.get_engine())
+        lifecycle.ready = True
+        yield
+        # The server has stopped accepting connections (SIGTERM; draining began in the signal
+        # handler already); finish what is running, then close pools.
+        lifecycle.begin_drain()
+        lifecycle.restore_signal_handlers()
+        deadline = time.monotonic() + settings.shutdown_drain_seconds
+        await scheduler.stop(deadline - time.monotonic())
+        await lifecycle.wait_for_requests(deadline - time.monotonic())
+        await NotificationService.drain(deadline - time.monotonic())
+        await user_change_listener.stop()
+        await Database.dispose()
+
+    app = FastAPI(
+        lifespan=lifespan,
+        title="User Management",
+        description=getDescription(),
+        version="0.0.1",
+        contact={
+            "name": "API Support",
+            "url": "http://www.example.com/support",
+            "email": "support@example.com",
+        },
+        license_info={"name": "MIT", "url": "https://opensource.org/licenses/MIT"},
+    )
+    app.state.lifecycle = lifecycle
+    app.state.scheduler = scheduler
+    app.state.tracer = build_tracer(get_settings())
+    # Innermost, so stored responses are the plain JSON the routes produced: CORS headers and
+    # content negotiation are applied afresh to each replay.
+    app.add_middleware(IdempotencyMiddleware, ttl_seconds=get_settings().idempotency_ttl_seconds)
+    # CORS middleware configuration
+    # This middleware will enable CORS and allow requests from any origin
+    # It can be configured to allow specific methods, headers, and origins
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # List of origins that are allowed to access the server, ["*"] allows all
+        allow_credentials=True,  # Support credentials (cookies, authorization headers, etc.)
+        allow_methods=["*"],  # Allowed HTTP methods
+        allow_headers=["*"],  # Allowed HTTP headers
+    )
+
     settings = get_settings()
-    Database.initialize(settings.database_url, settings.debug)
+    app.add_middleware(
+        ContentNegotiationMiddleware,
+        min_size=settings.compression_min_bytes,
+        offload_size=settings.encoding_offload_bytes,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        msgpack_enabled=settings.msgpack_enabled,
+    )
+    app.add_middleware(QueryStatsMiddleware, emit_headers=settings.debug)
+    app.add_middleware(TracingMiddleware, tracer=app.state.tracer)
+    app.add_middleware(DrainMiddleware, lifecycle=lifecycle)
+    # Added last so it runs first: everything logged while handling a request carries its ID.
+    app.add_middleware(CorrelationIdMiddleware)
+
+    app.add_exception_handler(IdempotentReplay, replay_response)
 
-@app.exception_handler(Exception)
-async def exception_handler(request, exc):
-    return JSONResponse(status_code=500, content={"message": "An unexpected error occurred."})
+    @app.exception_handler(Exception)
+    async def exception_handler(request, exc):
+        return JSONResponse(status_code=500, content={"message": "An unexpected error occurred."})
 
-app.include_router(user_routes.router)
+    app.include_router(health_routes.router)
+    app.include_router(user_routes.router)
+    app.include_router(notification_routes.router)
+    app.include_router(trace_routes.router)
+    app.include_router(admin_routes.router)
+    return app
 
+_app = None
 
+def __getattr__(name: str):
+    # `app.main:app` (uvicorn, tests) builds the application on first access only.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
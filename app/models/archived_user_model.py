@@ -0,0 +1,47 @@
+from builtins import bool, int, str
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, func, Enum as SQLAlchemyEnum
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+from app.models.user_model import UserRole
+
+class ArchivedUser(Base):
+    """
+    A user row moved out of 'users' by the archival job, corresponding to the 'archived_users' table.
+
+    The columns mirror `User` so a row can be restored as is, plus `archived_at`. There are no
+    unique constraints or secondary indexes: the table is written in bulk and rarely read, and
+    an archived email or nickname is free to be registered again.
+
+    Attributes:
+        archived_at (datetime): When the row was moved.
+        Every other attribute has the meaning it has on `User`.
+    """
+    __tablename__ = "archived_users"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    nickname: Mapped[str] = Column(String(50), nullable=False)
+    email: Mapped[str] = Column(String(255), nullable=False)
+    first_name: Mapped[str] = Column(String(100), nullable=True)
+    last_name: Mapped[str] = Column(String(100), nullable=True)
+    bio: Mapped[str] = Column(String(500), nullable=True)
+    profile_picture_url: Mapped[str] = Column(String(255), nullable=True)
+    linkedin_profile_url: Mapped[str] = Column(String(255), nullable=True)
+    github_profile_url: Mapped[str] = Column(String(255), nullable=True)
+    role: Mapped[UserRole] = Column(SQLAlchemyEnum(UserRole, name='UserRole', create_constraint=True), nullable=False)
+    is_professional: Mapped[bool] = Column(Boolean, nullable=True)
+    professional_status_updated_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    last_login_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    failed_login_attempts: Mapped[int] = Column(Integer, nullable=True)
+    is_locked: Mapped[bool] = Column(Boolean, nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    updated_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    verification_token = Column(String, nullable=True)
+    email_verified: Mapped[bool] = Column(Boolean, nullable=False)
+    hashed_password: Mapped[str] = Column(String(255), nullable=False)
+    archived_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ArchivedUser {self.nickname}, archived {self.archived_at}>"
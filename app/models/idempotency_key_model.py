@@ -0,0 +1,39 @@
+from builtins import int, str
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class IdempotencyKey(Base):
+    """
+    A claimed `Idempotency-Key` and the response it produced, corresponding to the 'idempotency_keys' table.
+
+    A row is inserted, in the transaction of the request that claims the key, with no response;
+    the response is filled in once the request has produced it. Until then the row is a lease
+    that expires after `idempotency_lease_seconds`, after which a retry may claim the key again.
+    Rows with a response expire after `idempotency_ttl_seconds` and are purged periodically.
+
+    Attributes:
+        scope (str): sha256 of the caller, method and path the key belongs to.
+        key (str): The client's Idempotency-Key.
+        fingerprint (str): sha256 of the request body the key was first used with.
+        status_code (int): Status of the stored response; NULL while the request is in flight.
+        response_headers (list): The stored response's headers, as [name, value] pairs.
+        response_body (bytes): The stored response's body.
+        created_at (datetime): When the key was claimed.
+        expires_at (datetime): When the lease or stored response runs out.
+    """
+    __tablename__ = "idempotency_keys"
+
+    scope: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = Column(String(64), nullable=False)
+    status_code: Mapped[int] = Column(Integer, nullable=True)
+    response_headers = Column(JSONB, nullable=True)
+    response_body: Mapped[bytes] = Column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey {self.key}, Status: {self.status_code}>"
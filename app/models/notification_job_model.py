@@ -0,0 +1,56 @@
+from builtins import int, str
+from datetime import datetime
+from enum import Enum
+import uuid
+from sqlalchemy import Column, String, Integer, DateTime, JSON, func, Enum as SQLAlchemyEnum
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class NotificationJobStatus(Enum):
+    """Lifecycle states of a bulk notification job."""
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+class NotificationJob(Base):
+    """
+    A bulk email fan-out to every user matching a filter, corresponding to the 'notification_jobs' table.
+
+    Progress is checkpointed after each batch, so a job interrupted by a restart resumes after
+    the last user it reached instead of starting over.
+
+    Attributes:
+        id (UUID): Unique identifier for the job.
+        email_type (str): Template to render, one of EmailService.subject_map.
+        filters (dict): Column filters selecting the recipients; empty means every user. An `ids`
+            entry lists recipients by user id instead, as the batch endpoints do.
+        context (dict): Extra template variables shared by every message.
+        status (NotificationJobStatus): Current lifecycle state.
+        last_user_id (UUID): Keyset cursor; the last recipient whose batch was checkpointed.
+        sent_count (int): Messages delivered so far.
+        failed_count (int): Messages that could not be rendered or delivered.
+        last_error (str): Most recent failure, for diagnostics.
+        started_at (datetime): When the job first started running.
+        finished_at (datetime): When the job completed or failed.
+        heartbeat_at (datetime): Refreshed at each checkpoint; a stale value marks an abandoned job.
+    """
+    __tablename__ = "notification_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    email_type: Mapped[str] = Column(String(50), nullable=False)
+    filters: Mapped[dict] = Column(JSON, nullable=False, default=dict)
+    context: Mapped[dict] = Column(JSON, nullable=False, default=dict)
+    status: Mapped[NotificationJobStatus] = Column(SQLAlchemyEnum(NotificationJobStatus, name='NotificationJobStatus', create_constraint=True), nullable=False, default=NotificationJobStatus.PENDING)
+    last_user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=True)
+    sent_count: Mapped[int] = Column(Integer, nullable=False, default=0)
+    failed_count: Mapped[int] = Column(Integer, nullable=False, default=0)
+    last_error: Mapped[str] = Column(String(500), nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+    started_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<NotificationJob {self.id}, {self.email_type}, Status: {self.status.name}>"
@@ -0,0 +1,36 @@
+from builtins import float, int, str
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Float, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class ScheduledJobState(Base):
+    """
+    The last run of a periodic job, shared by every worker, corresponding to the 'scheduled_jobs' table.
+
+    Whichever worker wins a job's advisory lock records its run here. The other workers read
+    `last_started_at` to see that the slot they woke up for has already been taken.
+
+    Attributes:
+        name (str): Job name, as registered with the scheduler.
+        last_started_at (datetime): When the latest run started.
+        last_finished_at (datetime): When the latest finished run ended.
+        last_duration_ms (float): How long the latest finished run took.
+        last_status (str): RUNNING, SUCCEEDED, FAILED or TIMEOUT.
+        last_error (str): Error of the latest failed run.
+        last_runner (str): host:pid of the worker that ran it.
+        run_count (int): Finished runs so far.
+    """
+    __tablename__ = "scheduled_jobs"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    last_started_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    last_finished_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    last_duration_ms: Mapped[float] = Column(Float, nullable=True)
+    last_status: Mapped[str] = Column(String(20), nullable=True)
+    last_error: Mapped[str] = Column(String(500), nullable=True)
+    last_runner: Mapped[str] = Column(String(255), nullable=True)
+    run_count: Mapped[int] = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<ScheduledJobState {self.name}, last started {self.last_started_at}, Status: {self.last_status}>"
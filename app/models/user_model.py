@@ -3,7 +3,7 @@ from datetime import datetime
 from enum import Enum
 import uuid
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, func, Enum as SQLAlchemyEnum
+    DDL, Column, String, Integer, DateTime, Boolean, Index, event, func, text, Enum as SQLAlchemyEnum
 )
 from sqlalchemy.dialects.postgresql import UUID, ENUM
 from sqlalchemy.orm import Mapped, mapped_column
@@ -16,6 +16,10 @@ class UserRole(Enum):
     MANAGER = "MANAGER"
     ADMIN = "ADMIN"
 
+# Rows of the partial index ix_users_unverified_created_at, matching ArchivalService's candidate
+# conditions (same SQL, so the planner can prove the index applies).
+ARCHIVAL_CANDIDATE_PREDICATE = "role = 'ANONYMOUS' AND email_verified IS false"
+
 class User(Base):
     """
     Represents a user within the application, corresponding to the 'users' table in the database.
@@ -74,6 +78,11 @@ class User(Base):
     email_verified: Mapped[bool] = Column(Boolean, default=False, nullable=False)
     hashed_password: Mapped[str] = Column(String(255), nullable=False)
 
+    __table_args__ = (
+        # Archival candidates (ArchivalService): only the anonymous accounts never verified.
+        Index("ix_users_unverified_created_at", "created_at", postgresql_where=text(ARCHIVAL_CANDIDATE_PREDICATE)),
+    )
+
 
     def __repr__(self) -> str:
         """Provides a readable representation of a user object."""
@@ -95,3 +104,27 @@ class User(Base):
         """Updates the professional status and logs the update time."""
         self.is_professional = status
         self.professional_status_updated_at = func.now()
+
+
+# Every committed insert, update or delete of a user is announced with NOTIFY on this channel,
+# the payload being the user's id, so each worker can drop its cached copies (see
+# `UserChangeListener`). Created by migration e4b7c1d9a2f3; the DDL below gives
+# `metadata.create_all` the same trigger.
+USER_CHANGES_CHANNEL = "user_changes"
+
+event.listen(User.__table__, "after_create", DDL(f"""
+CREATE OR REPLACE FUNCTION notify_user_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('{USER_CHANGES_CHANNEL}', OLD.id::text);
+    ELSE
+        PERFORM pg_notify('{USER_CHANGES_CHANNEL}', NEW.id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""))
+event.listen(User.__table__, "after_create", DDL(
+    "CREATE TRIGGER users_notify_change AFTER INSERT OR UPDATE OR DELETE ON users "
+    "FOR EACH ROW EXECUTE PROCEDURE notify_user_change()"
+))
@@ -0,0 +1,28 @@
+from builtins import int, str
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class UserStat(Base):
+    """
+    One named user counter, corresponding to the 'user_stats' table.
+
+    Counters are named `role:<ROLE>`, `verified`, `unverified`, `locked`, `professional` and
+    `signups:<YYYY-MM-DD>` (UTC day of registration); the total is the sum of the role counters.
+    They are adjusted in the same transaction as the user writes that change them and
+    reconciled against `users` periodically; see `UserStatsService`.
+
+    Attributes:
+        name (str): Counter name.
+        value (int): Current count.
+        updated_at (datetime): Last time the counter changed.
+    """
+    __tablename__ = "user_stats"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[int] = Column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self) -> str:
+        return f"<UserStat {self.name}={self.value}>"
@@ -0,0 +1,123 @@
+"""
+Admin endpoints reporting on user statistics, the worker's in-process caches and periodic jobs,
+and running maintenance jobs.
+
+Cache numbers and scheduler counters are per worker: each process keeps its own.
+"""
+
+from builtins import bool, dict, int, str
+from typing import Optional
+import functools
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database
+from app.dependencies import get_db, require_current_role
+from app.models.scheduled_job_model import ScheduledJobState
+from app.models.user_model import User
+from app.schemas.archival_schema import ArchivalReportResponse
+from app.schemas.user_stats_schema import UserStatsResponse
+from app.services.archival_service import ArchivalService
+from app.services.user_changes import user_change_listener
+from app.services.user_service import UserService
+from app.services.user_stats_service import UserStatsService
+
+router = APIRouter()
+
+# The scheduler job archival runs as, scheduled or started from POST /admin/archive-unverified.
+ARCHIVE_JOB = "archive_unverified_users"
+
+
+@router.get("/admin/user-stats", response_model=UserStatsResponse, name="user_stats", tags=["Statistics (Admin)"])
+async def user_stats(
+    days: int = Query(30, ge=1, le=366, description="Number of days of daily signups to return, ending today (UTC)."),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_current_role(["ADMIN"])),
+):
+    """
+    User counts by role, verified/unverified, locked and professional, and daily signups. Read
+    from maintained counters rather than counted, so the cost does not grow with the user table.
+    """
+    return await UserStatsService.get_stats(db, days)
+
+
+@router.get("/admin/cache-stats", name="cache_stats", tags=["Caching (Admin)"])
+async def cache_stats(current_user: User = Depends(require_current_role(["ADMIN"]))):
+    """
+    Size, hit rate, evictions and invalidations of the user record cache and the user list cache,
+    whether this worker is listening for user changes made elsewhere, and the state of the
+    typeahead prefix index.
+    """
+    return {
+        "user_cache": UserService.cache.stats(),
+        "user_changes": user_change_listener.stats(),
+        "list_users_cache": UserService.list_cache.stats(),
+        "suggest_index": UserService.suggest_index.stats(),
+    }
+
+
+@router.post("/admin/suggest-index/rebuild", name="rebuild_suggest_index", tags=["Caching (Admin)"])
+async def rebuild_suggest_index(db: AsyncSession = Depends(get_db), current_user: User = Depends(require_current_role(["ADMIN"]))):
+    """
+    Reload the typeahead prefix index of the worker that handles this request from the users
+    table, and report its size. Other workers keep theirs until their next scheduled refresh.
+    """
+    return await UserService.suggest_index.rebuild(db)
+
+
+@router.post(
+    "/admin/archive-unverified", response_model=ArchivalReportResponse, name="archive_unverified_users", tags=["Maintenance (Admin)"],
+    responses={202: {"description": "Archival started in the background as the scheduler job named in the body; follow it on GET /admin/scheduler."}},
+)
+async def archive_unverified_users(
+    request: Request,
+    dry_run: bool = Query(False, description="Report what would be archived without changing anything."),
+    older_than_days: Optional[int] = Query(None, ge=1, description="Defaults to the archive_unverified_after_days setting."),
+    max_batches: Optional[int] = Query(None, ge=1, description="Defaults to the archive_max_batches setting."),
+    current_user: User = Depends(require_current_role(["ADMIN"])),
+):
+    """
+    Move anonymous accounts that never verified their email and are older than the cutoff into
+    the archive table, in small throttled batches.
+
+    A dry run answers with the report: rows that would move and time per batch. A real run can
+    take minutes, so it is started in the background as a run of the scheduler's archival job,
+    which never overlaps a scheduled run on any worker, and answered with 202 and the job's name.
+    Its outcome is on GET /admin/scheduler and its report in the log.
+    """
+    if dry_run:
+        return await ArchivalService.archive_unverified(older_than_days=older_than_days, dry_run=True, max_batches=max_batches)
+    request.app.state.scheduler.trigger(
+        ARCHIVE_JOB, Database.get_engine(),
+        functools.partial(ArchivalService.archive_unverified, older_than_days=older_than_days, max_batches=max_batches),
+    )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job": ARCHIVE_JOB, "status_url": str(request.url_for("scheduler_jobs"))},
+    )
+
+
+@router.get("/admin/scheduler", name="scheduler_jobs", tags=["Maintenance (Admin)"])
+async def scheduler_jobs(request: Request, db: AsyncSession = Depends(get_db), current_user: User = Depends(require_current_role(["ADMIN"]))):
+    """
+    Periodic jobs with their schedule and next slot, this worker's run counters, and the latest
+    run across all workers (`cluster`), whichever worker it was.
+    """
+    states = {state.name: state for state in (await db.execute(select(ScheduledJobState))).scalars()}
+    jobs = []
+    for job in request.app.state.scheduler.jobs.values():
+        state = states.get(job.name)
+        jobs.append({
+            **job.to_dict(),
+            "cluster": None if state is None else {
+                "last_started_at": state.last_started_at,
+                "last_finished_at": state.last_finished_at,
+                "last_duration_ms": state.last_duration_ms,
+                "last_status": state.last_status,
+                "last_error": state.last_error,
+                "last_runner": state.last_runner,
+                "run_count": state.run_count,
+            },
+        })
+    return {"jobs": jobs}
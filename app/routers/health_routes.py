@@ -0,0 +1,37 @@
+"""
+Liveness and readiness probes for load balancers and orchestrators.
+
+`/healthz` answers as long as the event loop is responsive and never touches the database, so a
+slow database cannot get healthy workers restarted. `/readyz` reports whether this worker
+should receive traffic: it has finished warming up, is not draining, and its pool can reach the
+database. The database check is cached briefly so frequent probes stay cheap.
+"""
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+from app.database import Database
+from app.dependencies import get_settings
+
+router = APIRouter()
+
+
+@router.get("/healthz", name="healthz", tags=["Health"])
+async def healthz():
+    """Liveness probe. Does no I/O."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", name="readyz", tags=["Health"])
+async def readyz(request: Request):
+    """Readiness probe. Returns 503 while starting, draining or unable to reach the database."""
+    lifecycle = request.app.state.lifecycle
+    if lifecycle.draining:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "draining"})
+    if not lifecycle.ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "starting"})
+    settings = get_settings()
+    database_ok, age = await lifecycle.check_database(Database.get_engine(), settings.readiness_cache_seconds, settings.readiness_timeout_seconds)
+    content = {"status": "ready" if database_ok else "unavailable", "database": "ok" if database_ok else "unreachable", "checked_seconds_ago": round(age, 2)}
+    if not database_ok:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=content)
+    return content
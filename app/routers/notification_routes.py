@@ -0,0 +1,88 @@
+"""
+Admin endpoints for bulk notification fan-out.
+
+A job is created with a template and a recipient filter and then runs in the background of the
+worker that accepted it. Its progress can be polled, and a failed or abandoned job can be
+resumed from its last checkpoint.
+"""
+
+from builtins import dict, max
+from datetime import datetime, timezone
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_db, get_email_service, require_current_role
+from app.models.notification_job_model import NotificationJob
+from app.models.user_model import User
+from app.schemas.notification_schema import NotificationJobCreate, NotificationJobResponse
+from app.services.email_service import EmailService
+from app.utils.tracing import TracedRoute
+from app.services.notification_service import NotificationService
+
+router = APIRouter(route_class=TracedRoute)
+
+
+def _job_response(job: NotificationJob) -> NotificationJobResponse:
+    throughput = 0.0
+    if job.started_at is not None:
+        elapsed = ((job.finished_at or datetime.now(timezone.utc)) - job.started_at).total_seconds()
+        throughput = job.sent_count / max(elapsed, 1e-3)
+    return NotificationJobResponse(
+        id=job.id,
+        email_type=job.email_type,
+        status=job.status,
+        sent_count=job.sent_count,
+        failed_count=job.failed_count,
+        throughput_per_second=round(throughput, 2),
+        last_error=job.last_error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+@router.post("/notifications/jobs", response_model=NotificationJobResponse, status_code=status.HTTP_202_ACCEPTED, name="create_notification_job", tags=["Notifications (Admin)"])
+async def create_notification_job(job_request: NotificationJobCreate, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), current_user: User = Depends(require_current_role(["ADMIN"]))):
+    """
+    Start sending a templated email to every user matching the filter.
+
+    - **email_type**: Template to send.
+    - **filter**: Optional recipient filter.
+    - **context**: Template variables shared by every message, e.g. `message` for announcements.
+    """
+    filters = job_request.filter.model_dump(mode="json", exclude_none=True) if job_request.filter else {}
+    job = await NotificationService.create_job(db, job_request.email_type, filters, job_request.context)
+    NotificationService.start(job.id, email_service)
+    return _job_response(job)
+
+
+@router.get("/notifications/jobs/{job_id}", response_model=NotificationJobResponse, name="get_notification_job", tags=["Notifications (Admin)"])
+async def get_notification_job(job_id: UUID, db: AsyncSession = Depends(get_db), current_user: User = Depends(require_current_role(["ADMIN"]))):
+    """
+    Report a job's progress, throughput and most recent failure.
+
+    - **job_id**: UUID of the job.
+    """
+    job = await NotificationService.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification job not found")
+    return _job_response(job)
+
+
+@router.post("/notifications/jobs/{job_id}/resume", response_model=NotificationJobResponse, status_code=status.HTTP_202_ACCEPTED, name="resume_notification_job", tags=["Notifications (Admin)"])
+async def resume_notification_job(job_id: UUID, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), current_user: User = Depends(require_current_role(["ADMIN"]))):
+    """
+    Resume a failed or abandoned job from its last checkpoint. Answers 409 for a job that has
+    completed or is still running.
+
+    - **job_id**: UUID of the job.
+    """
+    job = await NotificationService.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification job not found")
+    if not await NotificationService.claim_job(db, job_id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Notification job is {job.status.value}, not resumable")
+    if NotificationService.start(job_id, email_service, claimed=True) is None:
+        # The worker is shutting down: leave the job pending for the next one.
+        await NotificationService.release_job(db, job_id)
+    return _job_response(await NotificationService.get_job(db, job_id))
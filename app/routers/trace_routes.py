@@ -0,0 +1,48 @@
+"""
+Admin endpoints for the traces kept in this worker's in-memory ring buffer.
+
+Each worker keeps its own buffer, so with several workers a request's trace is only found on
+the worker that served it; the file exporter collects traces from every worker.
+"""
+
+from builtins import dict, float, int, str
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from app.dependencies import require_current_role
+from app.models.user_model import User
+from app.schemas.trace_schema import TraceListResponse, TraceResponse
+
+router = APIRouter()
+
+
+def _buffer(request: Request):
+    buffer = request.app.state.tracer.buffer
+    if buffer is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="In-memory trace buffer is disabled")
+    return buffer
+
+
+@router.get("/admin/traces", response_model=TraceListResponse, name="list_traces", tags=["Tracing (Admin)"])
+async def list_traces(request: Request, min_duration_ms: float = Query(0, ge=0), name: Optional[str] = None, limit: int = Query(50, ge=1, le=500), current_user: User = Depends(require_current_role(["ADMIN"]))):
+    """
+    List sampled traces, newest first.
+
+    - **min_duration_ms**: Only traces at least this slow.
+    - **name**: Only traces whose name (method and route) contains this text.
+    - **limit**: Maximum number of traces returned.
+    """
+    tracer = request.app.state.tracer
+    return TraceListResponse(recorded=tracer.recorded, kept=tracer.kept, traces=_buffer(request).query(min_duration_ms, name, limit))
+
+
+@router.get("/admin/traces/{trace_id}", response_model=TraceResponse, name="get_trace", tags=["Tracing (Admin)"])
+async def get_trace(request: Request, trace_id: str, current_user: User = Depends(require_current_role(["ADMIN"]))):
+    """
+    Fetch one trace with all its spans.
+
+    - **trace_id**: The request's X-Request-ID.
+    """
+    trace = _buffer(request).get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return trace
@@ -18,42 +18,94 @@ Key Highlights:
 - Utilizes OAuth2PasswordBearer for securing API endpoints, requiring valid access tokens for operations.
 """
 
-from builtins import dict, int, len, str
+from builtins import ValueError, dict, int, len, set, str
+from typing import Any, Dict, List, Optional
 from datetime import timedelta
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status, Request
+from sqlalchemy import func
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dependencies import get_current_user, get_db, get_email_service, require_role
+from app.dependencies import get_db, get_email_service, require_current_role
 from app.schemas.pagination_schema import EnhancedPagination
+from app.models.user_model import User
+from app.schemas.batch_schema import UserBatchProfessionalUpdate, UserBatchResponse, UserBatchRoleUpdate, UserBatchSelection
 from app.schemas.token_schema import TokenResponse
-from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserUpdateProfile, UserResponse, UserUpdate
-from app.services.user_service import UserService
+from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserSearchResponse, UserSearchResult, UserSuggestResponse, UserSuggestion, UserUpdateProfile, UserResponse, UserUpdate
+from app.services.user_service import StaleUpdateError, UserService
 from app.services.jwt_service import create_access_token
+from app.utils.etag import etag_matches, if_match_versions, user_etag
+from app.utils.idempotency import IdempotencyClaim, claim_idempotency_key
 from app.utils.link_generation import create_user_links, generate_pagination_links
 from app.dependencies import get_settings
 from app.services.email_service import EmailService
-router = APIRouter()
+from app.services.notification_service import NotificationService
+from app.utils.tracing import TracedRoute
+router = APIRouter(route_class=TracedRoute)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-settings = get_settings()
+# Declared before /users/{user_id}, which would otherwise take "search" and "suggest" for ids.
+@router.get("/users/suggest", response_model=UserSuggestResponse, name="suggest_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def suggest_users(
+    response: Response,
+    prefix: str = Query(..., min_length=1, max_length=255, description="Start of a nickname or email, in any case."),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"])),
+):
+    """
+    Typeahead over nicknames and emails. Answered from this worker's in-memory prefix index
+    when it is loaded, otherwise from the database; `X-Suggest-Source` says which.
+    """
+    index = UserService.suggest_index
+    if index.ready:
+        response.headers["X-Suggest-Source"] = "index"
+        return UserSuggestResponse(items=[UserSuggestion(**item) for item in index.suggest(prefix, limit)])
+    response.headers["X-Suggest-Source"] = "database"
+    rows = await UserService.suggest(db, prefix, limit)
+    return UserSuggestResponse(items=[UserSuggestion.model_validate(row) for row in rows])
+
+
+@router.get("/users/search", response_model=UserSearchResponse, name="search_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def search_users(
+    q: str = Query(..., min_length=3, max_length=100, description="Part of a nickname, name or email; close spellings match too."),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"])),
+):
+    """
+    Find users by partial or approximate nickname, first or last name, or email, best match first.
+    Queries need at least three characters, the shortest a trigram index can narrow down.
+    """
+    rows = await UserService.search(db, q.strip(), limit)
+    return UserSearchResponse(items=[UserSearchResult.model_validate(row) for row in rows])
+
+
 @router.get("/users/{user_id}", response_model=UserResponse, name="get_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def get_user(user_id: UUID, request: Request, response: Response, if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"]))):
     """
     Endpoint to fetch a user by their unique identifier (UUID).
 
     Utilizes the UserService to query the database asynchronously for the user and constructs a response
     model that includes the user's details along with HATEOAS links for possible next actions.
+    The response carries an ETag; sending it back in If-None-Match returns 304 with no body when
+    the user has not changed.
 
     Args:
         user_id: UUID of the user to fetch.
         request: The request object, used to generate full URLs in the response.
+        if_none_match: ETag(s) of the copy the client already has.
         db: Dependency that provides an AsyncSession for database access.
         token: The OAuth2 access token obtained through OAuth2PasswordBearer dependency.
     """
-    user = await UserService.get_by_id(db, user_id)
+    user = await UserService.get_view_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
+    etag = user_etag(user.id, user.updated_at)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     return UserResponse.model_construct(
         id=user.id,
         nickname=user.nickname,
@@ -79,17 +131,19 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
 # experience by adhering to REST principles and providing self-discoverable operations.
 
 @router.put("/users/{user_id}", response_model=UserResponse, name="update_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, response: Response, if_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"]))):
     """
     Update user information.
 
     - **user_id**: UUID of the user to update.
     - **user_update**: UserUpdate model with updated user information.
+    - **If-Match**: Optional ETag from a previous read; the update fails with 412 if the user changed since.
     """
     user_data = user_update.model_dump(exclude_unset=True)
-    updated_user = await UserService.update(db, user_id, user_data)
+    updated_user = await _conditional_update(db, user_id, user_data, if_match)
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    response.headers["ETag"] = user_etag(updated_user.id, updated_user.updated_at)
 
     return UserResponse.model_construct(
         id=updated_user.id,
@@ -109,8 +163,17 @@ async def update_user(user_id: UUID, user_update: UserUpdate, request: Request,
     )
 
 
+async def _conditional_update(db: AsyncSession, user_id: UUID, user_data: Dict[str, Any], if_match: Optional[str]) -> Optional[User]:
+    """Run UserService.update, honouring an If-Match header; raises 412 if the user changed since that version."""
+    expected_versions = if_match_versions(if_match, user_id) if if_match else None
+    try:
+        return await UserService.update(db, user_id, user_data, expected_versions)
+    except StaleUpdateError:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="User has been modified; fetch it again and retry")
+
+
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, name="delete_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"]))):
     """
     Delete a user by their ID.
 
@@ -124,13 +187,14 @@ async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token:
 
 
 @router.post("/users/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["User Management Requires (Admin or Manager Roles)"], name="create_user")
-async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"])), idempotency: Optional[IdempotencyClaim] = Depends(claim_idempotency_key)):
     """
     Create a new user.
 
     This endpoint creates a new user with the provided information. If the email
     already exists, it returns a 400 error. On successful creation, it returns the
-    newly created user's information along with links to related actions.
+    newly created user's information along with links to related actions. A retry sent
+    with the same Idempotency-Key gets the first response back instead of creating again.
 
     Parameters:
     - user (UserCreate): The user information to create.
@@ -140,7 +204,7 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
     Returns:
     - UserResponse: The newly created user's information along with navigation links.
     """
-    existing_user = await UserService.get_by_email(db, user.email)
+    existing_user = await UserService.get_view_by_email(db, user.email)
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
     
@@ -173,9 +237,14 @@ async def list_users(
     skip: int = 0,
     limit: int = 10,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+    current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"]))
 ):
+    """
+    List users a page at a time.
 
+    Identical requests (same parameters, host and caller role) are answered from a short-lived
+    cache of serialised pages, which any user write invalidates. `X-Cache` reports HIT or MISS.
+    """
     # Validate skip and limit parameters
     if skip < 0 or limit <= 0:
         raise HTTPException(
@@ -183,26 +252,36 @@ async def list_users(
             detail=f"Parameters 'skip' and 'limit' must be non-negative integers. Received skip={skip} and limit={limit}."
         )
 
+    cache = UserService.list_cache
+    cache_key = (str(request.base_url), current_user.role.name, skip, limit)
+    body = cache.get(cache_key)
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+    # Read the generation before querying, so a write that lands meanwhile keeps this page out of the cache.
+    generation = cache.generation
+
     total_users = await UserService.count(db)
 
-    users = await UserService.list_users(db, skip, limit)
+    users = await UserService.list_views(db, skip, limit)
     user_responses = [
         UserResponse.model_validate(user) for user in users
     ]
     pagination_links = generate_pagination_links(request, skip, limit, total_users)
     
     # Construct the final response with pagination details
-    return UserListResponse(
+    body = UserListResponse(
         items=user_responses,
         total=total_users,
         page=skip // limit + 1,
         size=len(user_responses),
         links=pagination_links  # Ensure you have appropriate logic to create these links
-    )
+    ).model_dump_json(by_alias=True).encode()
+    cache.set(cache_key, body, generation)
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
 
 
 @router.post("/register/", response_model=UserResponse, tags=["Login and Registration"])
-async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service)):
+async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), idempotency: Optional[IdempotencyClaim] = Depends(claim_idempotency_key)):
     user = await UserService.register_user(session, user_data.model_dump(), email_service)
     if user:
         return user
@@ -215,10 +294,10 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Async
 
     user = await UserService.login_user(session, form_data.username, form_data.password)
     if user:
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+        access_token_expires = timedelta(minutes=get_settings().access_token_expire_minutes)
 
         access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
+            data={"sub": user.email, "uid": str(user.id), "role": str(user.role.name)},
             expires_delta=access_token_expires
         )
 
@@ -232,10 +311,10 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Async
 
     user = await UserService.login_user(session, form_data.username, form_data.password)
     if user:
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+        access_token_expires = timedelta(minutes=get_settings().access_token_expire_minutes)
 
         access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
+            data={"sub": user.email, "uid": str(user.id), "role": str(user.role.name)},
             expires_delta=access_token_expires
         )
 
@@ -262,9 +341,10 @@ async def verify_email(user_id: UUID, token: str, db: AsyncSession = Depends(get
 async def update_profile(
     user_update: UserUpdateProfile, 
     request: Request, 
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db), 
-    token: str = Depends(oauth2_scheme), 
-    current_user: dict = Depends(require_role(["ADMIN", "MANAGER", "AUTHENTICATED"]))
+    user: User = Depends(require_current_role(["ADMIN", "MANAGER", "AUTHENTICATED"]))
 ):
     """
     Update personal user profile.
@@ -276,24 +356,16 @@ async def update_profile(
     Args:
     - user_update (UserProfileUpdate): Payload containing the fields to update, adhering to the UserProfileUpdate schema.
     - request (Request): The request object, used to generate full URLs in the response.
+    - if_match (str): Optional ETag from a previous read of the profile, for optimistic concurrency.
     - db (AsyncSession): Dependency that provides an AsyncSession for database access.
-    - token (str): The OAuth2 access token obtained through OAuth2PasswordBearer dependency.
-    - current_user (dict): Extracted from the token, contains user-specific data validated against roles.
+    - user (User): The caller, resolved once per request from the token and checked against their current role.
 
     Raises:
-    - HTTPException: 404 if no user is found with the provided ID or 400 if the requested nickname is already in use.
+    - HTTPException: 401 if the token does not resolve to an existing user, 403 if their current role is not allowed, 400 if the requested nickname is already in use, or 412 if If-Match no longer matches the profile.
 
     Returns:
     - UserResponse: The updated user data including any changes to the profile fields along with HATEOAS links for further actions.
     """
-    # Fetch the current user based on the email stored in the token.
-    current_user_info = get_current_user(token)
-    user_email = current_user_info['user_email']
-    user = await UserService.get_by_email(db, user_email)
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     # Check for nickname uniqueness if it's being changed.
     if user_update.nickname != user.nickname:
         user_with_existing_nickname = await UserService.get_by_nickname(db, user_update.nickname)
@@ -302,7 +374,10 @@ async def update_profile(
 
     # Prepare the data for update.
     user_data = user_update.model_dump(exclude_unset=True)
-    updated_user = await UserService.update(db, user.id, user_data)
+    updated_user = await _conditional_update(db, user.id, user_data, if_match)
+    if not updated_user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    response.headers["ETag"] = user_etag(updated_user.id, updated_user.updated_at)
 
     # Construct the response with HATEOS links.
     return UserResponse.model_construct(
@@ -324,18 +399,16 @@ async def update_profile(
 
 # Update user professional status
 @router.put("/users/{user_id}/set-professional/{is_professional}", response_model=UserResponse, name="set_professional", tags=["User Management Requires (Admin or Manager Roles)"])
-async def update_professional_status(user_id: UUID, is_professional: bool, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def update_professional_status(user_id: UUID, is_professional: bool, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"]))):
     """
     Update user is_professional by their ID.
 
     - user_id: UUID of the user to update.
     - is_professional: Boolean to set user's is_professional status.
     """
-    user = await UserService.get_by_id(db, user_id)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
     updated_user = await UserService.update_professional_status(db, user_id, is_professional, email_service)
+    if not updated_user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     return UserResponse.model_construct(
         is_professional=updated_user.is_professional,
@@ -354,3 +427,70 @@ async def update_professional_status(user_id: UUID, is_professional: bool, reque
         updated_at=updated_user.updated_at,
         links=create_user_links(updated_user.id, request)  
     )
+
+
+# Batch administration
+async def _run_batch_update(db: AsyncSession, selection: UserBatchSelection, values: Dict[str, Any]) -> List[Any]:
+    """Apply `values` to the selected users, mapping an oversized batch to a 400 response."""
+    filters = selection.filter.model_dump(exclude_none=True) if selection.filter else None
+    try:
+        return await UserService.batch_update(db, values, get_settings().max_batch_size, user_ids=selection.user_ids, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def _batch_response(selection: UserBatchSelection, rows: List[Any]) -> UserBatchResponse:
+    updated = [row.id for row in rows]
+    updated_ids = set(updated)
+    not_found = [user_id for user_id in selection.user_ids or [] if user_id not in updated_ids]
+    return UserBatchResponse(updated=updated, not_found=not_found, total_updated=len(updated))
+
+@router.post("/users/batch/lock", response_model=UserBatchResponse, name="batch_lock_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def batch_lock_users(selection: UserBatchSelection, db: AsyncSession = Depends(get_db), current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"])), idempotency: Optional[IdempotencyClaim] = Depends(claim_idempotency_key)):
+    """
+    Lock every selected user account in a single statement.
+
+    - **user_ids** or **filter**: The users to lock, limited to the configured maximum batch size.
+    """
+    rows = await _run_batch_update(db, selection, {"is_locked": True})
+    return _batch_response(selection, rows)
+
+@router.post("/users/batch/unlock", response_model=UserBatchResponse, name="batch_unlock_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def batch_unlock_users(selection: UserBatchSelection, db: AsyncSession = Depends(get_db), current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"])), idempotency: Optional[IdempotencyClaim] = Depends(claim_idempotency_key)):
+    """
+    Unlock every selected user account and reset their failed login attempts.
+
+    - **user_ids** or **filter**: The users to unlock, limited to the configured maximum batch size.
+    """
+    rows = await _run_batch_update(db, selection, {"is_locked": False, "failed_login_attempts": 0})
+    return _batch_response(selection, rows)
+
+@router.post("/users/batch/role", response_model=UserBatchResponse, name="batch_set_role", tags=["User Management Requires (Admin or Manager Roles)"])
+async def batch_set_role(role_update: UserBatchRoleUpdate, db: AsyncSession = Depends(get_db), current_user: User = Depends(require_current_role(["ADMIN"])), idempotency: Optional[IdempotencyClaim] = Depends(claim_idempotency_key)):
+    """
+    Assign the same role to every selected user. Restricted to admins.
+
+    - **user_ids** or **filter**: The users to change, limited to the configured maximum batch size.
+    - **role**: The role to assign.
+    """
+    rows = await _run_batch_update(db, role_update, {"role": role_update.role})
+    return _batch_response(role_update, rows)
+
+@router.post("/users/batch/professional", response_model=UserBatchResponse, name="batch_set_professional", tags=["User Management Requires (Admin or Manager Roles)"])
+async def batch_set_professional(professional_update: UserBatchProfessionalUpdate, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), current_user: User = Depends(require_current_role(["ADMIN", "MANAGER"])), idempotency: Optional[IdempotencyClaim] = Depends(claim_idempotency_key)):
+    """
+    Set the professional status of every selected user.
+
+    Notification emails go out through a notification job for the changed users, sent in the
+    background over reused SMTP connections; poll it at `/notifications/jobs/{id}`.
+
+    - **user_ids** or **filter**: The users to change, limited to the configured maximum batch size.
+    - **is_professional**: The professional status to set.
+    """
+    rows = await _run_batch_update(db, professional_update, {
+        "is_professional": professional_update.is_professional,
+        "professional_status_updated_at": func.now(),
+    })
+    if rows:
+        job = await NotificationService.create_job(db, "professional_status_update", {"ids": [str(row.id) for row in rows]}, {})
+        NotificationService.start(job.id, email_service)
+    return _batch_response(professional_update, rows)
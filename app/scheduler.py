@@ -0,0 +1,396 @@
+"""
+In-process scheduler for periodic jobs, with one runner per job across all workers.
+
+Every worker runs the same `Scheduler`, started from the app lifespan, and wakes up for every
+slot of every job. Slots are absolute times: multiples of the interval since the epoch, or the
+minutes a cron expression matches (UTC), so all workers agree on them. Each worker sleeps
+until the slot plus a random jitter and then competes for the job's Postgres advisory lock.
+The winner checks the shared `scheduled_jobs` row, and runs the job only if nobody has started
+it for this slot yet. The losers skip it.
+
+This gives:
+- One run per slot across processes and hosts.
+- No overlapping runs. A job still running holds its lock, and a worker only looks for the
+  next slot once its own run has finished.
+- Per-job timeouts.
+- Last-run metrics, both per worker (`Job.to_dict`) and cluster-wide (the `scheduled_jobs`
+  table).
+
+Host clocks are assumed to agree to within the jitter.
+
+Jobs registered with `per_worker=True` maintain state local to each process (such as an
+in-memory index). They skip the lock and the shared row and run in every worker.
+
+`trigger` runs a job now, outside its schedule, in a background task (an admin asking for an
+archival run, say). The run goes through the same lock and shared row as a scheduled one, so it
+never overlaps another run of the job and shows up in `scheduled_jobs`. Jobs registered with
+`on_demand` have no schedule and only run when triggered.
+"""
+from builtins import Exception, ValueError, bool, float, frozenset, int, len, max, range, round, set, staticmethod, str, type, zip
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Union
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import socket
+import time
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.models.scheduled_job_model import ScheduledJobState
+from app.utils.tracing import untraced
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class IntervalSchedule:
+    """Every `seconds`, on multiples of the interval since the epoch."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, moment: datetime) -> datetime:
+        elapsed = (moment - _EPOCH).total_seconds()
+        return _EPOCH + timedelta(seconds=(elapsed // self.seconds + 1) * self.seconds)
+
+    def __str__(self) -> str:
+        return f"every {self.seconds:g}s"
+
+
+class CronSchedule:
+    """
+    A five-field cron expression (minute hour day-of-month month day-of-week), evaluated in UTC.
+
+    Fields accept `*`, numbers, ranges `a-b`, lists `a,b` and steps `*/n` or `a-b/n`. Day of
+    week runs 0-6 from Sunday (7 is Sunday too). As in cron, when both day fields are
+    restricted a day matching either one fires.
+    """
+    _FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(parts)}: {expression!r}")
+        self.expression = expression
+        values = [self._parse(part, name, low, high) for part, (name, low, high) in zip(parts, self._FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, name: str, low: int, high: int) -> FrozenSet[int]:
+        values = set()
+        for part in field.split(","):
+            spec, _, step_text = part.partition("/")
+            try:
+                step = int(step_text) if step_text else 1
+                if spec == "*":
+                    start, end = low, high
+                elif "-" in spec:
+                    start, end = (int(bound) for bound in spec.split("-", 1))
+                else:
+                    start = int(spec)
+                    end = high if step_text else start
+            except ValueError:
+                raise ValueError(f"Invalid cron {name} field: {field!r}") from None
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Cron {name} field out of range {low}-{high}: {field!r}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Leap days on a given weekday can take years to come round; anything longer never fires.
+        limit = candidate + timedelta(days=366 * 8)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+    def __str__(self) -> str:
+        return f"cron {self.expression}"
+
+
+Schedule = Union[IntervalSchedule, CronSchedule]
+
+
+def advisory_lock_key(name: str) -> int:
+    """A stable signed 64-bit key for `pg_try_advisory_lock`, derived from the job name."""
+    digest = hashlib.blake2b(f"scheduler:{name}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class Job:
+    """A registered periodic job and this worker's metrics for it."""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Any]], schedule: Optional[Schedule], timeout: float, jitter: float,
+                 per_worker: bool = False):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.timeout = timeout
+        self.jitter = jitter
+        self.per_worker = per_worker
+        self.lock_key = advisory_lock_key(name)
+        self.next_run_at: Optional[datetime] = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "schedule": str(self.schedule) if self.schedule is not None else "on demand",
+            "timeout_seconds": self.timeout,
+            "per_worker": self.per_worker,
+            "next_run_at": self.next_run_at,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "last_started_at": self.last_started_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    """Runs registered jobs on their schedules; see the module docstring for how workers coordinate."""
+
+    def __init__(self, default_timeout: float = 300.0, default_jitter: float = 5.0, engine: Optional[AsyncEngine] = None):
+        self.default_timeout = default_timeout
+        self.default_jitter = default_jitter
+        self.jobs: Dict[str, Job] = {}
+        self.runner = f"{socket.gethostname()}:{os.getpid()}"
+        self.engine = engine
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], schedule: Optional[Schedule],
+            timeout: Optional[float] = None, jitter: Optional[float] = None, per_worker: bool = False) -> Job:
+        if name in self.jobs:
+            raise ValueError(f"Job {name!r} is already registered")
+        job = Job(name, func, schedule,
+                  self.default_timeout if timeout is None else timeout,
+                  self.default_jitter if jitter is None else jitter,
+                  per_worker)
+        self.jobs[name] = job
+        return job
+
+    def every(self, name: str, seconds: float, func: Callable[[], Awaitable[Any]], **options) -> Job:
+        return self.add(name, func, IntervalSchedule(seconds), **options)
+
+    def cron(self, name: str, expression: str, func: Callable[[], Awaitable[Any]], **options) -> Job:
+        return self.add(name, func, CronSchedule(expression), **options)
+
+    def on_demand(self, name: str, func: Callable[[], Awaitable[Any]], **options) -> Job:
+        return self.add(name, func, None, **options)
+
+    def start(self, engine: AsyncEngine):
+        """Start a timer task per job. Runs use `engine` for their advisory locks and state rows."""
+        self.engine = engine
+        # Started in the worker itself, so after a fork every process has its own timers.
+        self.runner = f"{socket.gethostname()}:{os.getpid()}"
+        for job in self.jobs.values():
+            if job.schedule is not None:
+                self._tasks.append(asyncio.create_task(self._loop(job), name=f"scheduler:{job.name}"))
+        if self.jobs:
+            logger.info("Scheduler started with %d jobs.", len(self.jobs))
+
+    def trigger(self, name: str, engine: AsyncEngine, body: Optional[Callable[[], Awaitable[Any]]] = None) -> asyncio.Task:
+        """
+        Run job `name` now in a background task, outside the caller's trace, taking its lock on
+        `engine`; see the module docstring. `body` replaces the job's body for this run, e.g. to pass it parameters from a
+        request. Works whether or not the scheduler was started (`scheduler_enabled`).
+        """
+        job = self.jobs[name]
+        task = asyncio.create_task(untraced(self.run(job, utcnow(), body, engine)), name=f"scheduler:{job.name}:triggered")
+        self._tasks.append(task)
+        task.add_done_callback(self._forget)
+        return task
+
+    def _forget(self, task: asyncio.Task):
+        if task in self._tasks:
+            self._tasks.remove(task)
+
+    async def stop(self, timeout: float = 5.0):
+        """Cancel the timers and any run in progress, waiting up to `timeout` for them to unwind."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=max(timeout, 0))
+
+    async def _loop(self, job: Job):
+        while True:
+            due = job.schedule.next_after(utcnow())
+            job.next_run_at = due
+            # Jitter spreads the workers' attempts on the lock; the slot stays `due` for all of them.
+            delay = (due - utcnow()).total_seconds() + random.uniform(0, job.jitter)
+            await asyncio.sleep(max(delay, 0))
+            try:
+                await self.run(job, due)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Losing the database must not kill the timer; the next slot tries again.
+                logger.error("Scheduler could not run %s: %s", job.name, e)
+
+    async def run(self, job: Job, due: datetime, body: Optional[Callable[[], Awaitable[Any]]] = None,
+                  engine: Optional[AsyncEngine] = None) -> str:
+        """
+        Run `job` for the slot `due`, unless another worker holds it or already ran it. `body`,
+        if given, runs instead of the job's own body; `engine` instead of the scheduler's.
+
+        Returns the outcome: SUCCEEDED, FAILED or TIMEOUT, or SKIPPED when this worker did not run it.
+        """
+        if job.per_worker:
+            status, _, _ = await self._execute(job, utcnow(), body)
+            return status
+        async with (engine or self.engine).connect() as conn:
+            # A session-level lock lives as long as this connection, across the commits below.
+            acquired = await conn.scalar(select(func.pg_try_advisory_lock(job.lock_key)))
+            await conn.commit()
+            if not acquired:
+                job.skipped += 1
+                return "SKIPPED"
+            try:
+                last_started_at = await conn.scalar(
+                    select(ScheduledJobState.last_started_at).where(ScheduledJobState.name == job.name)
+                )
+                await conn.commit()
+                if last_started_at is not None and last_started_at >= due:
+                    job.skipped += 1
+                    return "SKIPPED"
+                started_at = utcnow()
+                await conn.execute(
+                    insert(ScheduledJobState)
+                    .values(name=job.name, last_started_at=started_at, last_status="RUNNING", last_runner=self.runner, run_count=0)
+                    .on_conflict_do_update(
+                        index_elements=[ScheduledJobState.name],
+                        set_={"last_started_at": started_at, "last_status": "RUNNING", "last_runner": self.runner},
+                    )
+                )
+                await conn.commit()
+
+                status, error, duration_ms = await self._execute(job, started_at, body)
+                await conn.execute(
+                    update(ScheduledJobState)
+                    .where(ScheduledJobState.name == job.name)
+                    .values(
+                        last_finished_at=utcnow(),
+                        last_duration_ms=duration_ms,
+                        last_status=status,
+                        last_error=error,
+                        run_count=ScheduledJobState.run_count + 1,
+                    )
+                )
+                await conn.commit()
+                return status
+            finally:
+                await conn.execute(select(func.pg_advisory_unlock(job.lock_key)))
+                await conn.commit()
+
+    async def _execute(self, job: Job, started_at: datetime, body: Optional[Callable[[], Awaitable[Any]]] = None):
+        """Run the job's body (or the `body` given) under its timeout and update this worker's metrics."""
+        job.running = True
+        job.last_started_at = started_at
+        started = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for((body or job.func)(), timeout=job.timeout)
+            status = "SUCCEEDED"
+        except asyncio.TimeoutError:
+            status, error = "TIMEOUT", f"Timed out after {job.timeout:g}s"
+            job.timeouts += 1
+        except Exception as e:
+            status, error = "FAILED", f"{type(e).__name__}: {e}"[:500]
+            job.failures += 1
+        finally:
+            job.running = False
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        job.runs += 1
+        job.last_duration_ms = duration_ms
+        job.last_status = status
+        job.last_error = error
+        if error:
+            logger.error("Scheduled job %s %s after %.1f ms: %s", job.name, status.lower(), duration_ms, error)
+        else:
+            logger.info("Scheduled job %s succeeded in %.1f ms.", job.name, duration_ms)
+        return status, error, duration_ms
+
+
+def build_scheduler(settings) -> Scheduler:
+    """The application's periodic jobs."""
+    scheduler = Scheduler(default_timeout=settings.scheduler_default_timeout_seconds, default_jitter=settings.scheduler_jitter_seconds)
+
+    async def archive_unverified_users():
+        from app.services.archival_service import ArchivalService
+        await ArchivalService.archive_unverified()
+
+    async def resume_notification_jobs():
+        from app.dependencies import get_email_service
+        from app.services.notification_service import NotificationService
+        await NotificationService.resume_stale_jobs(get_email_service())
+
+    async def refresh_suggest_index():
+        from app.database import Database
+        from app.services.suggest_index import suggest_index
+        async with Database.get_session_factory()() as session:
+            await suggest_index.rebuild(session)
+
+    async def reconcile_user_stats():
+        from app.services.user_stats_service import UserStatsService
+        await UserStatsService.reconcile()
+
+    async def purge_idempotency_keys():
+        from app.services.idempotency_service import IdempotencyService
+        await IdempotencyService.purge()
+
+    if settings.archive_schedule:
+        scheduler.cron("archive_unverified_users", settings.archive_schedule, archive_unverified_users)
+    else:
+        # Still run on demand from POST /admin/archive-unverified.
+        scheduler.on_demand("archive_unverified_users", archive_unverified_users)
+    if settings.notification_resume_interval_seconds > 0:
+        scheduler.every("resume_notification_jobs", settings.notification_resume_interval_seconds, resume_notification_jobs, timeout=60.0)
+    if settings.suggest_index_enabled and settings.suggest_index_refresh_seconds > 0:
+        scheduler.every("refresh_suggest_index", settings.suggest_index_refresh_seconds, refresh_suggest_index, per_worker=True)
+    if settings.user_stats_reconcile_interval_seconds > 0:
+        scheduler.every("reconcile_user_stats", settings.user_stats_reconcile_interval_seconds, reconcile_user_stats)
+    if settings.idempotency_purge_interval_seconds > 0:
+        scheduler.every("purge_idempotency_keys", settings.idempotency_purge_interval_seconds, purge_idempotency_keys)
+    return scheduler
@@ -0,0 +1,19 @@
+from builtins import bool, float, int
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class ArchivalBatchResponse(BaseModel):
+    rows: int = Field(..., example=500)
+    duration_ms: float = Field(..., example=42.7)
+
+
+class ArchivalReportResponse(BaseModel):
+    dry_run: bool = Field(..., example=False)
+    cutoff: datetime = Field(..., description="Unverified users created before this were candidates.")
+    rows: int = Field(..., description="Users archived, or that would be in a dry run.", example=1500)
+    batches: List[ArchivalBatchResponse]
+    duration_ms: float = Field(..., example=1612.4)
+    remaining: Optional[int] = Field(None, description="Candidates still in users after the run, including rows skipped because they were locked; not counted in a dry run.", example=0)
+    complete: bool = Field(..., description="True once no candidates are left (in a dry run, once all of them were listed); otherwise run it again to continue.", example=True)
@@ -0,0 +1,45 @@
+from builtins import bool, int
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field, model_validator
+from app.models.user_model import UserRole
+
+
+class UserBatchFilter(BaseModel):
+    role: Optional[UserRole] = Field(None, example="ANONYMOUS")
+    is_locked: Optional[bool] = Field(None, example=True)
+    is_professional: Optional[bool] = Field(None, example=False)
+    email_verified: Optional[bool] = Field(None, example=False)
+
+    @model_validator(mode="after")
+    def check_at_least_one_criterion(self):
+        if not self.model_dump(exclude_none=True):
+            raise ValueError("At least one filter criterion must be provided")
+        return self
+
+
+class UserBatchSelection(BaseModel):
+    """Selects the users a batch operation applies to, either by ID or by filter."""
+    user_ids: Optional[List[UUID]] = Field(None, example=["3fa85f64-5717-4562-b3fc-2c963f66afa6"])
+    filter: Optional[UserBatchFilter] = Field(None, example={"role": "ANONYMOUS", "is_locked": True})
+
+    @model_validator(mode="after")
+    def check_exactly_one_selector(self):
+        if (self.user_ids is None) == (self.filter is None):
+            raise ValueError("Provide either user_ids or filter, but not both")
+        return self
+
+
+class UserBatchRoleUpdate(UserBatchSelection):
+    role: UserRole = Field(..., example="MANAGER")
+
+
+class UserBatchProfessionalUpdate(UserBatchSelection):
+    is_professional: bool = Field(..., example=True)
+
+
+class UserBatchResponse(BaseModel):
+    updated: List[UUID] = Field(..., description="IDs of users that were changed.")
+    not_found: List[UUID] = Field(default=[], description="Requested IDs that matched no user.")
+    total_updated: int = Field(..., example=1)
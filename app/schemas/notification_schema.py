@@ -0,0 +1,26 @@
+from builtins import float, int, str
+from datetime import datetime
+from typing import Dict, Literal, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+from app.models.notification_job_model import NotificationJobStatus
+from app.schemas.batch_schema import UserBatchFilter
+
+
+class NotificationJobCreate(BaseModel):
+    email_type: Literal["announcement", "professional_status_update"] = Field(..., example="announcement")
+    filter: Optional[UserBatchFilter] = Field(None, description="Recipients to notify; omit to notify every user.", example={"is_professional": True})
+    context: Dict[str, str] = Field(default={}, description="Template variables shared by every message.", example={"message": "Our privacy policy has changed."})
+
+
+class NotificationJobResponse(BaseModel):
+    id: UUID
+    email_type: str = Field(..., example="announcement")
+    status: NotificationJobStatus = Field(..., example="RUNNING")
+    sent_count: int = Field(..., example=1200)
+    failed_count: int = Field(..., example=3)
+    throughput_per_second: float = Field(..., description="Messages sent per second since the job started.", example=9.8)
+    last_error: Optional[str] = Field(None, example="jane@example.com: Connection refused")
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
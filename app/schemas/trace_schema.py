@@ -0,0 +1,28 @@
+from builtins import float, int, str
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class SpanResponse(BaseModel):
+    span_id: int
+    parent_id: Optional[int] = None
+    name: str = Field(..., example="security.verify_password")
+    start_ms: float = Field(..., description="Offset from the start of the request.", example=12.4)
+    duration_ms: float = Field(..., example=210.7)
+    attributes: Dict[str, Any] = {}
+
+
+class TraceResponse(BaseModel):
+    trace_id: str = Field(..., description="Same as the request's X-Request-ID.", example="5f0c6a1e9b2d4c7f8a3e1d2c4b5a6f70")
+    name: str = Field(..., example="POST /login/")
+    started_at: float = Field(..., description="Unix time the request started.")
+    duration_ms: float = Field(..., example=243.9)
+    status_code: Optional[int] = Field(None, example=200)
+    dropped_spans: int = 0
+    spans: List[SpanResponse] = []
+
+
+class TraceListResponse(BaseModel):
+    recorded: int = Field(..., description="Requests traced since the worker started.")
+    kept: int = Field(..., description="Traces kept by tail sampling.")
+    traces: List[TraceResponse]
@@ -1,49 +1,68 @@
-from typing import ClassVar
-from builtins import ValueError, any, bool, str
+from typing import Annotated, Any, ClassVar
+from builtins import ValueError, any, bool, dict, float, frozenset, isinstance, len, str
 from urllib.parse import urlparse
-from pydantic import BaseModel, EmailStr, Field, validator, root_validator
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, Field, ValidationInfo, field_validator, model_validator
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 import uuid
 import re
 from app.models.user_model import UserRole
-from app.utils.nickname_gen import generate_nickname
+
+# Compiled once at import. Length and nickname pattern constraints are declared on the fields,
+# so pydantic-core checks them before any of the Python validators below run.
+URL_PATTERN = re.compile(r'^https?:\/\/[^\s/$.?#].[^\s]*$')
+NAME_PATTERN = re.compile(r"^[a-zA-Z\s'-]+$")
+PASSWORD_UPPERCASE = re.compile("[A-Z]")
+PASSWORD_LOWERCASE = re.compile("[a-z]")
+PASSWORD_DIGIT = re.compile(r"\d")
+PASSWORD_SPECIAL = re.compile("[!@#$%^&*(),.?\":{}|<>]")
+ALLOWED_EMAIL_SUFFIXES = (".com", ".org", ".edu", ".net", ".gov")
+RESERVED_NICKNAMES = frozenset({"admin", "moderator", "null", "manager", "anonymous", "authenticated"})
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
 
 
 def validate_url(url: Optional[str]) -> Optional[str]:
     if url is None:
         return url
-    url_regex = r'^https?:\/\/[^\s/$.?#].[^\s]*$'
-    if not re.match(url_regex, url):
+    if not URL_PATTERN.match(url):
         raise ValueError('Invalid URL format')
     return url
 
+
+def require_any_value(data: Any) -> Any:
+    """Shared `mode="before"` check for partial updates: reject a payload whose values are all empty."""
+    if isinstance(data, dict) and not any(data.values()):
+        raise ValueError("At least one field must be provided for update")
+    return data
+
+
+Url = Annotated[Optional[str], AfterValidator(validate_url)]
+
+
 class UserBase(BaseModel):
     email: EmailStr = Field(..., example="john.doe@example.com", max_length=255)
-    nickname: Optional[str] = Field(None, min_length=3, max_length=50, pattern=r'^[\w-]+$', example=generate_nickname())
+    nickname: Optional[str] = Field(None, min_length=3, max_length=50, pattern=r'^[\w-]+$', example="clever_panda_123")
     first_name: Optional[str] = Field(None, max_length=100, example="John")
     last_name: Optional[str] = Field(None, max_length=100, example="Doe")
     bio: Optional[str] = Field(None, max_length=500, example="Experienced software developer specializing in web applications.")
-    profile_picture_url: Optional[str] = Field(None, max_length=255, example="https://example.com/profiles/john.jpg")
-    linkedin_profile_url: Optional[str] = Field(None, max_length=255, example="https://linkedin.com/in/johndoe")
-    github_profile_url: Optional[str] = Field(None, max_length=255, example="https://github.com/johndoe")
+    profile_picture_url: Url = Field(None, max_length=255, example="https://example.com/profiles/john.jpg")
+    linkedin_profile_url: Url = Field(None, max_length=255, example="https://linkedin.com/in/johndoe")
+    github_profile_url: Url = Field(None, max_length=255, example="https://github.com/johndoe")
     role: UserRole
 
-    _validate_urls = validator('profile_picture_url', 'linkedin_profile_url', 'github_profile_url', pre=True, allow_reuse=True)(validate_url)
- 
-    @validator('email')
-    def validate_email(cls, v):
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_validator('email')
+    @classmethod
+    def validate_email(cls, v: str) -> str:
         # Normalize the email to lowercase
         normalized_email = v.lower()
         # Check if the email ends with one of the allowed TLDs
-        if not re.search(r"\.(com|org|edu|net|gov)$", normalized_email):
+        if not normalized_email.endswith(ALLOWED_EMAIL_SUFFIXES):
             raise ValueError("Email must end with one of the following domains: .com, .org, .edu, .net, .gov")
         return normalized_email
 
-    class Config:
-        from_attributes = True
-
 class UserCreate(UserBase):
     password: str = Field(..., example="Secure*1234")
 
@@ -51,17 +70,18 @@ class UserCreate(UserBase):
     min_length: ClassVar[int] = 8
     max_length: ClassVar[int] = 50
 
-    @validator('password')
-    def password_validation(cls, value):
+    @field_validator('password')
+    @classmethod
+    def password_validation(cls, value: str) -> str:
         if len(value) < cls.min_length or len(value) > cls.max_length:
             raise ValueError(f'Password must be between {cls.min_length} and {cls.max_length} characters')
-        if not re.search("[A-Z]", value):
+        if not PASSWORD_UPPERCASE.search(value):
             raise ValueError('Password must contain at least one uppercase letter')
-        if not re.search("[a-z]", value):
+        if not PASSWORD_LOWERCASE.search(value):
             raise ValueError('Password must contain at least one lowercase letter')
-        if not re.search(r"\d", value):
+        if not PASSWORD_DIGIT.search(value):
             raise ValueError('Password must contain at least one digit')
-        if not re.search("[!@#$%^&*(),.?\":{}|<>]", value):
+        if not PASSWORD_SPECIAL.search(value):
             raise ValueError('Password must contain at least one special character')
         if " " in value:
             raise ValueError('Password must not contain spaces')
@@ -78,16 +98,12 @@ class UserUpdate(BaseModel):
     github_profile_url: Optional[str] = Field(None, example="https://github.com/johndoe")
     role: Optional[str] = Field(None, example="AUTHENTICATED")
 
-    @root_validator(pre=True)
-    def check_at_least_one_value(cls, values):
-        if not any(values.values()):
-            raise ValueError("At least one field must be provided for update")
-        return values
+    _check_at_least_one_value = model_validator(mode="before")(require_any_value)
 
 class UserResponse(UserBase):
-    id: uuid.UUID = Field(..., example=uuid.uuid4())
+    id: uuid.UUID = Field(..., example="3fa85f64-5717-4562-b3fc-2c963f66afa6")
     email: EmailStr = Field(..., example="john.doe@example.com")
-    nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example=generate_nickname())    
+    nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example="clever_panda_123")    
     is_professional: Optional[bool] = Field(default=False, example=True)
     role: UserRole
 
@@ -101,7 +117,7 @@ class ErrorResponse(BaseModel):
 
 class UserListResponse(BaseModel):
     items: List[UserResponse] = Field(..., example=[{
-        "id": uuid.uuid4(), "nickname": generate_nickname(), "email": "john.doe@example.com",
+        "id": "3fa85f64-5717-4562-b3fc-2c963f66afa6", "nickname": "clever_panda_123", "email": "john.doe@example.com",
         "first_name": "John", "bio": "Experienced developer", "role": "AUTHENTICATED",
         "last_name": "Doe", "bio": "Experienced developer", "role": "AUTHENTICATED",
         "profile_picture_url": "https://example.com/profiles/john.jpg", 
@@ -112,9 +128,24 @@ class UserListResponse(BaseModel):
     page: int = Field(..., example=1)
     size: int = Field(..., example=10)
 
+class UserSearchResult(UserResponse):
+    score: float = Field(..., description="How closely the best matching field matches the query, from 0 to 1.", example=0.8)
+
+class UserSearchResponse(BaseModel):
+    items: List[UserSearchResult] = Field(..., description="Best match first.")
+
+class UserSuggestion(BaseModel):
+    id: uuid.UUID = Field(..., example="3fa85f64-5717-4562-b3fc-2c963f66afa6")
+    nickname: str = Field(..., example="clever_panda_123")
+    email: EmailStr = Field(..., example="john.doe@example.com")
+    model_config = ConfigDict(from_attributes=True)
+
+class UserSuggestResponse(BaseModel):
+    items: List[UserSuggestion]
+
 # New Feature: class for updating user profile
 class UserUpdateProfile(BaseModel):
-    nickname: Optional[str] = Field(None, min_length=3, max_length=50, pattern=r'^[\w-]+$', example=generate_nickname())
+    nickname: Optional[str] = Field(None, min_length=3, max_length=50, pattern=r'^[\w-]+$', example="clever_panda_123")
     first_name: Optional[str] = Field(None, max_length=100, example="John")
     last_name: Optional[str] = Field(None, max_length=100, example="Doe")
     bio: Optional[str] = Field(None, max_length=500, example="Experienced software developer specializing in web applications.")
@@ -122,61 +153,55 @@ class UserUpdateProfile(BaseModel):
     linkedin_profile_url: Optional[str] = Field(None, max_length=255, example="https://linkedin.com/in/johndoe")
     github_profile_url: Optional[str] = Field(None, max_length=255, example="https://github.com/johndoe")
 
-    @root_validator(pre=True)
-    def check_at_least_one_value(cls, values):
-        if not any(values.values()):
-            raise ValueError("At least one field must be provided for update")
-        return values
-
-    @validator('nickname', pre=True, always=True)
-    def validate_nickname(cls, v):
-        if v is not None:
-            reserved_keywords = {"admin", "moderator", "null", "manager", "anonymous", "authenticated"}
-            if v.lower() in reserved_keywords:
-                raise ValueError("This nickname is reserved and cannot be used.")
-        return v
+    _check_at_least_one_value = model_validator(mode="before")(require_any_value)
 
-    @validator('first_name')
-    def validate_first_name(cls, v):
-        if v and not re.match(r"^[a-zA-Z\s'-]+$", v):
-            raise ValueError("First name can only contain letters, spaces, hyphens, or apostrophes.")
+    @field_validator('nickname')
+    @classmethod
+    def validate_nickname(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and v.lower() in RESERVED_NICKNAMES:
+            raise ValueError("This nickname is reserved and cannot be used.")
         return v
 
-    @validator('last_name')
-    def validate_last_name(cls, v):
-        if v and not re.match(r"^[a-zA-Z\s'-]+$", v):
-            raise ValueError("Last name can only contain letters, spaces, hyphens, or apostrophes.")
+    @field_validator('first_name', 'last_name')
+    @classmethod
+    def validate_name(cls, v: Optional[str], info: ValidationInfo) -> Optional[str]:
+        if v and not NAME_PATTERN.match(v):
+            label = "First name" if info.field_name == "first_name" else "Last name"
+            raise ValueError(f"{label} can only contain letters, spaces, hyphens, or apostrophes.")
         return v
 
-    @validator('profile_picture_url', pre=True, always=True)
-    def validate_profile_picture_url(cls, v):
+    @field_validator('profile_picture_url')
+    @classmethod
+    def validate_profile_picture_url(cls, v: Optional[str]) -> Optional[str]:
         if v is None:
             return v  # If the URL is optional, allow None values
         parsed_url = urlparse(v)
-        if not re.search(r"\.(jpg|jpeg|png)$", parsed_url.path):
+        if not parsed_url.path.endswith(IMAGE_EXTENSIONS):
             raise ValueError("Profile picture URL must point to a valid image file (JPEG, PNG).")
-        if parsed_url.scheme not in ['http', 'https']:
+        if parsed_url.scheme not in ('http', 'https'):
             raise ValueError("Profile picture URL must use http or https.")
         return v
 
-    @validator('linkedin_profile_url', pre=True, always=True)
-    def validate_linkedin_profile_url(cls, v):
+    @field_validator('linkedin_profile_url')
+    @classmethod
+    def validate_linkedin_profile_url(cls, v: Optional[str]) -> Optional[str]:
         if v is None:
             return v
         parsed_url = urlparse(v)
-        if parsed_url.scheme not in ['http', 'https']:
+        if parsed_url.scheme not in ('http', 'https'):
             raise ValueError("LinkedIn profile URL must use http or https.")
         if parsed_url.netloc != "linkedin.com" or not parsed_url.path.startswith("/in/"):
             raise ValueError("Invalid LinkedIn profile URL format.")
         return v
 
-    @validator('github_profile_url', pre=True, always=True)
-    def validate_github_profile_url(cls, v):
+    @field_validator('github_profile_url')
+    @classmethod
+    def validate_github_profile_url(cls, v: Optional[str]) -> Optional[str]:
         if v is None:
             return v
         parsed_url = urlparse(v)
-        if parsed_url.scheme not in ['http', 'https']:
+        if parsed_url.scheme not in ('http', 'https'):
             raise ValueError("GitHub profile URL must use http or https.")
         if parsed_url.netloc != "github.com":
             raise ValueError("Invalid GitHub profile URL format.")
-        return v
\ No newline at end of file
+        return v
@@ -0,0 +1,19 @@
+from builtins import int, str
+from datetime import date
+from typing import Dict, List
+from pydantic import BaseModel, Field
+
+
+class DailySignupsResponse(BaseModel):
+    date: date
+    count: int = Field(..., example=12)
+
+
+class UserStatsResponse(BaseModel):
+    total: int = Field(..., example=1250)
+    by_role: Dict[str, int] = Field(..., example={"ANONYMOUS": 300, "AUTHENTICATED": 900, "MANAGER": 45, "ADMIN": 5})
+    verified: int = Field(..., example=950)
+    unverified: int = Field(..., example=300)
+    locked: int = Field(..., example=7)
+    professional: int = Field(..., example=120)
+    daily_signups: List[DailySignupsResponse] = Field(..., description="Registrations per UTC day, oldest first, including days with none.")
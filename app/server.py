@@ -0,0 +1,79 @@
+"""
+Production entry point: a Gunicorn master supervising Uvicorn workers.
+
+    python -m app.server
+
+The app is built once in the master before forking (`preload_app`), so workers share its
+imported modules copy-on-write; database pools are still opened per worker at startup. Workers
+use uvloop and httptools when they are installed and fall back to asyncio and h11 otherwise.
+Each worker is recycled after a jittered number of requests to cap memory growth, and on
+SIGTERM workers stop accepting connections and get `web_graceful_timeout` seconds to finish
+in-flight requests. The worker's signal handler marks it draining at once (Uvicorn workers
+replace Gunicorn's signal handling, so Gunicorn's `worker_int` hook never sees SIGTERM); the
+application lifespan then drains notification jobs within `shutdown_drain_seconds` and closes
+the database pool (see `app.lifecycle`).
+"""
+from builtins import int, len, max, min, open, str
+from typing import Any, Dict, Optional
+import math
+import os
+from gunicorn.app.base import BaseApplication
+from settings.config import Settings, get_settings
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity masks and cgroup v2 CPU quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def worker_count(settings: Settings) -> int:
+    """Configured worker count, or one worker per available CPU when set to 0."""
+    return settings.web_workers if settings.web_workers > 0 else available_cpus()
+
+
+def gunicorn_options(settings: Optional[Settings] = None) -> Dict[str, Any]:
+    settings = settings or get_settings()
+    return {
+        "bind": f"{settings.web_host}:{settings.web_port}",
+        "workers": worker_count(settings),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": settings.web_worker_max_requests,
+        "max_requests_jitter": settings.web_worker_max_requests_jitter,
+        "timeout": settings.web_worker_timeout,
+        "graceful_timeout": settings.web_graceful_timeout,
+        "keepalive": settings.web_keepalive,
+    }
+
+
+class ProductionServer(BaseApplication):
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import create_app
+        return create_app()
+
+
+def main():
+    ProductionServer(gunicorn_options()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# app/services/archival_service.py
+from builtins import bool, classmethod, int, len, max, round, staticmethod, sum
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import asyncio
+import logging
+import time
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from settings.config import get_settings
+from app.database import Database
+from app.models.archived_user_model import ArchivedUser
+from app.models.user_model import User, UserRole
+from app.services.user_service import UserService
+from app.services.user_stats_service import TRACKED_COLUMNS, UserStatsService, deleted_counters
+
+logger = logging.getLogger(__name__)
+
+# Every column of `users`, copied unchanged into `archived_users`.
+ARCHIVED_COLUMNS = [column.name for column in User.__table__.columns]
+
+
+class ArchivalService:
+    """
+    Moves registrations that were never verified out of `users` into `archived_users`.
+
+    Candidates are anonymous, unverified accounts created before a cutoff. They are moved in
+    keyset order by id, a batch per short transaction: one `WITH ... DELETE ... RETURNING`
+    statement feeds the deleted rows straight into the archive insert. Rows another transaction
+    holds are skipped rather than waited for (`FOR UPDATE SKIP LOCKED`), every batch runs under
+    a `lock_timeout`, and the job pauses between batches, so it never blocks regular traffic for
+    long. A run stops after `archive_max_batches`; the next run picks up the rest.
+
+    A short batch does not mean the run is done: rows skipped because they were locked are left
+    behind the keyset cursor. A run only reports `complete` once a count of the remaining
+    candidates comes back 0. Candidates are found through the partial index
+    `ix_users_unverified_created_at`, which holds only anonymous unverified accounts.
+    """
+
+    @staticmethod
+    def _is_candidate(cutoff: datetime) -> List[Any]:
+        # Must keep implying the predicate of ix_users_unverified_created_at, or the index goes unused.
+        return [User.role == UserRole.ANONYMOUS, User.email_verified.is_(False), User.created_at < cutoff]
+
+    @classmethod
+    def _candidates(cls, cutoff: datetime, after: Optional[UUID], limit: int):
+        query = select(User.id).where(*cls._is_candidate(cutoff))
+        if after is not None:
+            query = query.where(User.id > after)
+        return query.order_by(User.id).limit(limit)
+
+    @classmethod
+    def _move_statement(cls, cutoff: datetime, after: Optional[UUID], limit: int):
+        """`WITH batch AS (SELECT ... FOR UPDATE SKIP LOCKED), moved AS (DELETE ... RETURNING *) INSERT ... SELECT FROM moved`."""
+        batch = cls._candidates(cutoff, after, limit).with_for_update(skip_locked=True).cte("batch")
+        moved = (
+            delete(User.__table__)
+            .where(User.__table__.c.id.in_(select(batch.c.id)))
+            .returning(*User.__table__.columns)
+            .cte("moved")
+        )
+        return (
+            insert(ArchivedUser.__table__)
+            .from_select(ARCHIVED_COLUMNS, select(*[moved.c[name] for name in ARCHIVED_COLUMNS]))
+            # The id for keyset paging, and what the user counters need to drop the moved rows.
+            .returning(ArchivedUser.__table__.c.id, *[ArchivedUser.__table__.c[column.name] for column in TRACKED_COLUMNS])
+            .add_cte(moved)
+        )
+
+    @classmethod
+    async def archive_unverified(cls, session_factory=None, older_than_days: Optional[int] = None, dry_run: bool = False,
+                                 batch_size: Optional[int] = None, max_batches: Optional[int] = None,
+                                 pause_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Archive stale unverified users and report what was moved.
+
+        With `dry_run` the same batches are selected but nothing is changed or locked. Returns
+        `{"dry_run", "cutoff", "rows", "batches": [{"rows", "duration_ms"}], "duration_ms", "remaining", "complete"}`.
+        `remaining` counts the candidates left after a real run (None in a dry run), and `complete`
+        is True only when none are.
+        """
+        settings = get_settings()
+        session_factory = session_factory or Database.get_session_factory()
+        older_than_days = older_than_days if older_than_days is not None else settings.archive_unverified_after_days
+        batch_size = batch_size or settings.archive_batch_size
+        max_batches = max_batches or settings.archive_max_batches
+        pause_seconds = settings.archive_batch_pause_seconds if pause_seconds is None else pause_seconds
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+
+        batches: List[Dict[str, Any]] = []
+        after: Optional[UUID] = None
+        complete = False
+        remaining: Optional[int] = None
+        started = time.perf_counter()
+        while len(batches) < max_batches:
+            batch_started = time.perf_counter()
+            try:
+                ids = await cls._run_batch(session_factory, cutoff, after, batch_size, dry_run, settings.archive_lock_timeout_ms)
+            except SQLAlchemyError as e:
+                logger.error("Archival batch %d failed, stopping: %s", len(batches) + 1, e)
+                break
+            duration_ms = (time.perf_counter() - batch_started) * 1000
+            if ids:
+                batches.append({"rows": len(ids), "duration_ms": round(duration_ms, 1)})
+                logger.info(
+                    "%s %d unverified users in %.1f ms (batch %d).",
+                    "Would archive" if dry_run else "Archived", len(ids), duration_ms, len(batches),
+                )
+                after = max(ids)
+            if len(ids) < batch_size:
+                complete = True
+                break
+            if not dry_run and pause_seconds > 0:
+                await asyncio.sleep(pause_seconds)
+
+        if not dry_run:
+            # Locked rows were skipped, not archived; only a count says whether any are left.
+            try:
+                remaining = await cls._count_candidates(session_factory, cutoff)
+            except SQLAlchemyError as e:
+                logger.error("Could not count the remaining archival candidates: %s", e)
+            complete = remaining == 0
+
+        rows = sum(batch["rows"] for batch in batches)
+        logger.info("Archival %s: %d users older than %s in %d batches.", "dry run" if dry_run else "run", rows, cutoff.isoformat(), len(batches))
+        return {
+            "dry_run": dry_run,
+            "cutoff": cutoff,
+            "rows": rows,
+            "batches": batches,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "remaining": remaining,
+            "complete": complete,
+        }
+
+    @classmethod
+    async def _count_candidates(cls, session_factory, cutoff: datetime) -> int:
+        async with session_factory() as session:
+            return await session.scalar(select(func.count()).select_from(User).where(*cls._is_candidate(cutoff)))
+
+    @classmethod
+    async def _run_batch(cls, session_factory, cutoff: datetime, after: Optional[UUID], batch_size: int,
+                         dry_run: bool, lock_timeout_ms: int) -> List[UUID]:
+        """One batch in its own transaction; the ids moved (or, in a dry run, that would be)."""
+        async with session_factory() as session:
+            if dry_run:
+                result = await session.execute(cls._candidates(cutoff, after, batch_size))
+                return result.scalars().all()
+            async with session.begin():
+                await session.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+                result = await session.execute(cls._move_statement(cutoff, after, batch_size))
+                rows = result.all()
+                await UserStatsService.apply(session, deleted_counters(rows))
+                ids = [row.id for row in rows]
+        for user_id in ids:
+            UserService.cache.invalidate(user_id)
+            UserService.suggest_index.remove(user_id)
+        if ids:
+            UserService.list_cache.invalidate_all()
+        return ids
@@ -1,36 +1,46 @@
 # email_service.py
 from builtins import ValueError, dict, str
-from settings.config import settings
+from typing import Tuple
+from settings.config import get_settings
 from app.utils.smtp_connection import SMTPClient
 from app.utils.template_manager import TemplateManager
+from app.utils.tracing import span
 from app.models.user_model import User
 
 class EmailService:
+    subject_map = {
+        'email_verification': "Verify Your Account",
+        'password_reset': "Password Reset Instructions",
+        'account_locked': "Account Locked Notification",
+        'professional_status_update': "Professional Status Update Notification",
+        'announcement': "Announcement"
+    }
+
     def __init__(self, template_manager: TemplateManager):
+        settings = get_settings()
         self.smtp_client = SMTPClient(
             server=settings.smtp_server,
             port=settings.smtp_port,
             username=settings.smtp_username,
-            password=settings.smtp_password
+            password=settings.smtp_password,
+            timeout=settings.smtp_timeout_seconds,
         )
         self.template_manager = template_manager
 
-    async def send_user_email(self, user_data: dict, email_type: str):
-        subject_map = {
-            'email_verification': "Verify Your Account",
-            'password_reset': "Password Reset Instructions",
-            'account_locked': "Account Locked Notification",
-            'professional_status_update': "Professional Status Update Notification"
-        }
-
-        if email_type not in subject_map:
+    def render_user_email(self, user_data: dict, email_type: str) -> Tuple[str, str]:
+        """Return the subject and rendered HTML body for an email without sending it."""
+        if email_type not in self.subject_map:
             raise ValueError("Invalid email type")
+        return self.subject_map[email_type], self.template_manager.render_template(email_type, **user_data)
 
-        html_content = self.template_manager.render_template(email_type, **user_data)
-        self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
+    async def send_user_email(self, user_data: dict, email_type: str):
+        with span("email.render", email_type=email_type):
+            subject, html_content = self.render_user_email(user_data, email_type)
+        with span("email.smtp_send"):
+            self.smtp_client.send_email(subject, html_content, user_data['email'])
 
     async def send_verification_email(self, user: User):
-        verification_url = f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}"
+        verification_url = f"{get_settings().server_base_url}verify-email/{user.id}/{user.verification_token}"
         await self.send_user_email({
             "name": user.first_name,
             "verification_url": verification_url,
@@ -0,0 +1,131 @@
+# app/services/idempotency_service.py
+from builtins import Exception, bool, classmethod, getattr, int, str
+from datetime import timedelta
+from typing import List, Optional
+import logging
+from sqlalchemy import Row, delete, func, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.database import Database
+from app.models.idempotency_key_model import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE lock_not_available, raised when `lock_timeout` runs out.
+LOCK_NOT_AVAILABLE = "55P03"
+# Expired keys deleted per statement by `purge`.
+PURGE_BATCH = 10000
+
+
+class IdempotencyKeyBusy(Exception):
+    """Another request holding the same key did not finish within the wait."""
+
+
+class IdempotencyService:
+    """
+    Claims and stored responses for `Idempotency-Key` headers, shared by every worker through
+    the `idempotency_keys` table.
+
+    `claim` runs in the caller's transaction, so the claim commits or rolls back with the
+    request's own first commit. A duplicate claiming the same key meanwhile waits on the
+    uncommitted row inside Postgres (up to the lock timeout) and then finds it taken.
+    """
+
+    @classmethod
+    async def claim(cls, session: AsyncSession, scope: str, key: str, fingerprint: str,
+                    lease_seconds: float, lock_timeout_ms: int) -> bool:
+        """
+        Insert the key for this request; True if it is now ours. An expired row (a stored response
+        past its TTL, or a lease whose request never finished) is taken over in the same statement.
+        The row is left uncommitted for the request to commit. Raises IdempotencyKeyBusy when
+        another transaction holds the key for longer than `lock_timeout_ms`.
+        """
+        statement = insert(IdempotencyKey).values(
+            scope=scope, key=key, fingerprint=fingerprint, expires_at=func.now() + timedelta(seconds=lease_seconds),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+            set_={
+                "fingerprint": statement.excluded.fingerprint,
+                "status_code": None,
+                "response_headers": None,
+                "response_body": None,
+                "created_at": func.now(),
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at <= func.now(),
+        ).returning(IdempotencyKey.key)
+        try:
+            await session.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+            claimed = (await session.execute(statement)).first() is not None
+            await session.execute(text("SET LOCAL lock_timeout TO DEFAULT"))
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE:
+                raise
+            await session.rollback()
+            raise IdempotencyKeyBusy(key) from e
+        return claimed
+
+    @classmethod
+    async def get(cls, session: AsyncSession, scope: str, key: str) -> Optional[Row]:
+        """The key's fingerprint and stored response as a plain row, which outlives the caller's transaction."""
+        result = await session.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response_headers, IdempotencyKey.response_body)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        )
+        return result.first()
+
+    @classmethod
+    async def store(cls, engine: AsyncEngine, scope: str, key: str, status_code: int, headers: List[List[str]],
+                    body: bytes, ttl_seconds: float) -> bool:
+        """Save the response of a claimed key, to be replayed for `ttl_seconds`; False if the claim was never committed."""
+        try:
+            async with AsyncSession(engine) as session:
+                result = await session.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+                    .values(status_code=status_code, response_headers=headers, response_body=body,
+                            expires_at=func.now() + timedelta(seconds=ttl_seconds))
+                )
+                await session.commit()
+                return result.rowcount > 0
+        except SQLAlchemyError as e:
+            logger.error("Could not store the response for idempotency key %r: %s", key, e)
+            return False
+
+    @classmethod
+    async def release(cls, engine: AsyncEngine, scope: str, key: str) -> None:
+        """Drop a claim whose request failed, so a retry runs it again."""
+        try:
+            async with AsyncSession(engine) as session:
+                await session.execute(
+                    delete(IdempotencyKey)
+                    .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+                )
+                await session.commit()
+        except SQLAlchemyError as e:
+            logger.error("Could not release idempotency key %r: %s", key, e)
+
+    @classmethod
+    async def purge(cls, session_factory=None) -> int:
+        """Delete expired keys, `PURGE_BATCH` per transaction; the number deleted."""
+        session_factory = session_factory or Database.get_session_factory()
+        expired = (
+            select(IdempotencyKey.scope, IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at < func.now())
+            .limit(PURGE_BATCH)
+        )
+        deleted = 0
+        while True:
+            async with session_factory() as session:
+                result = await session.execute(
+                    delete(IdempotencyKey).where(tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_(expired))
+                )
+                await session.commit()
+            deleted += result.rowcount
+            if result.rowcount < PURGE_BATCH:
+                break
+        if deleted:
+            logger.info("Purged %d expired idempotency keys.", deleted)
+        return deleted
@@ -1,20 +1,23 @@
 # app/services/jwt_service.py
 from builtins import dict, str
-import jwt
 from datetime import datetime, timedelta
-from settings.config import settings
+from settings.config import get_settings
 
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
+    import jwt  # Deferred: PyJWT pulls in cryptography (and bcrypt) on import.
     to_encode = data.copy()
     # Convert role to uppercase before encoding the JWT
     if 'role' in to_encode:
         to_encode['role'] = to_encode['role'].upper()
+    settings = get_settings()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 def decode_token(token: str):
+    import jwt
+    settings = get_settings()
     try:
         decoded = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         return decoded
@@ -0,0 +1,350 @@
+# app/services/notification_service.py
+from builtins import Exception, classmethod, dict, float, int, isinstance, len, max, range, set, str
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+import asyncio
+import logging
+import smtplib
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from settings.config import get_settings
+from app.database import Database
+from app.models.notification_job_model import NotificationJob, NotificationJobStatus
+from app.models.user_model import User
+from app.services.email_service import EmailService
+from app.utils.tracing import untraced
+
+logger = logging.getLogger(__name__)
+
+# (recipient, subject, html, error): subject and html for a rendered message, or None for both
+# and the exception that stopped rendering it.
+RenderedMessage = Tuple[str, Optional[str], Optional[str], Optional[Exception]]
+
+
+class RateLimiter:
+    """Spaces out `acquire` calls so that at most `rate` complete per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class NotificationService:
+    """
+    Bulk email fan-out to a filtered segment of users.
+
+    Recipients are read in keyset pages (`id > last id ORDER BY id LIMIT batch size`), each in
+    its own short transaction. Each batch is rendered in worker threads while the previous batch
+    is being sent over a small set of reused SMTP connections, and progress is checkpointed
+    after every batch so a restarted job resumes where it stopped. A separate task refreshes the
+    job's heartbeat every `notification_heartbeat_seconds`, so a slow batch (a throttled rate,
+    an SMTP server that stalls) never makes a live job look abandoned.
+    """
+    _tasks: Set[asyncio.Task] = set()
+    _accepting = True
+
+    @classmethod
+    async def create_job(cls, session: AsyncSession, email_type: str, filters: Dict[str, Any], context: Dict[str, str]) -> NotificationJob:
+        job = NotificationJob(email_type=email_type, filters=filters, context=context, status=NotificationJobStatus.PENDING)
+        session.add(job)
+        await session.commit()
+        return job
+
+    @classmethod
+    async def get_job(cls, session: AsyncSession, job_id: UUID) -> Optional[NotificationJob]:
+        result = await session.execute(select(NotificationJob).where(NotificationJob.id == job_id).execution_options(populate_existing=True))
+        return result.scalars().first()
+
+    @classmethod
+    async def claim_job(cls, session: AsyncSession, job_id: UUID) -> bool:
+        """
+        Atomically mark a job as running if no live worker owns it.
+
+        Pending and failed jobs can always be claimed; running jobs only once their heartbeat
+        is older than `notification_job_stale_seconds`, so two workers never run the same job.
+        """
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=get_settings().notification_job_stale_seconds)
+        query = (
+            update(NotificationJob)
+            .where(
+                NotificationJob.id == job_id,
+                or_(
+                    NotificationJob.status.in_([NotificationJobStatus.PENDING, NotificationJobStatus.FAILED]),
+                    and_(
+                        NotificationJob.status == NotificationJobStatus.RUNNING,
+                        or_(NotificationJob.heartbeat_at.is_(None), NotificationJob.heartbeat_at < stale_before),
+                    ),
+                ),
+            )
+            .values(
+                status=NotificationJobStatus.RUNNING,
+                heartbeat_at=func.now(),
+                started_at=func.coalesce(NotificationJob.started_at, func.now()),
+                finished_at=None,
+                last_error=None,
+            )
+            .returning(NotificationJob.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(query)
+        claimed = result.first() is not None
+        await session.commit()
+        return claimed
+
+    @classmethod
+    def start(cls, job_id: UUID, email_service: EmailService, session_factory=None, claimed: bool = False) -> Optional[asyncio.Task]:
+        """
+        Run a job in the background of the current event loop; `claimed` if the caller already
+        claimed it with `claim_job`.
+
+        Returns None once the worker is draining; the job stays pending for the next worker to resume.
+        """
+        if not cls._accepting:
+            logger.info("Not starting notification job %s: worker is shutting down.", job_id)
+            return None
+        # Started by a request, but not part of its trace.
+        task = asyncio.create_task(untraced(cls.run_job(job_id, email_service, session_factory, claimed)))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+        return task
+
+    @classmethod
+    async def drain(cls, timeout: float) -> int:
+        """
+        Stop starting jobs and give running ones `timeout` seconds to finish.
+
+        Jobs still running at the deadline are cancelled and put back to pending, so the next
+        worker resumes them from their last checkpoint. Returns the number of jobs cancelled.
+        """
+        cls._accepting = False
+        if not cls._tasks:
+            return 0
+        _, unfinished = await asyncio.wait(set(cls._tasks), timeout=max(timeout, 0))
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        if unfinished:
+            logger.warning("Cancelled %d notification job(s) at the drain deadline.", len(unfinished))
+        return len(unfinished)
+
+    @classmethod
+    async def resume_stale_jobs(cls, email_service: EmailService, session_factory=None) -> List[UUID]:
+        """Restart pending jobs and running jobs whose worker stopped checkpointing."""
+        session_factory = session_factory or Database.get_session_factory()
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=get_settings().notification_job_stale_seconds)
+        async with session_factory() as session:
+            result = await session.execute(
+                select(NotificationJob.id).where(or_(
+                    NotificationJob.status == NotificationJobStatus.PENDING,
+                    and_(NotificationJob.status == NotificationJobStatus.RUNNING, NotificationJob.heartbeat_at < stale_before),
+                ))
+            )
+            job_ids = result.scalars().all()
+        for job_id in job_ids:
+            cls.start(job_id, email_service, session_factory)
+        return job_ids
+
+    @classmethod
+    async def run_job(cls, job_id: UUID, email_service: EmailService, session_factory=None, claimed: bool = False) -> Optional[NotificationJob]:
+        """Claim (unless already `claimed`) and run a job to completion. Returns None if another worker owns it."""
+        session_factory = session_factory or Database.get_session_factory()
+        async with session_factory() as session:
+            if not claimed and not await cls.claim_job(session, job_id):
+                logger.info("Notification job %s is already running elsewhere.", job_id)
+                return None
+            job = await cls.get_job(session, job_id)
+            limiter = RateLimiter(get_settings().notification_rate_per_second)
+            connections: List[Optional[smtplib.SMTP]] = [None] * max(1, get_settings().notification_smtp_connections)
+            queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+            producer = asyncio.create_task(cls._produce(session_factory, job, email_service, queue))
+            heartbeat = asyncio.create_task(cls._heartbeat(session_factory, job_id, get_settings().notification_heartbeat_seconds))
+            try:
+                try:
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        last_user_id, messages = item
+                        sent, failed, last_error = await cls._send_batch(email_service, connections, limiter, messages)
+                        await cls._checkpoint(session, job_id, last_user_id, sent, failed, last_error)
+                finally:
+                    # Stop beating before the job is finished or handed back, never after.
+                    heartbeat.cancel()
+                    await asyncio.gather(heartbeat, return_exceptions=True)
+                await cls._finish(session, job_id, NotificationJobStatus.COMPLETED)
+            except asyncio.CancelledError:
+                # Shutting down: hand the job back so another worker resumes it straight away.
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+                await session.rollback()
+                await cls.release_job(session, job_id)
+                raise
+            except Exception as e:
+                logger.error("Notification job %s failed: %s", job_id, e)
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+                await session.rollback()
+                await cls._finish(session, job_id, NotificationJobStatus.FAILED, str(e)[:500])
+            finally:
+                await asyncio.to_thread(cls._close_connections, connections)
+            return await cls.get_job(session, job_id)
+
+    @classmethod
+    async def _heartbeat(cls, session_factory, job_id: UUID, interval: float):
+        """Refresh the job's heartbeat every `interval` seconds while it runs, on a session of its own."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as session:
+                    await session.execute(
+                        update(NotificationJob)
+                        .where(NotificationJob.id == job_id, NotificationJob.status == NotificationJobStatus.RUNNING)
+                        .values(heartbeat_at=func.now())
+                        .execution_options(synchronize_session=False)
+                    )
+                    await session.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Could not refresh the heartbeat of notification job %s: %s", job_id, e)
+
+    @classmethod
+    async def _produce(cls, session_factory, job: NotificationJob, email_service: EmailService, queue: asyncio.Queue):
+        """Read recipients after the job's cursor one keyset page at a time and queue them rendered."""
+        batch_size = get_settings().notification_batch_size
+        filters = dict(job.filters)
+        user_ids = filters.pop("ids", None)
+        query = (
+            select(User.id, User.email, User.first_name, User.is_professional)
+            .filter_by(**filters)
+            .order_by(User.id)
+            .limit(batch_size)
+        )
+        if user_ids is not None:
+            query = query.where(User.id.in_([UUID(user_id) for user_id in user_ids]))
+        last_user_id = job.last_user_id
+        try:
+            while True:
+                page = query if last_user_id is None else query.where(User.id > last_user_id)
+                # A transaction per page: no cursor or snapshot is held open while batches are sent.
+                async with session_factory() as read_session:
+                    rows = (await read_session.execute(page)).all()
+                if not rows:
+                    break
+                messages = await asyncio.gather(*(
+                    asyncio.to_thread(cls._render, email_service, job.email_type, job.context, row) for row in rows
+                ))
+                last_user_id = rows[-1].id
+                await queue.put((last_user_id, messages))
+                if len(rows) < batch_size:
+                    break
+            await queue.put(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+
+    @staticmethod
+    def _render(email_service: EmailService, email_type: str, context: Dict[str, str], row) -> RenderedMessage:
+        try:
+            subject, html = email_service.render_user_email({
+                "name": row.first_name,
+                "email": row.email,
+                "professional_status": row.is_professional,
+                **context,
+            }, email_type)
+            return row.email, subject, html, None
+        except Exception as e:
+            return row.email, None, None, e
+
+    @classmethod
+    async def _send_batch(cls, email_service: EmailService, connections: List[Optional[smtplib.SMTP]],
+                          limiter: RateLimiter, messages: List[RenderedMessage]) -> Tuple[int, int, Optional[str]]:
+        """Send a batch, spreading messages across the reused connections. Returns (sent, failed, last error)."""
+        smtp_client = email_service.smtp_client
+        outcome = {"sent": 0, "failed": 0, "error": None}
+
+        def record_failure(recipient: str, error: Exception):
+            outcome["failed"] += 1
+            outcome["error"] = f"{recipient}: {error}"
+
+        async def sender(slot: int):
+            for recipient, subject, html, render_error in messages[slot::len(connections)]:
+                if render_error is not None:
+                    record_failure(recipient, render_error)
+                    continue
+                await limiter.acquire()
+                for attempt in range(2):
+                    try:
+                        if connections[slot] is None:
+                            connections[slot] = await asyncio.to_thread(smtp_client.connect)
+                        await asyncio.to_thread(smtp_client.send_email, subject, html, recipient, connections[slot])
+                        outcome["sent"] += 1
+                        break
+                    except smtplib.SMTPServerDisconnected as e:
+                        # The server dropped an idle connection; reconnect once before giving up.
+                        connections[slot] = None
+                        if attempt:
+                            record_failure(recipient, e)
+                    except Exception as e:
+                        record_failure(recipient, e)
+                        break
+
+        await asyncio.gather(*(sender(slot) for slot in range(len(connections))))
+        return outcome["sent"], outcome["failed"], outcome["error"]
+
+    @classmethod
+    async def _checkpoint(cls, session: AsyncSession, job_id: UUID, last_user_id: UUID, sent: int, failed: int, last_error: Optional[str]):
+        values = {
+            "last_user_id": last_user_id,
+            "sent_count": NotificationJob.sent_count + sent,
+            "failed_count": NotificationJob.failed_count + failed,
+            "heartbeat_at": func.now(),
+        }
+        if last_error:
+            values["last_error"] = last_error[:500]
+        await session.execute(update(NotificationJob).where(NotificationJob.id == job_id).values(**values).execution_options(synchronize_session=False))
+        await session.commit()
+
+    @classmethod
+    async def _finish(cls, session: AsyncSession, job_id: UUID, status: NotificationJobStatus, error: Optional[str] = None):
+        values = {"status": status, "finished_at": func.now()}
+        if error:
+            values["last_error"] = error
+        await session.execute(update(NotificationJob).where(NotificationJob.id == job_id).values(**values).execution_options(synchronize_session=False))
+        await session.commit()
+
+    @classmethod
+    async def release_job(cls, session: AsyncSession, job_id: UUID):
+        """Put a running job back to pending, for the next worker (or resume) to claim."""
+        await session.execute(
+            update(NotificationJob)
+            .where(NotificationJob.id == job_id, NotificationJob.status == NotificationJobStatus.RUNNING)
+            .values(status=NotificationJobStatus.PENDING, heartbeat_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    @staticmethod
+    def _close_connections(connections: List[Optional[smtplib.SMTP]]):
+        for connection in connections:
+            if connection is not None:
+                try:
+                    connection.quit()
+                except Exception:
+                    pass
@@ -0,0 +1,89 @@
+# app/services/response_cache.py
+from builtins import bytes, float, int, len
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+import time
+from settings.config import get_settings
+
+
+class ResponseCache:
+    """
+    Short-lived cache of serialised response bodies, for endpoints polled with the same parameters.
+
+    Entries are tagged with the generation current when their data was read. Any user write
+    bumps the generation (`invalidate_all`), which makes every existing entry stale at once
+    without touching them; stale and expired entries are dropped when next looked up. The
+    generation is per process; writes handled by another worker bump it when their change
+    notification arrives (`UserChangeListener`), and the short TTL bounds staleness whenever
+    that listener is not connected.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, bytes]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, body = entry
+                if generation == self.generation and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, body: bytes, generation: int) -> None:
+        """Store a body built from data read at `generation`; ignored if a write happened since."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (generation, time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_all(self) -> None:
+        self.generation += 1
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_settings = get_settings()
+list_users_cache = ResponseCache(
+    max_entries=_settings.list_cache_max_entries,
+    ttl=_settings.list_cache_ttl_seconds,
+    enabled=_settings.list_cache_enabled,
+)
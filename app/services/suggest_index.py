@@ -0,0 +1,205 @@
+# app/services/suggest_index.py
+from builtins import bool, dict, enumerate, int, len, list, round, sorted, staticmethod, str
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+import asyncio
+import logging
+import sys
+import time
+from sortedcontainers import SortedList
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from settings.config import get_settings
+from app.models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+# Separates the searchable key from the user id inside an entry. It sorts before any character a
+# nickname or email can hold, so "ann" is listed before "anna" as in plain string order.
+_SEPARATOR = "\x00"
+# Rows fetched per round trip while loading the index.
+_LOAD_CHUNK = 10000
+# Estimated bytes per user besides the characters of their nickname and email (each held twice,
+# lowercased in an entry and as given in the record): two entry strings with their list slots,
+# the id key string, the record tuple and its dict slot.
+_ENTRY_OVERHEAD = sys.getsizeof("") + len(_SEPARATOR) + 32 + 8
+_RECORD_OVERHEAD = sys.getsizeof(("", "")) + sys.getsizeof("0" * 32) + 2 * sys.getsizeof("") + 100
+
+
+class SuggestIndex:
+    """
+    Per-process prefix index over nicknames and emails, for typeahead.
+
+    Each field is a `SortedList` of `"<lowercased value>\\0<user id hex>"` strings: one object per
+    entry, kept in short sorted sublists, so adding or removing an entry under the lock costs
+    O(log n) rather than shifting a list of every user. A lookup is a binary search to the first
+    entry at or after the prefix, then a scan while entries still start with it, so it costs
+    microseconds whatever the number of users. Display values live in one dict keyed by id hex.
+
+    The index is loaded from `users` at startup (`rebuild`) and then kept current by the
+    `UserService` writes made in this process; writes made by other workers are only picked up
+    at the next rebuild, which the scheduler runs in every worker (`suggest_index_refresh_seconds`).
+    Writes that arrive while a rebuild is loading are replayed onto the new lists before they
+    replace the old ones.
+
+    Memory use is estimated as entries are added. When it would exceed `max_bytes` the index
+    is dropped and reports not ready, and suggestions come from the database instead.
+    """
+
+    def __init__(self, max_bytes: int, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.ready = False
+        self.over_budget = False
+        self.size_bytes = 0
+        self.built_at: Optional[float] = None
+        self.build_ms: Optional[float] = None
+        self.lookups = 0
+        self._nicknames: SortedList = SortedList()
+        self._emails: SortedList = SortedList()
+        self._records: Dict[str, Tuple[str, str]] = {}
+        self._pending: Optional[List[Tuple[str, Any]]] = None
+        self._lock = Lock()
+
+    @staticmethod
+    def _entry(value: str, key: str) -> str:
+        return f"{value.lower()}{_SEPARATOR}{key}"
+
+    @staticmethod
+    def _record_size(nickname: str, email: str) -> int:
+        return 2 * _ENTRY_OVERHEAD + _RECORD_OVERHEAD + 2 * (len(nickname) + len(email))
+
+    def _add(self, key: str, nickname: str, email: str) -> None:
+        self._remove(key)
+        self._records[key] = (nickname, email)
+        self._nicknames.add(self._entry(nickname, key))
+        self._emails.add(self._entry(email, key))
+        self.size_bytes += self._record_size(nickname, email)
+
+    def _remove(self, key: str) -> None:
+        record = self._records.pop(key, None)
+        if record is None:
+            return
+        nickname, email = record
+        self._nicknames.discard(self._entry(nickname, key))
+        self._emails.discard(self._entry(email, key))
+        self.size_bytes -= self._record_size(nickname, email)
+
+    def _check_budget(self) -> None:
+        if self.size_bytes > self.max_bytes:
+            logger.warning("Suggest index needs more than %d bytes; suggestions fall back to the database.", self.max_bytes)
+            self.ready, self.over_budget = False, True
+            self._nicknames, self._emails, self._records = SortedList(), SortedList(), {}
+            self.size_bytes = 0
+
+    def upsert(self, user_id: UUID, nickname: str, email: str) -> None:
+        """Add a user, or move them to their new nickname/email."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("upsert", (user_id.hex, nickname, email)))
+            if self.ready:
+                self._add(user_id.hex, nickname, email)
+                self._check_budget()
+
+    def remove(self, user_id: UUID) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("remove", user_id.hex))
+            if self.ready:
+                self._remove(user_id.hex)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Users whose nickname or email starts with `prefix` (case-insensitive), in key order, at most `limit`."""
+        prefix = prefix.lower()
+        matches: Dict[str, str] = {}
+        with self._lock:
+            self.lookups += 1
+            for entries in (self._nicknames, self._emails):
+                for found, entry in enumerate(entries.irange(minimum=prefix)):
+                    if found >= limit or not entry.startswith(prefix):
+                        break
+                    key, _, user_key = entry.rpartition(_SEPARATOR)
+                    matches.setdefault(user_key, key)
+            ranked = sorted(matches.items(), key=lambda match: (match[1], match[0]))[:limit]
+            return [
+                {"id": UUID(user_key), "nickname": self._records[user_key][0], "email": self._records[user_key][1]}
+                for user_key, _ in ranked
+            ]
+
+    async def rebuild(self, session: AsyncSession) -> Dict[str, Any]:
+        """Load every user through `session` and swap the new lists in; returns `stats()`."""
+        if not self.enabled:
+            return self.stats()
+        started = time.perf_counter()
+        with self._lock:
+            if self._pending is not None:
+                logger.info("Suggest index rebuild already running; not starting another.")
+                return self.stats()
+            self._pending = []
+        try:
+            records: Dict[str, Tuple[str, str]] = {}
+            size_bytes = 0
+            result = await session.stream(select(User.id, User.nickname, User.email).execution_options(yield_per=_LOAD_CHUNK))
+            async for user_id, nickname, email in result:
+                records[user_id.hex] = (nickname, email)
+                size_bytes += self._record_size(nickname, email)
+                if size_bytes > self.max_bytes:
+                    break
+            await result.close()
+            if size_bytes > self.max_bytes:
+                with self._lock:
+                    self.size_bytes = size_bytes
+                    self._check_budget()
+                return self.stats()
+            # Sorting a large table takes a while; keep it off the event loop.
+            nicknames, emails = await asyncio.to_thread(self._sorted_entries, records)
+            with self._lock:
+                self._nicknames, self._emails, self._records = nicknames, emails, records
+                self.size_bytes = size_bytes
+                self.ready, self.over_budget = True, False
+                for operation, arguments in self._pending:
+                    if operation == "upsert":
+                        self._add(*arguments)
+                    else:
+                        self._remove(arguments)
+                self._check_budget()
+                self.built_at = time.time()
+                self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+        finally:
+            with self._lock:
+                self._pending = None
+        logger.info("Suggest index built with %d users (%d bytes) in %.1f ms.", len(self._records), self.size_bytes, self.build_ms or 0)
+        return self.stats()
+
+    def _sorted_entries(self, records: Dict[str, Tuple[str, str]]) -> Tuple[SortedList, SortedList]:
+        nicknames = SortedList(self._entry(nickname, key) for key, (nickname, _) in records.items())
+        emails = SortedList(self._entry(email, key) for key, (_, email) in records.items())
+        return nicknames, emails
+
+    def clear(self) -> None:
+        with self._lock:
+            self._nicknames, self._emails, self._records = SortedList(), SortedList(), {}
+            self.size_bytes = 0
+            self.ready = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "over_budget": self.over_budget,
+            "users": len(self._records),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "built_at": self.built_at,
+            "build_ms": self.build_ms,
+            "lookups": self.lookups,
+        }
+
+
+_settings = get_settings()
+suggest_index = SuggestIndex(max_bytes=_settings.suggest_index_max_bytes, enabled=_settings.suggest_index_enabled)
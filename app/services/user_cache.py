@@ -0,0 +1,211 @@
+# app/services/user_cache.py
+from builtins import dict, float, int, len, max, str
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+import time
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from settings.config import get_settings
+from app.models.user_model import User
+
+UserRecord = Dict[str, Any]
+
+# Lookup keys the cache understands; anything else goes straight to the database.
+CACHEABLE_KEYS = ("id", "email", "nickname")
+# Users whose last invalidation is remembered for `store`; older ones are folded into one floor.
+MAX_TRACKED_INVALIDATIONS = 10000
+
+
+class UserCacheBackend:
+    """
+    Storage interface for cached user records.
+
+    A record is a plain dict of column values, so backends shared across workers
+    (Redis, memcached, ...) only need to serialize dicts. Implementations must drop
+    every alias (email, nickname) of a user when that user is deleted or evicted.
+    """
+
+    def get(self, key: str, value: str) -> Optional[UserRecord]:
+        raise NotImplementedError
+
+    def set(self, record: UserRecord, ttl: float) -> int:
+        """Store a record and return the number of records evicted to make room."""
+        raise NotImplementedError
+
+    def delete(self, user_id: str) -> bool:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryUserCacheBackend(UserCacheBackend):
+    """Per-process LRU store with a per-entry expiry and a hard bound on the number of users."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._records: "OrderedDict[str, Tuple[float, UserRecord]]" = OrderedDict()
+        self._aliases: Dict[Tuple[str, str], str] = {}
+        self._lock = Lock()
+
+    def get(self, key: str, value: str) -> Optional[UserRecord]:
+        with self._lock:
+            user_id = value if key == "id" else self._aliases.get((key, value))
+            if user_id is None:
+                return None
+            entry = self._records.get(user_id)
+            if entry is None:
+                return None
+            expires_at, record = entry
+            if expires_at <= time.monotonic():
+                self._remove(user_id)
+                return None
+            self._records.move_to_end(user_id)
+            return record
+
+    def set(self, record: UserRecord, ttl: float) -> int:
+        user_id = str(record["id"])
+        evicted = 0
+        with self._lock:
+            self._remove(user_id)
+            self._records[user_id] = (time.monotonic() + ttl, record)
+            self._aliases[("email", record["email"])] = user_id
+            self._aliases[("nickname", record["nickname"])] = user_id
+            while len(self._records) > self.max_size:
+                oldest_id = next(iter(self._records))
+                self._remove(oldest_id)
+                evicted += 1
+        return evicted
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock:
+            return self._remove(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._aliases.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _remove(self, user_id: str) -> bool:
+        entry = self._records.pop(user_id, None)
+        if entry is None:
+            return False
+        record = entry[1]
+        for alias in (("email", record["email"]), ("nickname", record["nickname"])):
+            if self._aliases.get(alias) == user_id:
+                del self._aliases[alias]
+        return True
+
+
+class UserCache:
+    """
+    Read-through cache of user rows keyed by id, email and nickname.
+
+    Records are stored as column snapshots rather than ORM instances, so a hit is
+    re-attached to the caller's session without emitting SQL. Every write path in
+    UserService must call `invalidate` once its change is committed, and writes committed by
+    other processes reach `invalidate` through `UserChangeListener`.
+
+    Every invalidation bumps `generation` and records it against the user's id. Readers take
+    the generation before querying and pass it to `store`, which drops the row only if that
+    same user was invalidated meanwhile (the row may predate the write), or the whole cache was
+    cleared. Writes to other users do not keep a read out of the cache. The last
+    `MAX_TRACKED_INVALIDATIONS` users are remembered; forgetting an older one raises a floor
+    below which every read is dropped. While `suspended` (no listener connected, so
+    invalidations from other processes could be missed) nothing is served or stored.
+    """
+
+    def __init__(self, backend: UserCacheBackend, ttl: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.suspended = False
+        self.generation = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def to_record(user: User) -> UserRecord:
+        return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+    def get_record(self, key: str, value) -> Optional[UserRecord]:
+        """The cached column snapshot itself, for read paths that do not need a mapped User."""
+        if not self.enabled or self.suspended:
+            return None
+        record = self.backend.get(key, str(value))
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record
+
+    async def get(self, session: AsyncSession, key: str, value) -> Optional[User]:
+        record = self.get_record(key, value)
+        if record is None:
+            return None
+        user = User(**record)
+        make_transient_to_detached(user)
+        return await session.merge(user, load=False)
+
+    def store(self, user: User, generation: int) -> None:
+        """Cache a user read at `generation`; ignored if this user was invalidated, or the cache cleared, since."""
+        if user is not None:
+            self.store_record(self.to_record(user), generation)
+
+    def store_record(self, record: UserRecord, generation: int) -> None:
+        """Like `store`, for a full column snapshot read without the ORM."""
+        if not self.enabled or self.suspended or generation < self._floor:
+            return
+        if self._invalidated.get(str(record["id"]), 0) > generation:
+            return
+        self.evictions += self.backend.set(record, self.ttl)
+
+    def invalidate(self, user_id) -> None:
+        user_id = str(user_id)
+        self.generation += 1
+        self._invalidated[user_id] = self.generation
+        self._invalidated.move_to_end(user_id)
+        while len(self._invalidated) > MAX_TRACKED_INVALIDATIONS:
+            _, forgotten = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, forgotten)
+        if self.backend.delete(user_id):
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._floor = self.generation
+        self._invalidated.clear()
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "suspended": self.suspended,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_settings = get_settings()
+user_cache = UserCache(
+    InMemoryUserCacheBackend(max_size=_settings.user_cache_max_size),
+    ttl=_settings.user_cache_ttl_seconds,
+    enabled=_settings.user_cache_enabled,
+)
@@ -0,0 +1,101 @@
+# app/services/user_changes.py
+from builtins import Exception, bool, float, int, str
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+from sqlalchemy.ext.asyncio import AsyncEngine
+from settings.config import get_settings
+from app.models.user_model import USER_CHANGES_CHANNEL
+from app.services.response_cache import ResponseCache, list_users_cache
+from app.services.user_cache import UserCache, user_cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to re-establish a lost LISTEN connection.
+RECONNECT_SECONDS = 5.0
+
+
+class UserChangeListener:
+    """
+    Keeps this worker's user caches in step with user writes committed by any process.
+
+    A trigger on `users` sends `NOTIFY user_changes, '<user id>'` for every insert, update and
+    delete, delivered when the writing transaction commits, whichever worker (or script) made it.
+    The listener holds one connection from the engine's pool that LISTENs on the channel; each
+    notification invalidates the user in `cache` and every page of `list_cache`.
+
+    Notifications sent while no connection is listening are lost, so the user cache is
+    suspended (bypassed) from `start` until LISTEN is in place and again whenever the connection
+    drops, and it is cleared each time listening resumes. The list cache is only cleared: its
+    pages already expire within a few seconds.
+    """
+
+    def __init__(self, cache: UserCache, list_cache: ResponseCache, keepalive_seconds: float = 30.0):
+        self.cache = cache
+        self.list_cache = list_cache
+        self.keepalive_seconds = keepalive_seconds
+        self.listening = False
+        self.notifications = 0
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, engine: AsyncEngine) -> None:
+        self.cache.suspended = True
+        self._task = asyncio.create_task(self._run(engine), name="user-change-listener")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self, engine: AsyncEngine) -> None:
+        while True:
+            try:
+                await self._listen(engine)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Lost the user change listener connection: %s", e)
+            self.reconnects += 1
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    async def _listen(self, engine: AsyncEngine) -> None:
+        async with engine.connect() as connection:
+            driver = (await connection.get_raw_connection()).driver_connection
+            lost = asyncio.Event()
+            driver.add_termination_listener(lambda _: lost.set())
+            await driver.add_listener(USER_CHANGES_CHANNEL, self._notified)
+            try:
+                # Changes committed before LISTEN took effect were never announced to this worker.
+                self.cache.clear()
+                self.list_cache.invalidate_all()
+                self.cache.suspended = False
+                self.listening = True
+                logger.info("Listening for user changes on %r.", USER_CHANGES_CHANNEL)
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self.keepalive_seconds)
+                    except asyncio.TimeoutError:
+                        # A half-open connection only shows itself when used.
+                        await asyncio.wait_for(driver.execute("SELECT 1"), self.keepalive_seconds)
+            finally:
+                self.cache.suspended = True
+                self.listening = False
+                if lost.is_set():
+                    await connection.invalidate()
+                else:
+                    await asyncio.shield(driver.remove_listener(USER_CHANGES_CHANNEL, self._notified))
+
+    def _notified(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self.notifications += 1
+        self.cache.invalidate(payload)
+        self.list_cache.invalidate_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"listening": self.listening, "notifications": self.notifications, "reconnects": self.reconnects}
+
+
+user_change_listener = UserChangeListener(
+    user_cache, list_users_cache, keepalive_seconds=get_settings().user_change_keepalive_seconds,
+)
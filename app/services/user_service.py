@@ -1,55 +1,212 @@
-from builtins import Exception, bool, classmethod, int, str
+from builtins import Exception, bool, classmethod, dict, int, staticmethod, str
 from datetime import datetime, timezone
 import secrets
-from typing import Optional, Dict, List
+from typing import Any, NamedTuple, Optional, Dict, List
 from pydantic import ValidationError
-from sqlalchemy import func, null, update, select
+from sqlalchemy import Row, any_, bindparam, delete, func, null, or_, update, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import Integer, String
 from app.dependencies import get_email_service, get_settings
-from app.models.user_model import User
+from app.models.user_model import User, UserRole
 from app.schemas.user_schemas import UserCreate, UserUpdate
-from app.utils.nickname_gen import generate_nickname
+from app.utils.nickname_gen import allocate_nickname
 from app.utils.security import generate_verification_token, hash_password, verify_password
 from uuid import UUID
 from app.services.email_service import EmailService
-from app.models.user_model import UserRole
+from app.services.response_cache import list_users_cache
+from app.services.suggest_index import suggest_index
+from app.services.user_cache import CACHEABLE_KEYS, user_cache
+from app.services.user_stats_service import (
+    TRACKED_COLUMNS, UserStatsService, changes, deleted_counters, previous_columns, previous_state, updated_counters, user_state,
+)
+from app.utils.tracing import span, traced
 import logging
 
-settings = get_settings()
 logger = logging.getLogger(__name__)
 
+
+class UserView(NamedTuple):
+    """
+    Read-only snapshot of a user for responses: a plain tuple with named fields, built straight
+    from a Core row or a cached record. Unlike a mapped User it is not tracked by the session,
+    loads no password hash or tokens, and costs one small allocation.
+    """
+    id: UUID
+    email: str
+    nickname: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    bio: Optional[str]
+    profile_picture_url: Optional[str]
+    linkedin_profile_url: Optional[str]
+    github_profile_url: Optional[str]
+    role: UserRole
+    is_professional: Optional[bool]
+    last_login_at: Optional[datetime]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+# What single-statement mutations return: every column the user responses, ETags and
+# notification emails read, and nothing else (no password hash or tokens).
+RETURNED_COLUMNS = tuple(getattr(User, field) for field in UserView._fields)
+
+# The hot read statements, built once. Values are bound at execution, so SQLAlchemy computes each
+# statement's cache key once (it is memoized on the statement) and takes the compiled SQL from
+# the engine's compiled cache, and asyncpg reuses the statement it prepared for that SQL text on
+# each connection. Building them per call would repeat the construction and cache-key work.
+LOOKUP_STATEMENTS = {
+    key: select(User).where(getattr(User, key) == bindparam(key, type_=getattr(User, key).type))
+    for key in CACHEABLE_KEYS
+}
+COUNT_STATEMENT = select(func.count()).select_from(User)
+PAGE_STATEMENT = select(User).offset(bindparam("skip", type_=Integer)).limit(bindparam("limit", type_=Integer))
+TAKEN_NICKNAMES_STATEMENT = select(User.nickname).where(User.nickname == any_(bindparam("candidates", type_=ARRAY(String))))
+# The lean read path selects from the table itself, so the statements are plain Core and execute
+# without the ORM's entity loading and identity map. Single-user lookups read every column: a
+# miss fills the user cache, which holds whole rows; the UserView built from it still leaves the
+# password hash and tokens out.
+_VIEW_COLUMNS = [User.__table__.c[field] for field in UserView._fields]
+VIEW_STATEMENTS = {
+    key: select(*User.__table__.c).where(User.__table__.c[key] == bindparam(key, type_=User.__table__.c[key].type))
+    for key in CACHEABLE_KEYS
+}
+VIEW_PAGE_STATEMENT = select(*_VIEW_COLUMNS).offset(bindparam("skip", type_=Integer)).limit(bindparam("limit", type_=Integer))
+
+# Columns GET /users/search matches against; each has a pg_trgm GIN index (migration 5b7e2d9c4f10).
+SEARCH_COLUMNS = (User.nickname, User.first_name, User.last_name, User.email)
+
+
+def _like_escape(text: str) -> str:
+    """`text` with LIKE wildcards escaped, to match literally inside an ILIKE pattern."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class StaleUpdateError(Exception):
+    """The user changed after the version the caller based its update on."""
+
+
 class UserService:
+    cache = user_cache
+    list_cache = list_users_cache
+    suggest_index = suggest_index
+
     @classmethod
-    async def _execute_query(cls, session: AsyncSession, query):
+    def _user_changed(cls, user_id) -> None:
+        """Drop everything cached about a user once a write to it is committed."""
+        cls.cache.invalidate(user_id)
+        cls.list_cache.invalidate_all()
+
+    @classmethod
+    async def _execute_query(cls, session: AsyncSession, query, params: Optional[Dict[str, Any]] = None):
         try:
-            result = await session.execute(query)
-            await session.commit()
+            with span("db.execute"):
+                result = await session.execute(query, params)
+                await session.commit()
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Database error: {e}")
+            logger.error("Database error: %s", e)
             await session.rollback()
             return None
 
     @classmethod
-    async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
-        query = select(User).filter_by(**filters)
-        result = await cls._execute_query(session, query)
-        return result.scalars().first() if result else None
+    async def _execute_returning(cls, session: AsyncSession, statement, counters=None) -> Optional[Row]:
+        """
+        Run an `UPDATE`/`DELETE ... RETURNING` and commit; the returned row, or None if nothing matched.
+
+        `counters` turns the returned rows into user counter deltas (see `user_stats_service`),
+        which are applied in the same transaction.
+        """
+        try:
+            with span("db.execute"):
+                result = await session.execute(statement)
+                row = result.first()
+                if row is not None and counters is not None:
+                    await UserStatsService.apply(session, counters([row]))
+                await session.commit()
+            return row
+        except SQLAlchemyError as e:
+            logger.error("Database error: %s", e)
+            await session.rollback()
+            return None
 
     @classmethod
-    async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
-        return await cls._fetch_user(session, id=user_id)
+    @traced("UserService.fetch_user")
+    async def _fetch_user(cls, session: AsyncSession, fresh: bool = False, **filters) -> Optional[User]:
+        # Single-key lookups by id, email or nickname are served from the user cache when possible.
+        # `fresh` reads from the database, overwriting any copy already in the session, and the
+        # row read still refreshes the cache.
+        cache_key = next(iter(filters)) if len(filters) == 1 else None
+        generation = cls.cache.generation
+        if cache_key in CACHEABLE_KEYS and not fresh:
+            with span("user_cache.get", key=cache_key) as cache_span:
+                cached_user = await cls.cache.get(session, cache_key, filters[cache_key])
+                if cache_span is not None:
+                    cache_span.attributes["hit"] = cached_user is not None
+            if cached_user is not None:
+                return cached_user
+        query = LOOKUP_STATEMENTS[cache_key] if cache_key in CACHEABLE_KEYS else select(User).filter_by(**filters)
+        if fresh:
+            query = query.execution_options(populate_existing=True)
+        result = await cls._execute_query(session, query, filters if cache_key in CACHEABLE_KEYS else None)
+        user = result.scalars().first() if result else None
+        if user is not None and cache_key in CACHEABLE_KEYS:
+            cls.cache.store(user, generation)
+        return user
+
+    @classmethod
+    @traced("UserService.fetch_view")
+    async def _fetch_view(cls, session: AsyncSession, key: str, value) -> Optional[UserView]:
+        # A miss stores the row it read in the user cache, under the same generation check as `_fetch_user`.
+        record = cls.cache.get_record(key, value)
+        if record is None:
+            generation = cls.cache.generation
+            try:
+                with span("db.execute"):
+                    connection = await session.connection()
+                    row = (await connection.execute(VIEW_STATEMENTS[key], {key: value})).first()
+            except SQLAlchemyError as e:
+                logger.error("Database error: %s", e)
+                await session.rollback()
+                return None
+            if row is None:
+                return None
+            record = dict(row._mapping)
+            cls.cache.store_record(record, generation)
+        return UserView(*[record[field] for field in UserView._fields])
+
+    @classmethod
+    async def get_view_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[UserView]:
+        """Like `get_by_id`, for read-only use: a `UserView` instead of a mapped User."""
+        return await cls._fetch_view(session, "id", user_id)
+
+    @classmethod
+    async def get_view_by_email(cls, session: AsyncSession, email: str) -> Optional[UserView]:
+        return await cls._fetch_view(session, "email", email)
+
+    @classmethod
+    async def get_by_id(cls, session: AsyncSession, user_id: UUID, fresh: bool = False) -> Optional[User]:
+        return await cls._fetch_user(session, fresh, id=user_id)
 
     @classmethod
     async def get_by_nickname(cls, session: AsyncSession, nickname: str) -> Optional[User]:
         return await cls._fetch_user(session, nickname=nickname)
 
     @classmethod
-    async def get_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
-        return await cls._fetch_user(session, email=email)
+    async def get_by_email(cls, session: AsyncSession, email: str, fresh: bool = False) -> Optional[User]:
+        return await cls._fetch_user(session, fresh, email=email)
 
     @classmethod
+    @traced("UserService.find_taken_nicknames")
+    async def find_taken_nicknames(cls, session: AsyncSession, candidates: List[str]) -> List[str]:
+        """Return the candidates already in use, checked in a single `nickname = ANY(...)` query."""
+        result = await session.execute(TAKEN_NICKNAMES_STATEMENT, {"candidates": candidates})
+        return result.scalars().all()
+
+    @classmethod
+    @traced("UserService.create")
     async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
         try:
             validated_data = UserCreate(**user_data).model_dump()
@@ -61,85 +218,197 @@ class UserService:
             validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
 
             # Use provided nickname if it doesn't exist, otherwise generate a new one
-            nickname = validated_data.get('nickname')
-            if await cls.get_by_nickname(session, nickname):
-                # Generate a new unique nickname if the provided one is already taken
-                new_nickname = generate_nickname()
-                while await cls.get_by_nickname(session, new_nickname):
-                    new_nickname = generate_nickname()
-                validated_data['nickname'] = new_nickname
-            else:
-                validated_data['nickname'] = nickname  # Use the provided nickname as it is unique
+            validated_data['nickname'] = await allocate_nickname(
+                lambda candidates: cls.find_taken_nicknames(session, candidates),
+                preferred=validated_data.get('nickname'),
+            )
 
             new_user = User(**validated_data)
-            logger.info(f"User Role: {new_user.role}")
             user_count = await cls.count(session)
             new_user.role = UserRole.ADMIN if user_count == 0 else UserRole.ANONYMOUS
+            logger.debug("Creating user with role %s.", new_user.role)
 
             session.add(new_user)
 
             if new_user.role != UserRole.ADMIN:
                 new_user.verification_token = generate_verification_token()
+                await cls._count_new_user(session, new_user)
                 await session.commit()  # Commit before email is sent to ensure user data is saved
+                cls._user_changed(new_user.id)
+                cls.suggest_index.upsert(new_user.id, new_user.nickname, new_user.email)
                 try:
                     await email_service.send_verification_email(new_user)
                 except Exception as e:
-                    logger.error(f"Error sending verification email: {e}")
+                    logger.error("Error sending verification email: %s", e)
             else:
                 new_user.email_verified = True
+                await cls._count_new_user(session, new_user)
                 await session.commit()  # Single commit for ADMIN users
+                cls._user_changed(new_user.id)
+                cls.suggest_index.upsert(new_user.id, new_user.nickname, new_user.email)
 
             return new_user
         except ValidationError as e:
-            logger.error(f"Validation error during user creation: {e}")
+            logger.error("Validation error during user creation: %s", e)
             return None
 
     @classmethod
-    async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[User]:
+    async def _count_new_user(cls, session: AsyncSession, new_user: User) -> None:
+        # Flushing fills in created_at (eager defaults), which decides the signup day counted.
+        await session.flush()
+        await UserStatsService.apply(session, changes(after=[user_state(new_user)]))
+
+    @classmethod
+    @traced("UserService.update")
+    async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str],
+                     expected_versions: Optional[List[datetime]] = None) -> Optional[Row]:
+        """
+        Update a user in one `UPDATE ... RETURNING` statement and return the updated columns
+        (`RETURNED_COLUMNS`), or None if there is no such user.
+
+        With `expected_versions` (the `updated_at` values the caller's copy may have, from an
+        If-Match header) the check is part of the UPDATE statement, and StaleUpdateError is
+        raised when the user exists but has changed since.
+        """
         try:
             # validated_data = UserUpdate(**update_data).dict(exclude_unset=True)
             validated_data = UserUpdate(**update_data).model_dump(exclude_unset=True)
 
             if 'password' in validated_data:
                 validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            query = update(User).where(User.id == user_id).values(**validated_data).execution_options(synchronize_session="fetch")
-            await cls._execute_query(session, query)
-            updated_user = await cls.get_by_id(session, user_id)
+            condition = User.id == user_id
+            if expected_versions is not None:
+                condition = condition & User.updated_at.in_(expected_versions)
+            returning, counters = RETURNED_COLUMNS, None
+            if 'role' in validated_data:
+                # A role change moves the user between counters, which needs the role it had.
+                previous = previous_state(condition)
+                condition = User.id == previous.c.id
+                returning = (*RETURNED_COLUMNS, User.email_verified, User.is_locked, *previous_columns(previous))
+                counters = updated_counters
+            # updated_at is set explicitly so the session expires its copy; a bare onupdate default is not synchronised.
+            query = (
+                update(User)
+                .where(condition)
+                .values(**validated_data, updated_at=func.now())
+                .returning(*returning)
+                .execution_options(synchronize_session="fetch")
+            )
+            updated_user = await cls._execute_returning(session, query, counters)
             if updated_user:
-                session.refresh(updated_user)  # Explicitly refresh the updated user object
-                logger.info(f"User {user_id} updated successfully.")
+                cls._user_changed(user_id)
+                if 'nickname' in validated_data or 'email' in validated_data:
+                    cls.suggest_index.upsert(user_id, updated_user.nickname, updated_user.email)
+                logger.info("User %s updated successfully.", user_id)
                 return updated_user
-            else:
-                logger.error(f"User {user_id} not found after update attempt.")
+            # Nothing matched; only now is it worth a second query to tell a stale version from a missing user.
+            if expected_versions is not None and await cls.get_by_id(session, user_id) is not None:
+                raise StaleUpdateError(user_id)
+            logger.error("User %s not found for update.", user_id)
             return None
+        except StaleUpdateError:
+            raise
         except Exception as e:  # Broad exception handling for debugging
-            logger.error(f"Error during user update: {e}")
+            logger.error("Error during user update: %s", e)
             return None
 
     @classmethod
+    @traced("UserService.delete")
     async def delete(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if not user:
-            logger.info(f"User with ID {user_id} not found.")
+        query = delete(User).where(User.id == user_id).returning(User.id, *TRACKED_COLUMNS)
+        deleted = await cls._execute_returning(session, query, deleted_counters)
+        if not deleted:
+            logger.info("User with ID %s not found.", user_id)
             return False
-        await session.delete(user)
-        await session.commit()
+        cls._user_changed(user_id)
+        cls.suggest_index.remove(user_id)
         return True
 
     @classmethod
+    @traced("UserService.list_users")
     async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
-        query = select(User).offset(skip).limit(limit)
-        result = await cls._execute_query(session, query)
+        result = await cls._execute_query(session, PAGE_STATEMENT, {"skip": skip, "limit": limit})
         return result.scalars().all() if result else []
 
+    @classmethod
+    @traced("UserService.list_views")
+    async def list_views(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[UserView]:
+        """Like `list_users`, for read-only use: a page of `UserView`s from one Core query."""
+        try:
+            with span("db.execute"):
+                connection = await session.connection()
+                result = await connection.execute(VIEW_PAGE_STATEMENT, {"skip": skip, "limit": limit})
+        except SQLAlchemyError as e:
+            logger.error("Database error: %s", e)
+            await session.rollback()
+            return []
+        return [UserView._make(row) for row in result]
+
+    @classmethod
+    @traced("UserService.search")
+    async def search(cls, session: AsyncSession, text: str, limit: int = 10) -> List[Row]:
+        """
+        Users whose nickname, first or last name or email contains `text` or a word close to it,
+        best match first; rows of `RETURNED_COLUMNS` plus a `score` between 0 and 1.
+
+        Every condition is either `column ILIKE '%text%'` or `text <% column` (pg_trgm word
+        similarity), both served by the column's trigram GIN index, so the planner combines
+        bitmap index scans instead of scanning the table. The score is the best
+        `word_similarity` over the columns; ties go to the nickname order.
+
+        `<%` matches from `pg_trgm.word_similarity_threshold`, 0.6 by default, which misses a
+        single wrong letter in a short name ("johnathan" scores 0.58 against "Jonathan"). The
+        search sets it to `search_similarity_threshold` for its own transaction.
+        """
+        try:
+            await session.execute(select(func.set_config("pg_trgm.word_similarity_threshold", str(get_settings().search_similarity_threshold), True)))
+        except SQLAlchemyError as e:
+            logger.error("Database error: %s", e)
+            await session.rollback()
+            return []
+        result = await cls._execute_query(session, cls._search_query(text, limit))
+        return result.all() if result else []
+
+    @staticmethod
+    def _search_query(text: str, limit: int):
+        term = bindparam("term", text, type_=String)
+        pattern = f"%{_like_escape(text)}%"
+        score = func.greatest(*[func.word_similarity(term, column) for column in SEARCH_COLUMNS]).label("score")
+        return (
+            select(*RETURNED_COLUMNS, score)
+            .where(or_(*[condition for column in SEARCH_COLUMNS for condition in (column.ilike(pattern), term.op("<%")(column))]))
+            .order_by(score.desc(), User.nickname)
+            .limit(limit)
+        )
+
+    @classmethod
+    @traced("UserService.suggest")
+    async def suggest(cls, session: AsyncSession, prefix: str, limit: int = 10) -> List[Row]:
+        """
+        Users whose nickname or email starts with `prefix`, ignoring case; the database fallback
+        for when the in-process suggest index is not ready. Prefixes of three characters or more
+        are served by the trigram indexes.
+        """
+        pattern = f"{_like_escape(prefix)}%"
+        query = (
+            select(User.id, User.nickname, User.email)
+            .where(or_(User.nickname.ilike(pattern), User.email.ilike(pattern)))
+            .order_by(func.lower(User.nickname))
+            .limit(limit)
+        )
+        result = await cls._execute_query(session, query)
+        return result.all() if result else []
+
     @classmethod
     async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], get_email_service) -> Optional[User]:
         return await cls.create(session, user_data, get_email_service)
     
 
     @classmethod
+    @traced("UserService.login_user")
     async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
-        user = await cls.get_by_email(session, email)
+        # Lock state, password and attempt count decide access: read them from the database.
+        user = await cls.get_by_email(session, email, fresh=True)
         if user:
             if user.email_verified is False:
                 return None
@@ -150,47 +419,61 @@ class UserService:
                 user.last_login_at = datetime.now(timezone.utc)
                 session.add(user)
                 await session.commit()
+                cls._user_changed(user.id)
                 return user
             else:
                 user.failed_login_attempts += 1
-                if user.failed_login_attempts >= settings.max_login_attempts:
+                if not user.is_locked and user.failed_login_attempts >= get_settings().max_login_attempts:
                     user.is_locked = True
+                    await UserStatsService.apply(session, {"locked": 1})
                 session.add(user)
                 await session.commit()
+                cls._user_changed(user.id)
         return None
 
     @classmethod
     async def is_account_locked(cls, session: AsyncSession, email: str) -> bool:
-        user = await cls.get_by_email(session, email)
+        user = await cls.get_by_email(session, email, fresh=True)
         return user.is_locked if user else False
 
 
     @classmethod
+    @traced("UserService.reset_password")
     async def reset_password(cls, session: AsyncSession, user_id: UUID, new_password: str) -> bool:
         hashed_password = hash_password(new_password)
-        user = await cls.get_by_id(session, user_id)
-        if user:
-            user.hashed_password = hashed_password
-            user.failed_login_attempts = 0  # Resetting failed login attempts
-            user.is_locked = False  # Unlocking the user account, if locked
-            session.add(user)
-            await session.commit()
+        previous = previous_state(User.id == user_id)
+        query = (
+            update(User)
+            .where(User.id == previous.c.id)
+            # Resetting the password also clears failed login attempts and unlocks the account.
+            .values(hashed_password=hashed_password, failed_login_attempts=0, is_locked=False)
+            .returning(User.id, *TRACKED_COLUMNS, *previous_columns(previous))
+            .execution_options(synchronize_session="fetch")
+        )
+        if await cls._execute_returning(session, query, updated_counters):
+            cls._user_changed(user_id)
             return True
         return False
 
     @classmethod
+    @traced("UserService.verify_email_with_token")
     async def verify_email_with_token(cls, session: AsyncSession, user_id: UUID, token: str) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.verification_token == token:
-            user.email_verified = True
-            user.verification_token = None  # Clear the token once used
-            user.role = UserRole.AUTHENTICATED
-            session.add(user)
-            await session.commit()
+        # The token check is part of the WHERE clause, and the token is cleared once used.
+        previous = previous_state((User.id == user_id) & (User.verification_token == token))
+        query = (
+            update(User)
+            .where(User.id == previous.c.id)
+            .values(email_verified=True, verification_token=None, role=UserRole.AUTHENTICATED)
+            .returning(User.id, *TRACKED_COLUMNS, *previous_columns(previous))
+            .execution_options(synchronize_session="fetch")
+        )
+        if await cls._execute_returning(session, query, updated_counters):
+            cls._user_changed(user_id)
             return True
         return False
 
     @classmethod
+    @traced("UserService.count")
     async def count(cls, session: AsyncSession) -> int:
         """
         Count the number of users in the database.
@@ -198,40 +481,94 @@ class UserService:
         :param session: The AsyncSession instance for database access.
         :return: The count of users.
         """
-        query = select(func.count()).select_from(User)
-        result = await session.execute(query)
+        result = await session.execute(COUNT_STATEMENT)
         count = result.scalar()
         return count
     
     @classmethod
+    @traced("UserService.unlock_user_account")
     async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.is_locked:
-            user.is_locked = False
-            user.failed_login_attempts = 0  # Optionally reset failed login attempts
-            session.add(user)
-            await session.commit()
+        query = (
+            update(User)
+            .where(User.id == user_id, User.is_locked.is_(True))
+            .values(is_locked=False, failed_login_attempts=0)
+            .returning(User.id)
+            .execution_options(synchronize_session="fetch")
+        )
+        # Only a locked user matches, so the change is always one fewer locked account.
+        if await cls._execute_returning(session, query, lambda rows: {"locked": -1}):
+            cls._user_changed(user_id)
             return True
         return False
 
 # New Feature: update professional status
     @classmethod
-    async def update_professional_status(cls, session: AsyncSession, user_id: UUID, is_professional: bool, email_service: EmailService) -> Optional[User]:
+    @traced("UserService.update_professional_status")
+    async def update_professional_status(cls, session: AsyncSession, user_id: UUID, is_professional: bool, email_service: EmailService) -> Optional[Row]:
+        """Set a user's professional status and notify them; the updated columns, or None if there is no such user."""
         try:
-            query = update(User).where(User.id == user_id).values(is_professional=is_professional).execution_options(synchronize_session="fetch")
-            await cls._execute_query(session, query)
-            updated_user = await cls.get_by_id(session, user_id)
+            previous = previous_state(User.id == user_id)
+            query = (
+                update(User)
+                .where(User.id == previous.c.id)
+                .values(is_professional=is_professional, updated_at=func.now())
+                .returning(*RETURNED_COLUMNS, User.email_verified, User.is_locked, *previous_columns(previous))
+                .execution_options(synchronize_session="fetch")
+            )
+            updated_user = await cls._execute_returning(session, query, updated_counters)
             if updated_user:
-                session.refresh(updated_user)
-                logger.info(f"User {user_id} updated is_professional status successfully.")
+                cls._user_changed(user_id)
+                logger.info("User %s updated is_professional status successfully.", user_id)
                 try:
                     await email_service.send_professional_status_email_update(updated_user)
                 except Exception as e:
-                    logger.error(f"Error sending professional status update email: {e}.")
+                    logger.error("Error sending professional status update email: %s.", e)
                 return updated_user
             else:
-                logger.error(f"User {user_id} not found after updating is_professional status.")
+                logger.error("User %s not found for updating is_professional status.", user_id)
                 return None
         except Exception as e:
-            logger.error(f"Error during updating is_professional status: {e}")
+            logger.error("Error during updating is_professional status: %s", e)
             return None
+
+    @classmethod
+    @traced("UserService.batch_update")
+    async def batch_update(cls, session: AsyncSession, values: Dict[str, Any], max_batch_size: int,
+                           user_ids: Optional[List[UUID]] = None, filters: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Apply the same change to many users in one `UPDATE ... RETURNING` statement.
+
+        Users are selected either by `user_ids` (matched with `id = ANY(...)`) or by column
+        `filters`. Returns rows carrying the id, email, first name and professional status of
+        every changed user, which is all the notification emails need, plus the columns the
+        user counters are adjusted from.
+
+        :raises ValueError: If more than `max_batch_size` users would be changed; nothing is committed.
+        """
+        if user_ids is not None:
+            if len(user_ids) > max_batch_size:
+                raise ValueError(f"Batch operations are limited to {max_batch_size} users.")
+            condition = User.id == any_(bindparam("user_ids", user_ids, type_=ARRAY(PG_UUID(as_uuid=True))))
+        else:
+            # Match one row more than allowed so an oversized filter is detected without a separate count.
+            matching_ids = select(User.id).filter_by(**filters).limit(max_batch_size + 1)
+            condition = User.id.in_(matching_ids)
+        previous = previous_state(condition)
+        query = (
+            update(User)
+            .where(User.id == previous.c.id)
+            .values(**values)
+            .returning(User.id, User.email, User.first_name, *TRACKED_COLUMNS, *previous_columns(previous))
+            .execution_options(synchronize_session="fetch")
+        )
+        result = await session.execute(query)
+        rows = result.all()
+        if len(rows) > max_batch_size:
+            await session.rollback()
+            raise ValueError(f"Batch operations are limited to {max_batch_size} users.")
+        await UserStatsService.apply(session, updated_counters(rows))
+        await session.commit()
+        for row in rows:
+            cls._user_changed(row.id)
+        logger.info("Batch update changed %d users.", len(rows))
+        return rows
@@ -0,0 +1,179 @@
+# app/services/user_stats_service.py
+from builtins import bool, classmethod, dict, getattr, int, isinstance, len, list, range, sorted, staticmethod, sum
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+from sqlalchemy import func, not_, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database
+from app.models.user_model import User, UserRole
+from app.models.user_stat_model import UserStat
+
+logger = logging.getLogger(__name__)
+
+# The user columns the counters depend on. Writes that can change one of them return the
+# values from before and after the change so the counters can be adjusted by the difference.
+TRACKED_COLUMNS = (User.role, User.email_verified, User.is_locked, User.is_professional, User.created_at)
+PREVIOUS_PREFIX = "previous_"
+SIGNUPS_PREFIX = "signups:"
+
+# (role, email_verified, is_locked, is_professional, signup day)
+UserState = Tuple[UserRole, bool, bool, bool, Optional[date]]
+
+
+def user_state(row: Any, prefix: str = "") -> UserState:
+    """The tracked values of a user, a RETURNING row or a GROUP BY row; `prefix` selects `previous_*` columns."""
+    created_at = getattr(row, prefix + "created_at")
+    signup_day = created_at.astimezone(timezone.utc).date() if isinstance(created_at, datetime) else created_at
+    return (
+        getattr(row, prefix + "role"),
+        bool(getattr(row, prefix + "email_verified")),
+        bool(getattr(row, prefix + "is_locked")),
+        bool(getattr(row, prefix + "is_professional")),
+        signup_day,
+    )
+
+
+def counter_names(state: UserState) -> List[str]:
+    """
+    The counters one user with this state contributes 1 to. There is no `total` counter: every
+    write would update that one row, and it is the sum of the `role:*` counters anyway.
+    """
+    role, email_verified, is_locked, is_professional, signup_day = state
+    names = [f"role:{role.name}", "verified" if email_verified else "unverified"]
+    if is_locked:
+        names.append("locked")
+    if is_professional:
+        names.append("professional")
+    if signup_day is not None:
+        names.append(f"{SIGNUPS_PREFIX}{signup_day.isoformat()}")
+    return names
+
+
+def changes(before: Iterable[UserState] = (), after: Iterable[UserState] = ()) -> Dict[str, int]:
+    """Counter deltas for users going from the `before` states to the `after` states; unchanged counters are left out."""
+    deltas: Counter = Counter()
+    for state in before:
+        deltas.subtract(counter_names(state))
+    for state in after:
+        deltas.update(counter_names(state))
+    return {name: delta for name, delta in deltas.items() if delta}
+
+
+def previous_state(condition):
+    """
+    The rows matching `condition`, locked, with their tracked columns as they are before an UPDATE.
+
+    Used as `UPDATE users ... FROM previous WHERE users.id = previous.id RETURNING ..., previous.*`:
+    RETURNING only sees new values, and the self-join is how one statement reports both.
+    """
+    return select(User.id, *TRACKED_COLUMNS).where(condition).with_for_update().subquery("previous")
+
+
+def previous_columns(previous) -> List[Any]:
+    """`previous`'s tracked columns labelled `previous_<name>`, to return next to the new values."""
+    return [previous.c[column.name].label(PREVIOUS_PREFIX + column.name) for column in TRACKED_COLUMNS]
+
+
+def updated_counters(rows: Iterable[Any]) -> Dict[str, int]:
+    """Deltas for rows returned by an UPDATE built on `previous_state`."""
+    rows = list(rows)
+    return changes([user_state(row, PREVIOUS_PREFIX) for row in rows], [user_state(row) for row in rows])
+
+
+def deleted_counters(rows: Iterable[Any]) -> Dict[str, int]:
+    """Deltas for rows returned by a DELETE ... RETURNING of the tracked columns."""
+    return changes([user_state(row) for row in rows])
+
+
+class UserStatsService:
+    """
+    User counts kept in `user_stats`, so reading them never scans `users`.
+
+    Writes that change a tracked column call `apply` with the counter deltas before they commit,
+    so the counters move in the same transaction as the rows they count. Deltas are applied as
+    one `INSERT ... ON CONFLICT DO UPDATE SET value = value + excluded.value`, in name order so
+    concurrent writers lock the counter rows in the same order and cannot deadlock. `reconcile`
+    recounts from `users` and corrects any drift (changes made outside the service, such as
+    manual SQL), and is run periodically by the scheduler, one run at a time.
+    """
+
+    @staticmethod
+    async def apply(session: AsyncSession, deltas: Dict[str, int]) -> None:
+        """Add `deltas` to the counters within the caller's transaction; the caller commits."""
+        if not deltas:
+            return
+        statement = insert(UserStat).values([{"name": name, "value": deltas[name]} for name in sorted(deltas)])
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserStat.name],
+            set_={"value": UserStat.value + statement.excluded.value, "updated_at": func.now()},
+        )
+        await session.execute(statement)
+
+    @classmethod
+    async def get_stats(cls, session: AsyncSession, days: int = 30) -> Dict[str, Any]:
+        """Current counts and signups for each of the last `days` days (UTC, zero-filled), in one indexed query."""
+        today = datetime.now(timezone.utc).date()
+        first_day = today - timedelta(days=days - 1)
+        query = select(UserStat.name, UserStat.value).where(
+            or_(
+                not_(UserStat.name.startswith(SIGNUPS_PREFIX)),
+                UserStat.name.between(f"{SIGNUPS_PREFIX}{first_day.isoformat()}", f"{SIGNUPS_PREFIX}{today.isoformat()}"),
+            )
+        )
+        result = await session.execute(query)
+        counters = dict(result.all())
+        by_role = {role.name: counters.get(f"role:{role.name}", 0) for role in UserRole}
+        return {
+            "total": sum(by_role.values()),
+            "by_role": by_role,
+            "verified": counters.get("verified", 0),
+            "unverified": counters.get("unverified", 0),
+            "locked": counters.get("locked", 0),
+            "professional": counters.get("professional", 0),
+            "daily_signups": [
+                {"date": day, "count": counters.get(f"{SIGNUPS_PREFIX}{day.isoformat()}", 0)}
+                for day in (first_day + timedelta(days=offset) for offset in range(days))
+            ],
+        }
+
+    @classmethod
+    async def reconcile(cls, session_factory=None) -> Dict[str, Tuple[int, int]]:
+        """
+        Recount every counter from `users` and correct the ones that drifted.
+
+        The recount and the stored counters are read from one REPEATABLE READ snapshot, in which
+        they agree except for drift, since every tracked write changes both in one transaction.
+        Nothing is locked while `users` is scanned. The drift is then added to the counters as a
+        delta in a short transaction of its own, so writes committed after the snapshot keep the
+        adjustments they made. Returns `{name: (stored, actual)}` for each corrected counter.
+        """
+        session_factory = session_factory or Database.get_session_factory()
+        signup_day = func.date(func.timezone("UTC", User.created_at)).label("created_at")
+        recount = select(
+            User.role, User.email_verified, User.is_locked, User.is_professional, signup_day, func.count().label("users"),
+        ).group_by(User.role, User.email_verified, User.is_locked, User.is_professional, signup_day)
+
+        async with session_factory() as session:
+            await session.connection(execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True})
+            actual: Counter = Counter()
+            for row in (await session.execute(recount)).all():
+                for name in counter_names(user_state(row)):
+                    actual[name] += row.users
+            stored = dict((await session.execute(select(UserStat.name, UserStat.value))).all())
+            await session.rollback()
+        drift = {
+            name: (stored.get(name, 0), actual.get(name, 0))
+            for name in stored.keys() | actual.keys()
+            if stored.get(name, 0) != actual.get(name, 0)
+        }
+        if drift:
+            async with session_factory() as session:
+                await cls.apply(session, {name: now - was for name, (was, now) in drift.items()})
+                await session.commit()
+            logger.warning("Reconciled %d user counters that had drifted: %s", len(drift), sorted(drift))
+        else:
+            logger.info("User counters match the users table.")
+        return drift
@@ -1,16 +1,53 @@
-import logging.config
+from typing import Optional
+import atexit
+import logging
+import logging.handlers
 import os
-from app.dependencies import get_settings
+import queue
+import sys
+from settings.config import Settings, get_settings
+from app.utils.structured_logging import CorrelationFilter, JsonFormatter, NonBlockingQueueHandler, RateLimitFilter, TextFormatter
 
-settings = get_settings()
-def setup_logging():
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(settings: Optional[Settings] = None) -> NonBlockingQueueHandler:
     """
-    Sets up logging for the application using a configuration file.
+    Sets up logging for the application: every record goes through a bounded queue to a
+    background writer thread, so logging calls never block on I/O.
     This ensures standardized logging across the entire application.
     """
-    # Construct the path to 'logging.conf', assuming it's in the project's root.
-    logging_config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'logging.conf')
-    # Normalize the path to handle any '..' correctly.
-    normalized_path = os.path.normpath(logging_config_path)
-    # Apply the logging configuration.
-    logging.config.fileConfig(normalized_path, disable_existing_loggers=False)
\ No newline at end of file
+    global _queue_handler
+    if _queue_handler is not None:  # Configure once per process
+        return _queue_handler
+    settings = settings or get_settings()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    _queue_handler.addFilter(CorrelationFilter())
+    _queue_handler.addFilter(RateLimitFilter(settings.log_rate_limit_per_second, settings.log_rate_limit_burst))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.log_level.upper())
+    _start_listener(stream_handler)
+    atexit.register(_stop_listener)
+    # The listener thread does not survive a fork (Gunicorn workers); each child starts its own.
+    os.register_at_fork(after_in_child=lambda: _start_listener(stream_handler, fresh_queue=True))
+    return _queue_handler
+
+
+def _start_listener(stream_handler: logging.Handler, fresh_queue: bool = False):
+    global _listener
+    if fresh_queue:
+        _queue_handler.queue = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    # Flushes whatever is still queued before the interpreter exits.
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
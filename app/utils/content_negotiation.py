@@ -0,0 +1,200 @@
+"""
+Response format negotiation and compression.
+
+`ContentNegotiationMiddleware` looks at every complete JSON response. A client that prefers
+MessagePack in `Accept` gets the body re-encoded as `application/msgpack`, and a client that
+sends `Accept-Encoding: br` or `gzip` gets bodies above `compression_min_bytes` compressed
+(brotli preferred). Bodies larger than `encoding_offload_bytes` are encoded in a worker thread
+so the event loop keeps serving other requests.
+
+msgpack and brotli are optional dependencies: without them the corresponding format is
+simply never chosen. Streaming responses and responses that already carry a
+Content-Encoding are passed through with their body untouched.
+
+Every response gets `Vary: Accept, Accept-Encoding`, including those sent as is, so a shared
+cache never hands one client's representation to another. A 304 carries the ETag of the
+representation the client would have been sent, suffix included.
+"""
+from builtins import Exception, ImportError, ValueError, bytes, float, int, len, max, str
+from typing import Dict, Optional
+import asyncio
+import gzip
+import json
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.etag import strip_representation
+from app.utils.tracing import span
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_ALIASES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def parse_quality_list(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept or Accept-Encoding header into {value: q}."""
+    preferences = {}
+    for item in (header or "").split(","):
+        value, *params = [part.strip() for part in item.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        preferences[value.lower()] = quality
+    return preferences
+
+
+def choose_media_type(accept: Optional[str], msgpack_enabled: bool = True) -> str:
+    """MessagePack when the client ranks it at least as high as JSON, JSON otherwise."""
+    if msgpack is None or not msgpack_enabled or not accept:
+        return JSON_MEDIA_TYPE
+    preferences = parse_quality_list(accept)
+    msgpack_q = max((preferences.get(alias, 0.0) for alias in MSGPACK_ALIASES), default=0.0)
+    json_q = max(preferences.get(JSON_MEDIA_TYPE, 0.0), preferences.get("application/*", 0.0), preferences.get("*/*", 0.0))
+    return MSGPACK_MEDIA_TYPE if msgpack_q > 0 and msgpack_q >= json_q else JSON_MEDIA_TYPE
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The best compression the client accepts: brotli, then gzip, or None for identity."""
+    preferences = parse_quality_list(accept_encoding)
+    wildcard = preferences.get("*", 0.0)
+    candidates = [("br", preferences.get("br", wildcard)), ("gzip", preferences.get("gzip", wildcard))]
+    if brotli is None:
+        candidates = candidates[1:]
+    best, quality = max(candidates, key=lambda candidate: candidate[1])
+    return best if quality > 0 else None
+
+
+def encode_body(body: bytes, media_type: str, encoding: Optional[str], gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """Re-encode a JSON body into `media_type`, then compress it with `encoding` if given."""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        body = msgpack.packb(json.loads(body), use_bin_type=True)
+    if encoding == "br":
+        body = brotli.compress(body, quality=brotli_quality)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return body
+
+
+def representation_etag(etag: str, suffix: str) -> str:
+    """A strong ETag must differ between representations: `"abc"` becomes `"abc-gzip"`."""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{suffix}"'
+    return etag
+
+
+def not_modified_etag(etag: str, if_none_match: Optional[str], media_type: str, encoding: Optional[str]) -> str:
+    """
+    The ETag for a 304 answering `if_none_match`: the tag of the representation a 200 would
+    have carried. Whether that body would have been compressed depends on its size, unknown
+    here, so the client's own tag settles it when it is one of the two; otherwise the tag
+    assumes compression.
+    """
+    media_suffix = "msgpack" if media_type != JSON_MEDIA_TYPE else None
+    suffixes = ["-".join(s for s in (media_suffix, encoding) if s), media_suffix or ""]
+    candidates = [representation_etag(etag, suffix) if suffix else etag for suffix in suffixes]
+    sent = [tag.strip() for tag in (if_none_match or "").split(",")]
+    for candidate in candidates:
+        if candidate in sent or f"W/{candidate}" in sent:
+            return candidate
+    return candidates[0]
+
+
+class ContentNegotiationMiddleware:
+    """Serve JSON responses as MessagePack and/or compressed, as the client's headers request."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_size: int = 1024,
+        offload_size: int = 65536,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        msgpack_enabled: bool = True,
+    ):
+        self.app = app
+        self.min_size = min_size
+        self.offload_size = offload_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.msgpack_enabled = msgpack_enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        media_type = choose_media_type(request_headers.get("accept"), self.msgpack_enabled)
+        encoding = choose_encoding(request_headers.get("accept-encoding"))
+        negotiable = media_type != JSON_MEDIA_TYPE or encoding is not None
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def negotiating_send(message: Message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                # Another Accept or Accept-Encoding could have produced a different response.
+                headers.add_vary_header("Accept")
+                headers.add_vary_header("Accept-Encoding")
+                if message["status"] == 304 and "etag" in headers:
+                    headers["etag"] = not_modified_etag(headers["etag"], request_headers.get("if-none-match"), media_type, encoding)
+                content_type = headers.get("content-type", "")
+                if not negotiable or not content_type.startswith(JSON_MEDIA_TYPE) or "content-encoding" in headers:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # A streaming body: send what was held back and stop negotiating.
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+            await self._send_negotiated(start_message, message.get("body", b""), media_type, encoding, send)
+
+        await self.app(scope, receive, negotiating_send)
+
+    async def _send_negotiated(self, start_message: Message, body: bytes, media_type: str, encoding: Optional[str], send: Send):
+        headers = MutableHeaders(scope=start_message)
+        if len(body) < self.min_size:
+            encoding = None
+        if body and (media_type != JSON_MEDIA_TYPE or encoding is not None):
+            with span("encode", media_type=media_type, encoding=encoding or "identity", size=len(body)):
+                try:
+                    if len(body) >= self.offload_size:
+                        body = await asyncio.to_thread(encode_body, body, media_type, encoding, self.gzip_level, self.brotli_quality)
+                    else:
+                        body = encode_body(body, media_type, encoding, self.gzip_level, self.brotli_quality)
+                except Exception:
+                    # A body that is not valid JSON is sent as is rather than failing the request.
+                    media_type, encoding = JSON_MEDIA_TYPE, None
+            suffixes = [suffix for suffix in ("msgpack" if media_type != JSON_MEDIA_TYPE else None, encoding) if suffix]
+            if media_type != JSON_MEDIA_TYPE:
+                headers["content-type"] = media_type
+            if encoding is not None:
+                headers["content-encoding"] = encoding
+            if "etag" in headers and suffixes:
+                headers["etag"] = representation_etag(headers["etag"], "-".join(suffixes))
+            headers["content-length"] = str(len(body))
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,72 @@
+"""
+Entity tags for user resources.
+
+A user's ETag is derived from its `id` and `updated_at`, which the database bumps on every
+write, so it changes exactly when the representation can change. The tag encodes the
+timestamp (as hex microseconds since the epoch) rather than hashing it: `If-Match` is then
+turned back into an `updated_at` value and enforced in the UPDATE statement itself, without
+loading the row first.
+
+Compressed or MessagePack responses carry the same tag with a representation suffix
+(`"<id>.<version>-gzip"`, see `app.utils.content_negotiation`); the suffix is ignored when a
+client sends the tag back.
+"""
+from builtins import OverflowError, ValueError, int, len, list, str
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def user_etag(user_id: UUID, updated_at: Optional[datetime]) -> str:
+    """Strong ETag for a user, e.g. `"3fa85f6457174562b3fc2c963f66afa6.5f2b1c9d3e4a0"`."""
+    version = (updated_at - _EPOCH) // _MICROSECOND if updated_at is not None else 0
+    return f'"{user_id.hex}.{version:x}"'
+
+
+def strip_representation(tag: str) -> str:
+    """Drop a content-coding / media type suffix such as `-gzip` or `-msgpack-br` from a tag."""
+    if len(tag) >= 2 and tag.endswith('"'):
+        return tag[:-1].partition("-")[0] + '"'
+    return tag
+
+
+def parse_etags(header: Optional[str]) -> List[str]:
+    """Split an If-Match / If-None-Match header into its tags, without representation suffixes; `*` is returned as is."""
+    if not header:
+        return []
+    return [strip_representation(tag.strip()) for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """True if the client's copy is current. Uses weak comparison, as RFC 9110 requires for If-None-Match."""
+    for tag in parse_etags(header):
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+def if_match_versions(header: str, user_id: UUID) -> Optional[List[datetime]]:
+    """
+    The `updated_at` values an If-Match header allows an update from.
+
+    Returns None for `*` (any current version). Weak tags and tags for another resource never
+    match under strong comparison, so they are dropped; an empty list therefore means the
+    precondition cannot succeed.
+    """
+    versions = []
+    for tag in parse_etags(header):
+        if tag == "*":
+            return None
+        if tag.startswith("W/") or len(tag) < 2 or tag[0] != '"' or tag[-1] != '"':
+            continue
+        resource, _, version = tag[1:-1].partition(".")
+        if resource != user_id.hex:
+            continue
+        try:
+            versions.append(_EPOCH + int(version, 16) * _MICROSECOND)
+        except (ValueError, OverflowError):
+            continue
+    return versions
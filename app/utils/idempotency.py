@@ -0,0 +1,168 @@
+"""
+`Idempotency-Key` support for POST endpoints that create or change users.
+
+A client that times out and retries a request sends the same `Idempotency-Key` header both
+times. Endpoints opt in with the `claim_idempotency_key` dependency. The first request claims
+the key in the shared `idempotency_keys` table (`IdempotencyService`), inside its own
+transaction, and runs. `IdempotencyMiddleware` saves its response (status, headers and body)
+before the last of it reaches the client. A repeat with the same key, on any worker, gets that
+response back, marked `Idempotent-Replayed: true`, without the endpoint running again. A
+duplicate that arrives while the first request is still running waits for it, up to
+`idempotency_wait_seconds`, and then gets 409.
+
+Keys are scoped to the caller, method and path. An authenticated caller is identified by the
+user in their token. An anonymous caller is identified by client address and request body,
+so two clients that happen to pick the same key never share a response. A key reused for a
+different body by the same authenticated caller is answered with 422. A 5xx response, or a
+request that fails before it commits, releases the key, so a retry runs the request again.
+"""
+from builtins import Exception, bytes, int, min, setattr, str
+from typing import List, NamedTuple, Optional
+import asyncio
+import hashlib
+import time
+from fastapi import Depends, Header, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from settings.config import get_settings
+from app.dependencies import get_db
+from app.services.idempotency_service import IdempotencyKeyBusy, IdempotencyService
+from app.services.jwt_service import decode_token
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+# Where `claim_idempotency_key` leaves its claim for the middleware (request.state).
+CLAIM_STATE = "idempotency_claim"
+# First and longest pause between checks for the response of an in-flight duplicate.
+POLL_SECONDS = 0.05
+MAX_POLL_SECONDS = 1.0
+
+
+class IdempotencyClaim(NamedTuple):
+    scope: str
+    key: str
+    engine: AsyncEngine
+
+
+class IdempotentReplay(Exception):
+    """Raised by `claim_idempotency_key` to answer with a stored response; see `replay_response`."""
+
+    def __init__(self, status_code: int, headers: List[List[str]], body: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+async def replay_response(request: Request, exc: IdempotentReplay) -> Response:
+    """Exception handler sending a stored response back unchanged."""
+    response = Response(content=exc.body, status_code=exc.status_code)
+    response.raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in exc.headers]
+    response.raw_headers.append((REPLAYED_HEADER, b"true"))
+    return response
+
+
+def request_scope(request: Request, fingerprint: str) -> str:
+    payload = decode_token(request.headers["authorization"].partition(" ")[2]) if "authorization" in request.headers else None
+    if payload is not None and (payload.get("uid") or payload.get("sub")):
+        caller = f"user:{payload.get('uid') or payload.get('sub')}"
+    else:
+        client = request.client.host if request.client else ""
+        caller = f"anonymous:{client}:{fingerprint}"
+    return hashlib.sha256(f"{caller}\n{request.method}\n{request.url.path}".encode()).hexdigest()
+
+
+async def claim_idempotency_key(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_KEY_LENGTH, description="Repeat a request safely: a retry with the same key gets the first response back."),
+    db: AsyncSession = Depends(get_db),
+) -> Optional[IdempotencyClaim]:
+    """
+    Dependency claiming the request's Idempotency-Key in its database session, or answering it
+    from a stored response. Declare it after the endpoint's authentication dependencies, so
+    refused requests never claim a key.
+    """
+    settings = get_settings()
+    if idempotency_key is None or not settings.idempotency_enabled:
+        return None
+    if not idempotency_key:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Idempotency-Key must not be empty.")
+    fingerprint = hashlib.sha256(await request.body()).hexdigest()
+    scope = request_scope(request, fingerprint)
+    deadline = time.monotonic() + settings.idempotency_wait_seconds
+    pause = POLL_SECONDS
+    while True:
+        try:
+            claimed = await IdempotencyService.claim(
+                db, scope, idempotency_key, fingerprint,
+                settings.idempotency_lease_seconds, int(settings.idempotency_wait_seconds * 1000),
+            )
+        except IdempotencyKeyBusy:
+            claimed = None
+        if claimed:
+            claim = IdempotencyClaim(scope, idempotency_key, db.bind)
+            setattr(request.state, CLAIM_STATE, claim)
+            return claim
+        stored = await IdempotencyService.get(db, scope, idempotency_key) if claimed is not None else None
+        # Nothing of this request is in the transaction yet; end it so no lock is held while waiting.
+        await db.rollback()
+        if stored is not None and stored.fingerprint != fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Idempotency-Key was already used for a different request.")
+        if stored is not None and stored.status_code is not None:
+            raise IdempotentReplay(stored.status_code, stored.response_headers, stored.response_body)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A request with this Idempotency-Key is still being processed.")
+        # In flight: the original has committed its claim but not yet stored its response.
+        await asyncio.sleep(min(pause, remaining))
+        pause = min(pause * 2, MAX_POLL_SECONDS)
+
+
+class IdempotencyMiddleware:
+    """
+    Saves the response of a request whose key `claim_idempotency_key` claimed, before the last
+    body chunk is passed on, so a client that retries as soon as it has the response gets the
+    replay. Releases the claim instead for a 5xx response or an unhandled error.
+    """
+
+    def __init__(self, app: ASGIApp, ttl_seconds: float):
+        self.app = app
+        self.ttl_seconds = ttl_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or IDEMPOTENCY_HEADER not in Headers(scope=scope):
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        settled = False
+
+        def current_claim() -> Optional[IdempotencyClaim]:
+            return scope.get("state", {}).get(CLAIM_STATE)
+
+        async def recording_send(message: Message):
+            nonlocal start, settled
+            claim = current_claim()
+            if claim is not None and not settled:
+                if message["type"] == "http.response.start":
+                    start = message
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+                    if not message.get("more_body", False):
+                        settled = True
+                        if start["status"] < 500:
+                            headers = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in start.get("headers", [])]
+                            await IdempotencyService.store(claim.engine, claim.scope, claim.key, start["status"], headers, b"".join(chunks), self.ttl_seconds)
+                        else:
+                            await IdempotencyService.release(claim.engine, claim.scope, claim.key)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            claim = current_claim()
+            if claim is not None and not settled:
+                await IdempotencyService.release(claim.engine, claim.scope, claim.key)
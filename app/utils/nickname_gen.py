@@ -1,10 +1,75 @@
-from builtins import str
+from builtins import int, len, list, range, set, str
+from typing import Awaitable, Callable, Iterable, List, Optional, Set
 import random
+import uuid
+
+ADJECTIVES = [
+    "agile", "amber", "ancient", "bold", "brave", "breezy", "bright", "brisk", "calm", "cheerful",
+    "clever", "cosmic", "crisp", "curious", "daring", "dapper", "eager", "electric", "fancy", "fearless",
+    "fierce", "gentle", "giddy", "glad", "golden", "graceful", "happy", "hardy", "honest", "humble",
+    "jolly", "keen", "kind", "lively", "loyal", "lucky", "mellow", "merry", "mighty", "misty",
+    "nimble", "noble", "plucky", "polite", "proud", "quick", "quiet", "rapid", "rustic", "sable",
+    "serene", "shiny", "silent", "sly", "snowy", "spry", "steady", "sunny", "swift", "tidy",
+    "vivid", "wise", "witty", "zesty",
+]
+ANIMALS = [
+    "alpaca", "badger", "beaver", "bison", "bobcat", "camel", "caribou", "cheetah", "condor", "cougar",
+    "coyote", "crane", "dingo", "dolphin", "eagle", "falcon", "ferret", "finch", "fox", "gazelle",
+    "gecko", "gibbon", "heron", "hippo", "ibis", "iguana", "impala", "jackal", "jaguar", "kestrel",
+    "koala", "lemur", "leopard", "lion", "llama", "lynx", "marmot", "marten", "meerkat", "moose",
+    "narwhal", "ocelot", "orca", "osprey", "otter", "owl", "panda", "panther", "pelican", "puffin",
+    "quail", "raccoon", "raven", "seal", "sparrow", "stoat", "swan", "tapir", "tiger", "toucan",
+    "walrus", "weasel", "wombat", "yak",
+]
+NUMBER_RANGE = 10000
+
+# Nicknames are drawn per process; SystemRandom keeps forked workers from sharing a seed.
+_random = random.SystemRandom()
+
+
+def nickname_space_size() -> int:
+    """Number of distinct values `generate_nickname` can produce."""
+    return len(ADJECTIVES) * len(ANIMALS) * NUMBER_RANGE
 
 
 def generate_nickname() -> str:
     """Generate a URL-safe nickname using adjectives and animal names."""
-    adjectives = ["clever", "jolly", "brave", "sly", "gentle"]
-    animals = ["panda", "fox", "raccoon", "koala", "lion"]
-    number = random.randint(0, 999)
-    return f"{random.choice(adjectives)}_{random.choice(animals)}_{number}"
+    number = _random.randrange(NUMBER_RANGE)
+    return f"{_random.choice(ADJECTIVES)}_{_random.choice(ANIMALS)}_{number}"
+
+
+def generate_nicknames(count: int) -> List[str]:
+    """Generate `count` distinct candidate nicknames."""
+    candidates: Set[str] = set()
+    while len(candidates) < count:
+        candidates.add(generate_nickname())
+    return list(candidates)
+
+
+def fallback_nickname(seed: Optional[uuid.UUID] = None) -> str:
+    """A nickname derived from a UUID, used once random candidates are exhausted."""
+    return f"user_{(seed or uuid.uuid4()).hex}"
+
+
+async def allocate_nickname(
+    find_taken: Callable[[List[str]], Awaitable[Iterable[str]]],
+    preferred: Optional[str] = None,
+    batch_size: int = 16,
+    max_rounds: int = 3,
+) -> str:
+    """
+    Pick a free nickname, checking candidates in batches.
+
+    `find_taken` receives a list of candidates and returns those already in use, so each round
+    costs one query regardless of batch size. The preferred nickname is tried first. After
+    `max_rounds` the UUID-based fallback is returned, so allocation always terminates.
+    """
+    for round_number in range(max_rounds):
+        candidates = generate_nicknames(batch_size)
+        if round_number == 0 and preferred:
+            candidates.insert(0, preferred)
+        taken = set(await find_taken(candidates))
+        for candidate in candidates:
+            if candidate not in taken:
+                return candidate
+    return fallback_nickname()
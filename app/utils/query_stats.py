@@ -0,0 +1,148 @@
+"""
+Per-request database query accounting.
+
+`instrument_engine` hooks SQLAlchemy's cursor events so every statement is counted and timed
+against the `QueryStats` of the request (or `track_queries` block) it ran in. Statements slower
+than `db_slow_query_ms` are logged with the shape of their parameters (names and types, never
+values), and a request that runs the same statement `db_repeated_query_threshold` times or more
+is logged as a likely N+1. In debug mode responses carry `X-DB-Queries` and `X-DB-Time`.
+"""
+from builtins import dict, float, getattr, int, isinstance, len, list, round, str, tuple, type
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+import logging
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Slow-query log lines include at most this much of the statement.
+MAX_LOGGED_STATEMENT = 500
+
+
+class QueryStats:
+    """Queries and database time of one request. Nested stats also count toward their parent."""
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.statements[statement] += 1
+            stats = stats.parent
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statements run at least `threshold` times."""
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count the queries run inside the block, including those of requests it makes in-process."""
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def parameter_shape(context) -> Any:
+    """Names and types of a statement's bound parameters, safe to log."""
+    parameters = getattr(context, "compiled_parameters", None) or []
+
+    def shape(values: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            name: f"{type(value).__name__}[{len(value)}]" if isinstance(value, (list, tuple)) else type(value).__name__
+            for name, value in values.items()
+        }
+
+    if len(parameters) > 1:
+        return {"rows": len(parameters), "row": shape(parameters[0])}
+    return shape(parameters[0]) if parameters else {}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    if elapsed_ms >= get_settings().db_slow_query_ms:
+        logger.warning(
+            "Slow query (%.1f ms): %s",
+            elapsed_ms,
+            statement[:MAX_LOGGED_STATEMENT],
+            extra={"duration_ms": round(elapsed_ms, 1), "parameters": parameter_shape(context)},
+        )
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time.
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine) -> None:
+    """Attach query accounting to an engine (sync or async). Safe to call more than once."""
+    sync_engine: Engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """Tracks each HTTP request's queries, flags likely N+1 patterns and, in debug mode, reports them in headers."""
+
+    def __init__(self, app: ASGIApp, emit_headers: bool = False):
+        self.app = app
+        self.emit_headers = emit_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_stats(message: Message):
+                if self.emit_headers and message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.count)
+                    headers["X-DB-Time"] = f"{stats.total_ms:.1f}"
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+        threshold = get_settings().db_repeated_query_threshold
+        if threshold <= 0:
+            return
+        for statement, count in stats.repeated(threshold).items():
+            logger.warning(
+                "Possible N+1: statement ran %d times in %s %s: %s",
+                count, scope["method"], scope["path"], statement[:MAX_LOGGED_STATEMENT],
+            )
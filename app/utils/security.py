@@ -1,8 +1,8 @@
 # app/security.py
 from builtins import Exception, ValueError, bool, int, str
 import secrets
-import bcrypt
 from logging import getLogger
+from app.utils.tracing import span
 
 # Set up logging
 logger = getLogger(__name__)
@@ -21,9 +21,11 @@ def hash_password(password: str, rounds: int = 12) -> str:
     Raises:
         ValueError: If hashing the password fails.
     """
+    import bcrypt  # Deferred to first use to keep application start-up fast.
     try:
-        salt = bcrypt.gensalt(rounds=rounds)
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
+        with span("security.hash_password", rounds=rounds):
+            salt = bcrypt.gensalt(rounds=rounds)
+            hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed_password.decode('utf-8')
     except Exception as e:
         logger.error("Failed to hash password: %s", e)
@@ -43,8 +45,10 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Raises:
         ValueError: If the hashed password format is incorrect or the function fails to verify.
     """
+    import bcrypt
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        with span("security.verify_password"):
+            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     except Exception as e:
         logger.error("Error verifying password: %s", e)
         raise ValueError("Authentication process encountered an unexpected error") from e
@@ -1,31 +1,46 @@
 # smtp_client.py
-from builtins import Exception, int, str
+from builtins import Exception, float, int, str
 import smtplib
+from typing import Optional
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from settings.config import settings
 import logging
 
 class SMTPClient:
-    def __init__(self, server: str, port: int, username: str, password: str):
+    def __init__(self, server: str, port: int, username: str, password: str, timeout: float = 30.0):
         self.server = server
         self.port = port
         self.username = username
         self.password = password
+        self.timeout = timeout
 
-    def send_email(self, subject: str, html_content: str, recipient: str):
-        try:
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = self.username
-            message['To'] = recipient
-            message.attach(MIMEText(html_content, 'html'))
+    def connect(self) -> smtplib.SMTP:
+        """
+        Open an authenticated connection that callers can reuse for several messages. Connecting
+        and every command on it fail after `timeout` seconds instead of blocking a thread forever.
+        """
+        connection = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        connection.starttls()  # Use TLS
+        connection.login(self.username, self.password)
+        return connection
+
+    def build_message(self, subject: str, html_content: str, recipient: str) -> str:
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = self.username
+        message['To'] = recipient
+        message.attach(MIMEText(html_content, 'html'))
+        return message.as_string()
 
-            with smtplib.SMTP(self.server, self.port) as server:
-                server.starttls()  # Use TLS
-                server.login(self.username, self.password)
-                server.sendmail(self.username, recipient, message.as_string())
-            logging.info(f"Email sent to {recipient}")
+    def send_email(self, subject: str, html_content: str, recipient: str, connection: Optional[smtplib.SMTP] = None):
+        try:
+            message = self.build_message(subject, html_content, recipient)
+            if connection is not None:
+                connection.sendmail(self.username, recipient, message)
+            else:
+                with self.connect() as server:
+                    server.sendmail(self.username, recipient, message)
+            logging.info("Email sent to %s", recipient)
         except Exception as e:
-            logging.error(f"Failed to send email: {str(e)}")
+            logging.error("Failed to send email: %s", e)
             raise
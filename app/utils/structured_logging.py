@@ -0,0 +1,185 @@
+"""
+Building blocks of the non-blocking logging pipeline set up by `app.utils.common.setup_logging`.
+
+Application code keeps using `logging.getLogger(__name__)` with %-style arguments. Records are
+stamped with the current request's correlation ID, rate limited per call site, and put on a
+bounded in-memory queue; a background thread encodes them as JSON and writes them out, so a
+slow stdout or log collector never stalls the event loop.
+"""
+from builtins import float, getattr, int, list, min, set, str, super, vars
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, Optional, Tuple
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import time
+import uuid
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Correlation ID of the request being handled. Tasks created while handling a request copy
+# the context, so background work logs under the ID of the request that started it.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Incoming IDs are echoed into logs and headers, so only short, plain tokens are accepted.
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is logged as a field.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "suppressed", "sample_rate"}
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+class CorrelationIdMiddleware:
+    """Assigns each HTTP request a correlation ID, reusing a well-formed `X-Request-ID` from the client."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the correlation ID of the context they were logged from."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site, so one hot loop or failing dependency cannot flood the log.
+
+    Each call site may log `burst` records at once and `rate` per second after that. The next
+    record let through after a suppression carries the number of records dropped in between.
+    A record logged with `extra={"sample_rate": 0.01}` is additionally sampled at that rate.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[Tuple[str, str, int], list] = {}
+        self._lock = Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate is not None and random.random() >= sample_rate:
+            return False
+        if self.rate <= 0:
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if bucket is None:
+                # [tokens, last refill, records suppressed since the last one let through]
+                bucket = self._buckets[site] = [float(self.burst), now, 0]
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request ID and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            payload["request_id"] = request_id
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            payload["suppressed"] = suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The human-readable console format, with the request ID when there is one."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{line} [request_id={request_id}]" if request_id else line
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never waits: when the queue is full the record is dropped and counted.
+
+    Only the message arguments are merged on the calling thread (a traceback, if any, is
+    rendered there too); encoding and writing happen on the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
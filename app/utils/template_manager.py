@@ -1,5 +1,8 @@
-import markdown2
 from pathlib import Path
+from typing import Dict
+
+# Raw template text, shared by every TemplateManager; templates only change on deploy.
+_template_cache: Dict[Path, str] = {}
 
 class TemplateManager:
     def __init__(self):
@@ -10,8 +13,19 @@ class TemplateManager:
     def _read_template(self, filename: str) -> str:
         """Private method to read template content."""
         template_path = self.templates_dir / filename
-        with open(template_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        if template_path not in _template_cache:
+            with open(template_path, 'r', encoding='utf-8') as file:
+                _template_cache[template_path] = file.read()
+        return _template_cache[template_path]
+
+    def preload(self) -> int:
+        """Read every template into the cache and load the markdown renderer. Returns the template count."""
+        template_names = [template_path.name for template_path in self.templates_dir.glob('*.md')]
+        for template_name in template_names:
+            self._read_template(template_name)
+        import markdown2
+        markdown2.markdown(self._read_template('header.md'))
+        return len(template_names)
 
     def _apply_email_styles(self, html: str) -> str:
         """Apply advanced CSS styles inline for email compatibility with excellent typography."""
@@ -42,5 +56,6 @@ class TemplateManager:
         main_content = main_template.format(**context)
 
         full_markdown = f"{header}\n{main_content}\n{footer}"
+        import markdown2  # Deferred: only processes that send email pay for importing it.
         html_content = markdown2.markdown(full_markdown)
         return self._apply_email_styles(html_content)
@@ -0,0 +1,362 @@
+"""
+Lightweight in-process request tracing.
+
+Every HTTP request handled by `TracingMiddleware` gets a trace. Code wraps the stages worth
+timing in `span(...)` (or decorates a function with `@traced(...)`), and each span records its
+start offset, duration and parent. Outside a traced request `span` is a no-op, so
+instrumented code costs next to nothing in scripts, tests and background jobs.
+
+A trace ends with its response: BackgroundTasks run after it, and spans opened once the trace
+has ended are not recorded. Work a request hands to `asyncio.create_task` should be wrapped in
+`untraced(...)`, since a task inherits the request's trace along with the rest of its context.
+
+Sampling is decided when a request finishes (tail sampling): slow requests and server errors
+are always kept, the rest at `tracing_sample_rate`. Kept traces go to an in-memory ring buffer,
+queried through the admin endpoint `/admin/traces`, and optionally to a JSON lines file written
+by a background thread.
+"""
+from builtins import Exception, bool, float, int, isinstance, len, list, next, object, open, reversed, round, sorted, str, super, type
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock, Thread
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional
+import asyncio
+import functools
+import json
+import queue
+import random
+import time
+import uuid
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.structured_logging import get_request_id
+
+# A trace keeps at most this many spans; anything beyond is counted in `dropped_spans`.
+MAX_SPANS_PER_TRACE = 500
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "start", "end", "attributes")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, start: float, attributes: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+
+class Trace:
+    """The spans recorded while handling one request. Times are `time.perf_counter()` seconds."""
+
+    def __init__(self, trace_id: str, name: str):
+        self.trace_id = trace_id
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.status_code: Optional[int] = None
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._next_id = 0
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def add_span(self, name: str, parent_id: Optional[int], start: float, attributes: Dict[str, Any]) -> Optional[Span]:
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped_spans += 1
+            return None
+        self._next_id += 1
+        span = Span(self._next_id, parent_id, name, start, attributes)
+        self.spans.append(span)
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "status_code": self.status_code,
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "start_ms": round((span.start - self.start) * 1000, 3),
+                    "duration_ms": round(((span.end or span.start) - span.start) * 1000, 3),
+                    "attributes": span.attributes,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """The trace of the request being handled, or None outside one or once its response was sent."""
+    trace = _current_trace.get()
+    return trace if trace is not None and trace.end is None else None
+
+
+async def untraced(awaitable: Awaitable) -> Any:
+    """
+    Await `awaitable` outside the current trace, e.g.
+    `asyncio.create_task(untraced(job()))` for background work started by a request.
+    """
+    trace_token = _current_trace.set(None)
+    span_token = _current_span.set(None)
+    try:
+        return await awaitable
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a child of the current span. Yields None outside a traced request."""
+    trace = current_trace()
+    if trace is None:
+        yield None
+        return
+    recorded = trace.add_span(name, _current_span.get(), time.perf_counter(), attributes)
+    if recorded is None:
+        yield None
+        return
+    token = _current_span.set(recorded.span_id)
+    try:
+        yield recorded
+    except Exception as e:
+        recorded.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        recorded.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def record_span(name: str, start: float, end: float, **attributes):
+    """Add an already finished span, for stages whose start was only known after the fact."""
+    trace = current_trace()
+    if trace is not None:
+        recorded = trace.add_span(name, _current_span.get(), start, attributes)
+        if recorded is not None:
+            recorded.end = end
+
+
+def traced(name: str) -> Callable:
+    """Decorator recording a span around every call of a sync or async function."""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracedRoute(APIRoute):
+    """
+    Route class splitting a request into dependency resolution, the endpoint body and response
+    serialization. Use it with `APIRouter(route_class=TracedRoute)`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        endpoint = self.dependant.call
+        if asyncio.iscoroutinefunction(endpoint):
+            self.dependant.call = self._wrap_endpoint(endpoint)
+
+    def _wrap_endpoint(self, endpoint: Callable) -> Callable:
+        endpoint_name = f"endpoint {self.name}"
+
+        @functools.wraps(endpoint)
+        async def traced_endpoint(**values):
+            trace = current_trace()
+            route_span_id = _current_span.get()
+            if trace is not None and route_span_id is not None:
+                # Everything between entering the route and calling the endpoint was dependency resolution.
+                record_span("dependencies", trace.spans[route_span_id - 1].start, time.perf_counter())
+            with span(endpoint_name):
+                return await endpoint(**values)
+        return traced_endpoint
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route_name = f"route {','.join(sorted(self.methods or []))} {self.path_format}"
+
+        endpoint_name = f"endpoint {self.name}"
+
+        async def traced_handler(request):
+            with span(route_name) as route_span:
+                response = await handler(request)
+                if route_span is not None:
+                    # After the endpoint returned, the handler validated and encoded its result.
+                    trace = _current_trace.get()
+                    endpoint_span = next((s for s in reversed(trace.spans) if s.parent_id == route_span.span_id and s.name == endpoint_name), None)
+                    if endpoint_span is not None and endpoint_span.end is not None:
+                        record_span("serialize", endpoint_span.end, time.perf_counter())
+                return response
+        return traced_handler
+
+
+class RingBufferExporter:
+    """Keeps the most recent `size` sampled traces in memory."""
+
+    def __init__(self, size: int):
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._lock = Lock()
+
+    def export(self, trace: Dict[str, Any]):
+        with self._lock:
+            self._traces.append(trace)
+
+    def query(self, min_duration_ms: float = 0, name_contains: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest first."""
+        with self._lock:
+            traces = list(self._traces)
+        matches = []
+        for trace in reversed(traces):
+            if trace["duration_ms"] < min_duration_ms:
+                continue
+            if name_contains and name_contains not in trace["name"]:
+                continue
+            matches.append(trace)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((trace for trace in self._traces if trace["trace_id"] == trace_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+class FileExporter:
+    """Appends traces as JSON lines from a background thread; drops traces rather than block."""
+
+    def __init__(self, path: str, queue_size: int = 1000):
+        self.path = path
+        self.dropped = 0
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[Thread] = None
+
+    def export(self, trace: Dict[str, Any]):
+        if self._thread is None or not self._thread.is_alive():
+            # Started on first use, so each forked worker runs its own writer.
+            self._thread = Thread(target=self._write_forever, name="trace-file-exporter", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(json.dumps(trace, default=str))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_forever(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                file.write(self._queue.get() + "\n")
+                if self._queue.empty():
+                    file.flush()
+
+
+class Tracer:
+    """Holds the sampling policy and exporters shared by every request in the process."""
+
+    def __init__(self, enabled: bool, slow_ms: float, sample_rate: float, exporters: List[object]):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.exporters = exporters
+        self.recorded = 0
+        self.kept = 0
+
+    @property
+    def buffer(self) -> Optional[RingBufferExporter]:
+        return next((exporter for exporter in self.exporters if isinstance(exporter, RingBufferExporter)), None)
+
+    def should_keep(self, trace: Trace) -> bool:
+        if trace.duration_ms >= self.slow_ms:
+            return True
+        if trace.status_code is not None and trace.status_code >= 500:
+            return True
+        return random.random() < self.sample_rate
+
+    def finish(self, trace: Trace):
+        trace.end = time.perf_counter()
+        self.recorded += 1
+        if not self.should_keep(trace):
+            return
+        self.kept += 1
+        exported = trace.to_dict()
+        for exporter in self.exporters:
+            exporter.export(exported)
+
+
+class TracingMiddleware:
+    """
+    Opens a trace for every HTTP request and hands it to the tracer once the response is sent,
+    before any BackgroundTasks run.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Tracer, exclude_paths=("/healthz", "/readyz")):
+        self.app = app
+        self.tracer = tracer
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.tracer.enabled or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        trace = Trace(get_request_id() or uuid.uuid4().hex, f"{scope['method']} {scope['path']}")
+        token = _current_trace.set(trace)
+
+        def finish():
+            if trace.end is not None:
+                return
+            route = scope.get("route")
+            if route is not None:
+                trace.name = f"{scope['method']} {route.path_format}"
+            self.tracer.finish(trace)
+
+        async def send_with_status(message: Message):
+            if message["type"] == "http.response.start":
+                trace.status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            trace.status_code = trace.status_code or 500
+            raise
+        finally:
+            _current_trace.reset(token)
+            finish()
+
+
+def build_tracer(settings) -> Tracer:
+    exporters: List[object] = []
+    if settings.tracing_buffer_size > 0:
+        exporters.append(RingBufferExporter(settings.tracing_buffer_size))
+    if settings.tracing_file_path:
+        exporters.append(FileExporter(settings.tracing_file_path))
+    return Tracer(settings.tracing_enabled, settings.tracing_slow_ms, settings.tracing_sample_rate, exporters)
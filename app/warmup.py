@@ -0,0 +1,87 @@
+"""
+Start-up warm-up, run from the application lifespan before the worker accepts traffic.
+
+Without it the first requests on a freshly started worker pay for opening database connections,
+asyncpg's type introspection, SQLAlchemy statement compilation, reading email templates and
+generating the OpenAPI schema.
+"""
+from builtins import BaseException, Exception, int, isinstance, range
+from typing import Dict, List
+from uuid import UUID
+import asyncio
+import logging
+import time
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from app.services.user_service import UserService
+from app.utils.template_manager import TemplateManager
+
+logger = logging.getLogger(__name__)
+
+# Lookups for a key that cannot exist still compile and prepare the statement.
+_WARMUP_ID = UUID(int=0)
+_WARMUP_VALUE = "__warmup__"
+
+
+async def run_hot_queries(session: AsyncSession):
+    """Execute every hot UserService query once so it is compiled and prepared on this connection."""
+    await UserService.get_by_id(session, _WARMUP_ID)
+    await UserService.get_by_email(session, _WARMUP_VALUE)
+    await UserService.get_by_nickname(session, _WARMUP_VALUE)
+    await UserService.count(session)
+    await UserService.list_users(session, skip=0, limit=10)
+    await UserService.get_view_by_id(session, _WARMUP_ID)
+    await UserService.list_views(session, skip=0, limit=10)
+
+
+async def warm_database(engine: AsyncEngine, connections: int):
+    """Open `connections` pool connections at once and prime each one with the hot queries."""
+    opened: List[AsyncConnection] = []
+
+    async def open_connection():
+        opened.append(await engine.connect())
+
+    try:
+        # Every attempt settles before the first error is raised, so none opens after the cleanup below.
+        # A timeout cancels them all and gather waits for that too.
+        for result in await asyncio.gather(*(open_connection() for _ in range(connections)), return_exceptions=True):
+            if isinstance(result, BaseException):
+                raise result
+        for connection in opened:
+            async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+                await run_hot_queries(session)
+    finally:
+        # Closing returns the connections to the pool, where they stay open for real requests,
+        # including those opened before a failure or the stage's timeout.
+        for connection in opened:
+            await connection.close()
+
+
+async def warm_up(app: FastAPI, engine: AsyncEngine, connections: int, timeout: float) -> Dict[str, float]:
+    """
+    Run every warm-up stage and return how long each took, in milliseconds.
+
+    A stage that fails or runs past `timeout` is logged and skipped: a slow first request is
+    better than a worker that never becomes ready.
+    """
+    async def warm_templates():
+        await asyncio.to_thread(TemplateManager().preload)
+
+    async def warm_openapi():
+        app.openapi()
+
+    stages = {
+        "database": lambda: warm_database(engine, connections),
+        "templates": warm_templates,
+        "openapi": warm_openapi,
+    }
+    timings = {}
+    for name, stage in stages.items():
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(stage(), timeout)
+        except Exception as e:
+            logger.warning("Warm-up stage '%s' skipped: %r", name, e)
+        timings[name] = (time.perf_counter() - started) * 1000
+    logger.info("Warm-up finished: %s", ", ".join(f"{name} {ms:.0f} ms" for name, ms in timings.items()))
+    return timings
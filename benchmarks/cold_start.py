@@ -0,0 +1,68 @@
+"""
+Cold-start report: how long a fresh interpreter takes to build the application, and which
+imports that time goes to.
+
+Each run starts a new Python process with `-X importtime`, builds the app through
+`create_app()`, and prints the slowest top-level imports. The run fails (exit code 1) when the
+median start-up exceeds the budget, so it can gate CI.
+
+Run from the project root:
+    python -m benchmarks.cold_start --budget-ms 2500 --runs 5
+"""
+from builtins import float, int, len, print, range, sorted, str
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BUILD_APP = (
+    "import time; started = time.perf_counter(); "
+    "from app.main import create_app; create_app(); "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def run_once():
+    """Return (milliseconds to build the app, {top-level package: import microseconds spent in it})."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BUILD_APP],
+        capture_output=True, text=True, check=True,
+    )
+    packages = defaultdict(int)
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        if not self_time.strip().isdigit():
+            continue
+        # Attribute each module's own time to its top-level package, so nesting is not double counted.
+        packages[name.strip().split(".")[0]] += int(self_time)
+    return float(completed.stdout.strip().splitlines()[-1]), packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=2500.0, help="Median start-up time allowed.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to measure.")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list.")
+    args = parser.parse_args()
+
+    timings = []
+    packages = {}
+    for _ in range(args.runs):
+        elapsed_ms, packages = run_once()
+        timings.append(elapsed_ms)
+
+    print(f"{'package':<28} {'import ms':>10}")
+    for name, micros in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<28} {micros / 1000:>10.1f}")
+    median = statistics.median(timings)
+    print(f"\ncreate_app(): median {median:.0f} ms over {len(timings)} runs (budget {args.budget_ms:.0f} ms)")
+    if median > args.budget_ms:
+        print("Cold-start budget exceeded.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
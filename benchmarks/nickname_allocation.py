@@ -0,0 +1,67 @@
+"""
+Benchmark nickname allocation against tables of 10k, 100k and 1M existing users.
+
+The database is simulated by an in-memory set, so the numbers isolate the cost that matters:
+how many round trips a registration needs before it finds a free nickname. Each round trip of
+the batched allocator is a single `nickname = ANY(...)` query; the legacy allocator issued one
+query per candidate from a 25,000-value space.
+
+Run from the project root:
+    python -m benchmarks.nickname_allocation
+"""
+from builtins import len, print, range, set
+import asyncio
+import random
+import statistics
+import time
+from app.utils.nickname_gen import allocate_nickname, generate_nicknames, nickname_space_size
+
+TABLE_SIZES = [10_000, 100_000, 1_000_000]
+ALLOCATIONS = 2_000
+LEGACY_SPACE = 5 * 5 * 1000
+# The legacy loop had no bound; cap it so the benchmark itself terminates.
+LEGACY_MAX_QUERIES = 10_000
+
+
+def legacy_allocate(taken: set) -> int:
+    """Replay the old one-query-per-candidate loop and return how many queries it needed."""
+    queries = 0
+    while queries < LEGACY_MAX_QUERIES:
+        queries += 1
+        if random.randrange(LEGACY_SPACE) >= len(taken):
+            return queries
+    return queries
+
+
+async def batched_allocate(taken: set) -> int:
+    queries = 0
+
+    async def find_taken(candidates):
+        nonlocal queries
+        queries += 1
+        return [candidate for candidate in candidates if candidate in taken]
+
+    await allocate_nickname(find_taken)
+    return queries
+
+
+async def main():
+    print(f"Nickname space: {nickname_space_size():,} values (legacy: {LEGACY_SPACE:,})")
+    print(f"{'users':>10} | {'batched q/alloc':>15} | {'max':>4} | {'us/alloc':>9} | {'legacy q/alloc':>14}")
+    for size in TABLE_SIZES:
+        taken = set(generate_nicknames(size))
+        legacy_taken = set(range(min(size, LEGACY_SPACE)))
+
+        started = time.perf_counter()
+        batched = [await batched_allocate(taken) for _ in range(ALLOCATIONS)]
+        elapsed_us = (time.perf_counter() - started) / ALLOCATIONS * 1e6
+        legacy = [legacy_allocate(legacy_taken) for _ in range(ALLOCATIONS)]
+
+        print(
+            f"{size:>10,} | {statistics.mean(batched):>15.3f} | {max(batched):>4} | {elapsed_us:>9.1f} | "
+            f"{statistics.mean(legacy):>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
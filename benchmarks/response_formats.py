@@ -0,0 +1,82 @@
+"""
+Bytes on the wire and server CPU per response format for GET /users/ pages.
+
+Pages of fake users are built and serialised exactly as the list endpoint does, then encoded
+by `app.utils.content_negotiation.encode_body` in every format a client can negotiate: JSON or
+MessagePack, each uncompressed, gzip and brotli. CPU is process time spent encoding one page,
+on top of the JSON serialisation every format pays; it is what a worker spends per response.
+
+Run from the project root:
+    python -m benchmarks.response_formats --page-sizes 10 100 1000
+"""
+from builtins import int, len, max, print, range
+import argparse
+import time
+import uuid
+from faker import Faker
+from app.models.user_model import UserRole
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.utils.content_negotiation import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, encode_body
+from settings.config import get_settings
+
+FORMATS = [
+    ("json", JSON_MEDIA_TYPE, None),
+    ("json+gzip", JSON_MEDIA_TYPE, "gzip"),
+    ("json+br", JSON_MEDIA_TYPE, "br"),
+    ("msgpack", MSGPACK_MEDIA_TYPE, None),
+    ("msgpack+gzip", MSGPACK_MEDIA_TYPE, "gzip"),
+    ("msgpack+br", MSGPACK_MEDIA_TYPE, "br"),
+]
+
+
+def build_page(size: int, fake: Faker) -> bytes:
+    """A serialised list page, as the endpoint caches and sends it."""
+    items = []
+    for _ in range(size):
+        nickname = fake.user_name()
+        items.append(UserResponse(
+            id=uuid.uuid4(),
+            email=fake.email(),
+            nickname=nickname,
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            bio=fake.sentence(nb_words=12),
+            profile_picture_url=f"https://example.com/profiles/{nickname}.jpg",
+            linkedin_profile_url=f"https://linkedin.com/in/{nickname}",
+            github_profile_url=f"https://github.com/{nickname}",
+            role=UserRole.AUTHENTICATED,
+        ))
+    return UserListResponse(items=items, total=size * 10, page=1, size=size).model_dump_json(by_alias=True).encode()
+
+
+def measure(body: bytes, media_type: str, encoding, repeats: int, gzip_level: int, brotli_quality: int):
+    """Return (encoded size in bytes, CPU microseconds per encode)."""
+    started = time.process_time()
+    for _ in range(repeats):
+        encoded = encode_body(body, media_type, encoding, gzip_level, brotli_quality)
+    return len(encoded), (time.process_time() - started) / repeats * 1_000_000
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 1000], help="Users per page.")
+    parser.add_argument("--repeats", type=int, default=200, help="Encodes per format for a 10-user page; larger pages run proportionally fewer.")
+    parser.add_argument("--gzip-level", type=int, default=settings.compression_gzip_level)
+    parser.add_argument("--brotli-quality", type=int, default=settings.compression_brotli_quality)
+    args = parser.parse_args()
+
+    fake = Faker()
+    Faker.seed(0)
+    for size in args.page_sizes:
+        body = build_page(size, fake)
+        repeats = max(1, args.repeats * 10 // size)
+        print(f"\n{size} users per page ({len(body)} bytes of JSON, {repeats} encodes per format)")
+        print(f"{'format':<14} {'bytes':>10} {'vs json':>8} {'cpu us':>10}")
+        for name, media_type, encoding in FORMATS:
+            encoded_size, cpu_us = measure(body, media_type, encoding, repeats, args.gzip_level, args.brotli_quality)
+            print(f"{name:<14} {encoded_size:>10} {encoded_size / len(body):>8.0%} {cpu_us:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Validations per second for the user request schemas.
+
+Each schema is validated from a dict, as FastAPI does for a JSON request body, with a valid
+payload and with one that fails a custom validator (the error path builds a ValidationError,
+which is noticeably slower). Use it to compare validator changes against a baseline checkout.
+
+Run from the project root:
+    python -m benchmarks.schema_validation --seconds 1
+"""
+from builtins import float, print, range
+import argparse
+import time
+from pydantic import ValidationError
+from app.schemas.user_schemas import UserCreate, UserUpdate, UserUpdateProfile
+
+PROFILE = {
+    "nickname": "clever_panda_123",
+    "first_name": "Anne Marie",
+    "last_name": "O'Reilly",
+    "bio": "Experienced software developer specializing in web applications.",
+    "profile_picture_url": "https://example.com/profiles/anne.jpg",
+    "linkedin_profile_url": "https://linkedin.com/in/annemarie",
+    "github_profile_url": "https://github.com/annemarie",
+}
+
+CASES = [
+    ("UserCreate", UserCreate, {**PROFILE, "email": "anne.marie@example.com", "role": "AUTHENTICATED", "password": "Secure*1234"}),
+    ("UserCreate (bad password)", UserCreate, {**PROFILE, "email": "anne.marie@example.com", "role": "AUTHENTICATED", "password": "secure*1234"}),
+    ("UserUpdate", UserUpdate, {**PROFILE, "email": "anne.marie@example.com"}),
+    ("UserUpdate (empty)", UserUpdate, {}),
+    ("UserUpdateProfile", UserUpdateProfile, PROFILE),
+    ("UserUpdateProfile (bad URL)", UserUpdateProfile, {**PROFILE, "linkedin_profile_url": "https://linkedin.com/company/x"}),
+]
+
+
+def validations_per_second(model, payload, seconds: float) -> float:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        # Batches of 100 keep the clock reads out of the measurement.
+        for _ in range(100):
+            try:
+                model.model_validate(payload)
+            except ValidationError:
+                pass
+        count += 100
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent on each case.")
+    args = parser.parse_args()
+
+    print(f"{'case':<30} {'validations/s':>14} {'us each':>8}")
+    for name, model, payload in CASES:
+        rate = validations_per_second(model, payload, args.seconds)
+        print(f"{name:<30} {rate:>14,.0f} {1_000_000 / rate:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
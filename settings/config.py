@@ -1,4 +1,5 @@
-from builtins import bool, int, str
+from builtins import AttributeError, bool, int, str
+from functools import lru_cache
 from pathlib import Path
 from pydantic import  Field, AnyUrl, DirectoryPath
 from pydantic_settings import BaseSettings
@@ -40,6 +41,89 @@ class Settings(BaseSettings):
     smtp_port: int = Field(default=2525, description="SMTP port for sending emails")
     smtp_username: str = Field(default='your-mailtrap-username', description="Username for SMTP server")
     smtp_password: str = Field(default='your-mailtrap-password', description="Password for SMTP server")
+    smtp_timeout_seconds: float = Field(default=30.0, description="Longest an SMTP connect or command may block before failing")
+    # Production server (python -m app.server)
+    web_host: str = Field(default='0.0.0.0', description="Interface the production server binds to")
+    web_port: int = Field(default=8000, description="Port the production server binds to")
+    web_workers: int = Field(default=0, description="Worker processes; 0 means one per available CPU")
+    web_worker_max_requests: int = Field(default=10000, description="Requests a worker serves before it is recycled; 0 disables recycling")
+    web_worker_max_requests_jitter: int = Field(default=1000, description="Random spread added to max requests so workers do not restart together")
+    web_worker_timeout: int = Field(default=60, description="Seconds a silent worker is allowed before it is killed and replaced")
+    web_graceful_timeout: int = Field(default=30, description="Seconds workers get to finish in-flight requests on shutdown")
+    web_keepalive: int = Field(default=5, description="Seconds to keep idle HTTP connections open")
+    # Database pool, query accounting and start-up warm-up
+    db_pool_size: int = Field(default=5, description="Connections kept open in each worker's database pool")
+    db_max_overflow: int = Field(default=10, description="Extra connections a worker may open under load")
+    db_slow_query_ms: float = Field(default=200.0, description="Statements slower than this are logged with their parameter shape")
+    db_repeated_query_threshold: int = Field(default=10, description="Log a likely N+1 when one request runs the same statement this often; 0 disables")
+    warmup_enabled: bool = Field(default=True, description="Warm pools, statements, templates and OpenAPI before serving")
+    warmup_db_connections: int = Field(default=2, description="Pool connections opened and primed during warm-up")
+    warmup_timeout_seconds: float = Field(default=10.0, description="Longest warm-up may delay start-up before serving anyway")
+    # Logging
+    log_level: str = Field(default='INFO', description="Minimum level of records written to the log")
+    log_format: str = Field(default='json', description="'json' for one JSON object per line, 'text' for the console format")
+    log_queue_size: int = Field(default=10000, description="Records buffered for the log writer thread before new ones are dropped")
+    log_rate_limit_per_second: float = Field(default=20.0, description="Records per second a single log call site may emit; 0 disables rate limiting")
+    log_rate_limit_burst: int = Field(default=100, description="Records a single log call site may emit at once before rate limiting starts")
+    # Request tracing
+    tracing_enabled: bool = Field(default=True, description="Record per-stage timings for every request")
+    tracing_slow_ms: float = Field(default=500.0, description="Requests at least this slow always keep their trace")
+    tracing_sample_rate: float = Field(default=0.01, description="Fraction of faster, successful requests whose trace is kept")
+    tracing_buffer_size: int = Field(default=200, description="Kept traces held in memory for /admin/traces; 0 disables the buffer")
+    tracing_file_path: str = Field(default='', description="JSON lines file kept traces are appended to; empty disables file export")
+    # Health probes and graceful shutdown
+    readiness_cache_seconds: float = Field(default=2.0, description="Seconds a readiness database check is reused by later probes")
+    readiness_timeout_seconds: float = Field(default=1.0, description="Longest a readiness database check may take before reporting not ready")
+    shutdown_drain_seconds: float = Field(default=20.0, description="Seconds in-flight requests and notification jobs get to finish on shutdown; keep below web_graceful_timeout")
+    # Batch administration
+    max_batch_size: int = Field(default=500, description="Maximum number of users a single batch operation may change")
+    # Periodic jobs
+    scheduler_enabled: bool = Field(default=True, description="Run periodic jobs; each job runs in one worker at a time, chosen through a Postgres advisory lock")
+    scheduler_jitter_seconds: float = Field(default=5.0, description="Random delay added to each job slot so workers do not all wake at once")
+    scheduler_default_timeout_seconds: float = Field(default=600.0, description="Longest a periodic job may run before it is cancelled")
+    archive_schedule: str = Field(default='30 3 * * *', description="Cron expression (UTC) for archiving unverified users; empty disables the job")
+    notification_resume_interval_seconds: float = Field(default=300.0, description="How often abandoned notification jobs are looked for and resumed; 0 disables")
+    user_stats_reconcile_interval_seconds: float = Field(default=3600.0, description="How often the user counters are recounted from the users table and corrected; 0 disables")
+    # Archival of never-verified registrations
+    archive_unverified_after_days: int = Field(default=30, description="Unverified anonymous accounts older than this many days are archived")
+    archive_batch_size: int = Field(default=500, description="Users moved to the archive table per transaction")
+    archive_batch_pause_seconds: float = Field(default=0.5, description="Pause between archival batches, leaving room for regular traffic")
+    archive_lock_timeout_ms: int = Field(default=2000, description="Longest an archival batch waits for a lock before giving up")
+    archive_max_batches: int = Field(default=100, description="Batches a single archival run may move before stopping; the next run continues")
+    # Bulk notification fan-out
+    notification_batch_size: int = Field(default=200, description="Recipients rendered and checkpointed together in a fan-out job")
+    notification_rate_per_second: float = Field(default=10.0, description="Maximum emails per second sent by a fan-out job")
+    notification_smtp_connections: int = Field(default=2, description="SMTP connections a fan-out job keeps open and reuses")
+    notification_job_stale_seconds: int = Field(default=300, description="Seconds without a heartbeat before a running job may be resumed elsewhere")
+    notification_heartbeat_seconds: float = Field(default=30.0, description="How often a running fan-out job refreshes its heartbeat, independently of batches; keep well below notification_job_stale_seconds")
+    # Typeahead
+    suggest_index_enabled: bool = Field(default=True, description="Keep an in-process prefix index of nicknames and emails for /users/suggest")
+    suggest_index_max_bytes: int = Field(default=64 * 1024 * 1024, description="Estimated memory the prefix index may use per worker; above it suggestions are read from the database")
+    suggest_index_refresh_seconds: float = Field(default=900.0, description="How often every worker reloads its prefix index, picking up writes made by other workers; 0 disables")
+    # User search
+    search_similarity_threshold: float = Field(default=0.5, description="Lowest pg_trgm word similarity for /users/search to count a word as a match; lower finds more misspellings and more noise")
+    # User record cache
+    user_cache_enabled: bool = Field(default=True, description="Cache user rows between requests to skip repeated lookups")
+    user_cache_max_size: int = Field(default=10000, description="Maximum number of users held in the in-process cache")
+    user_cache_ttl_seconds: float = Field(default=60.0, description="Seconds a cached user record stays valid")
+    user_change_listener_enabled: bool = Field(default=True, description="LISTEN for user changes committed by any worker and drop cached copies; the user cache is bypassed while not listening")
+    user_change_keepalive_seconds: float = Field(default=30.0, description="Idle seconds before the user change listener checks that its connection is still alive")
+    # User list response cache
+    list_cache_enabled: bool = Field(default=True, description="Cache serialised GET /users/ pages between identical requests")
+    list_cache_ttl_seconds: float = Field(default=5.0, description="Seconds a cached user list page is served; bounds staleness across workers")
+    list_cache_max_entries: int = Field(default=256, description="Maximum number of user list pages held in the cache")
+    # Idempotency keys
+    idempotency_enabled: bool = Field(default=True, description="Replay the stored response to POSTs that repeat an Idempotency-Key instead of running them again")
+    idempotency_ttl_seconds: float = Field(default=86400.0, description="Seconds a response is kept for retries that repeat its Idempotency-Key")
+    idempotency_wait_seconds: float = Field(default=30.0, description="How long a duplicate waits for the in-flight original before it is answered 409")
+    idempotency_lease_seconds: float = Field(default=60.0, description="Seconds a claimed key with no stored response holds off retries; after that the original is presumed lost and a retry runs again")
+    idempotency_purge_interval_seconds: float = Field(default=3600.0, description="How often expired idempotency keys are deleted; 0 disables")
+    # Response encoding
+    msgpack_enabled: bool = Field(default=True, description="Serve JSON responses as MessagePack to clients that ask for application/msgpack")
+    compression_min_bytes: int = Field(default=1024, description="Smallest response body compressed with gzip or brotli")
+    compression_gzip_level: int = Field(default=6, description="gzip compression level (1-9)")
+    compression_brotli_quality: int = Field(default=4, description="brotli quality (0-11); higher is smaller but slower")
+    encoding_offload_bytes: int = Field(default=65536, description="Bodies at least this large are encoded in a worker thread, off the event loop")
 
 
     class Config:
@@ -47,5 +131,13 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = 'utf-8'
 
-# Instantiate settings to be imported in your application
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Return the process-wide settings, reading the environment and .env file only once."""
+    return Settings()
+
+def __getattr__(name: str):
+    # `from settings.config import settings` keeps working, but nothing is read until first use.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
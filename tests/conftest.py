@@ -14,7 +14,8 @@ Fixtures:
 """
 
 # Standard library imports
-from builtins import Exception, range, str
+from builtins import Exception, int, range, str
+from contextlib import contextmanager
 from datetime import timedelta
 from unittest.mock import AsyncMock, patch
 from uuid import uuid4
@@ -36,6 +37,10 @@ from app.utils.security import hash_password
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import create_access_token
+from app.services.response_cache import list_users_cache
+from app.services.suggest_index import suggest_index
+from app.services.user_cache import user_cache
+from app.utils.query_stats import instrument_engine, track_queries
 
 fake = Faker()
 
@@ -44,6 +49,7 @@ TEST_DATABASE_URL = settings.database_url.replace("postgresql://", "postgresql+a
 engine = create_async_engine(TEST_DATABASE_URL, echo=settings.debug)
 AsyncTestingSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 AsyncSessionScoped = scoped_session(AsyncTestingSessionLocal)
+instrument_engine(engine)
 
 
 @pytest.fixture
@@ -74,6 +80,12 @@ def initialize_database():
 # this function setup and tears down (drops tales) for each test function, so you have a clean database for each test.
 @pytest.fixture(scope="function", autouse=True)
 async def setup_database():
+    # Cached rows would outlive the tables dropped below, so start every test cold.
+    user_cache.clear()
+    # A test that ran the app lifespan leaves the cache suspended by the stopped change listener.
+    user_cache.suspended = False
+    list_users_cache.clear()
+    suggest_index.clear()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield
@@ -90,6 +102,23 @@ async def db_session(setup_database):
         finally:
             await session.close()
 
+@pytest.fixture
+def query_budget():
+    """`with query_budget(3): ...` fails the test if the block runs more than 3 database queries."""
+    @contextmanager
+    def budget(max_queries: int):
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f"Ran {stats.count} queries, budget is {max_queries}:\n" + "\n".join(stats.statements)
+        )
+    return budget
+
+@pytest.fixture(scope="function")
+def session_factory(setup_database):
+    """Session factory for code that opens its own sessions, such as background jobs."""
+    return AsyncTestingSessionLocal
+
 @pytest.fixture(scope="function")
 async def locked_user(db_session):
     unique_email = fake.email()
@@ -213,18 +242,18 @@ async def manager_user(db_session: AsyncSession):
 # Configure a fixture for each type of user role you want to test
 @pytest.fixture(scope="function")
 def admin_token(admin_user):
-    # Assuming admin_user has an 'id' and 'role' attribute
-    token_data = {"sub": str(admin_user.id), "role": admin_user.role.name}
+    # The claims login issues: the user is looked up by `uid` on every request.
+    token_data = {"sub": admin_user.email, "uid": str(admin_user.id), "role": admin_user.role.name}
     return create_access_token(data=token_data, expires_delta=timedelta(minutes=30))
 
 @pytest.fixture(scope="function")
 def manager_token(manager_user):
-    token_data = {"sub": str(manager_user.id), "role": manager_user.role.name}
+    token_data = {"sub": manager_user.email, "uid": str(manager_user.id), "role": manager_user.role.name}
     return create_access_token(data=token_data, expires_delta=timedelta(minutes=30))
 
 @pytest.fixture(scope="function")
 def user_token(user):
-    token_data = {"sub": str(user.id), "role": user.role.name}
+    token_data = {"sub": user.email, "uid": str(user.id), "role": user.role.name}
     return create_access_token(data=token_data, expires_delta=timedelta(minutes=30))
 
 @pytest.fixture
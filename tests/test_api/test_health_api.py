@@ -0,0 +1,107 @@
+from unittest.mock import MagicMock
+import asyncio
+import os
+import signal
+import pytest
+import uvicorn
+from app.database import Database
+from app.dependencies import get_settings
+from app.lifecycle import Lifecycle
+from app.main import app, create_app
+from app.services.notification_service import NotificationService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def lifecycle():
+    lifecycle = app.state.lifecycle
+    yield lifecycle
+    lifecycle.ready = False
+    lifecycle.draining = False
+    lifecycle._database_checked_at = None
+
+
+async def test_healthz(async_client):
+    response = await async_client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+async def test_readyz_not_ready_before_startup(async_client, lifecycle):
+    response = await async_client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+
+async def test_readyz_checks_database(async_client, lifecycle):
+    lifecycle.ready = True
+    response = await async_client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["database"] == "ok"
+
+
+async def test_draining_refuses_new_requests(async_client, lifecycle, admin_token):
+    lifecycle.ready = True
+    lifecycle.begin_drain()
+    response = await async_client.get("/users/", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 503
+    assert response.headers["connection"] == "close"
+    response = await async_client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "draining"
+    # Liveness is unaffected by draining.
+    assert (await async_client.get("/healthz")).status_code == 200
+
+
+async def test_database_check_is_cached():
+    lifecycle = Lifecycle()
+    engine = MagicMock()
+    engine.connect.side_effect = ConnectionRefusedError("database unavailable")
+    first = await lifecycle.check_database(engine, max_age=60, timeout=1)
+    second = await lifecycle.check_database(engine, max_age=60, timeout=1)
+    assert first[0] is False and second[0] is False
+    assert engine.connect.call_count == 1
+
+
+async def test_lifespan_owns_engine():
+    application = create_app()
+    settings = get_settings()
+    try:
+        async with application.router.lifespan_context(application):
+            assert application.state.lifecycle.ready
+            assert Database.get_engine() is not None
+        assert application.state.lifecycle.draining
+        with pytest.raises(ValueError):
+            Database.get_engine()
+    finally:
+        NotificationService._accepting = True
+        Database.initialize(settings.database_url)
+
+
+async def test_sigterm_starts_draining_before_the_server_shuts_down():
+    application = create_app()
+    settings = get_settings()
+    server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=0, log_level="warning"))
+    # Uvicorn re-raises the signal once it has stopped; keep it from ending the test run.
+    def ignore(sig, frame):
+        pass
+
+    original = signal.signal(signal.SIGTERM, ignore)
+    serving = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+        assert application.state.lifecycle.ready
+        os.kill(os.getpid(), signal.SIGTERM)
+        # Handled synchronously: draining before the event loop runs the server's shutdown.
+        assert application.state.lifecycle.draining and not application.state.lifecycle.ready
+        assert server.should_exit
+    finally:
+        server.should_exit = True
+        await asyncio.wait_for(serving, timeout=30)
+        # The lifespan and then Uvicorn put back the handlers they replaced.
+        assert signal.getsignal(signal.SIGTERM) is ignore
+        signal.signal(signal.SIGTERM, original)
+        NotificationService._accepting = True
+        Database.initialize(settings.database_url)
@@ -1,13 +1,20 @@
-from builtins import str
-from unittest.mock import AsyncMock, patch
+from builtins import max, str
+import asyncio
+import time
+from uuid import uuid4
+from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
+import msgpack
+from app.database import Database
+from app.dependencies import get_settings
+from app.services.notification_service import NotificationService
 from app.services.user_service import UserService
 from httpx import AsyncClient
 from app.main import app
 from app.models.user_model import User, UserRole
 from app.utils.nickname_gen import generate_nickname
 from app.utils.security import hash_password
-from app.services.jwt_service import decode_token  # Import your FastAPI app
+from app.services.jwt_service import create_access_token, decode_token  # Import your FastAPI app
 
 # Example of a test function using the async_client fixture
 @pytest.mark.asyncio
@@ -55,12 +62,12 @@ async def test_update_user_email_access_allowed(async_client, admin_user, admin_
 
 
 @pytest.mark.asyncio
-async def test_delete_user(async_client, admin_user, admin_token):
+async def test_delete_user(async_client, user, admin_token):
     headers = {"Authorization": f"Bearer {admin_token}"}
-    delete_response = await async_client.delete(f"/users/{admin_user.id}", headers=headers)
+    delete_response = await async_client.delete(f"/users/{user.id}", headers=headers)
     assert delete_response.status_code == 204
     # Verify the user is deleted
-    fetch_response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    fetch_response = await async_client.get(f"/users/{user.id}", headers=headers)
     assert fetch_response.status_code == 404
 
 @pytest.mark.asyncio
@@ -349,3 +356,338 @@ async def test_update_professional_status_email_service_failure(async_client, ad
     assert response.status_code == 200  # Ensure update still succeeds
     assert response.json()['is_professional'] == is_professional_status
     mock_send_email.assert_awaited_once()  # Ensure the email attempt was made
+
+# Tests for request-scoped current user resolution
+@pytest.mark.asyncio
+async def test_login_token_carries_user_id(async_client, verified_user):
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 200
+    decoded_token = decode_token(response.json()["access_token"])
+    assert decoded_token["uid"] == str(verified_user.id)
+
+@pytest.mark.asyncio
+async def test_update_profile_with_user_id_token(async_client, verified_user):
+    token = create_access_token(data={"sub": verified_user.email, "uid": str(verified_user.id), "role": "AUTHENTICATED"})
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await async_client.put("/update-profile/", json={"bio": "Resolved by id"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["id"] == str(verified_user.id)
+    assert response.json()["bio"] == "Resolved by id"
+
+@pytest.mark.asyncio
+async def test_update_profile_unknown_user_id(async_client):
+    token = create_access_token(data={"sub": "ghost@example.com", "uid": "00000000-0000-0000-0000-000000000000", "role": "AUTHENTICATED"})
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await async_client.put("/update-profile/", json={"bio": "Nobody"}, headers=headers)
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_update_profile_stale_role(async_client, db_session, verified_user):
+    # The token still claims AUTHENTICATED, but the stored role has since been downgraded.
+    verified_user.role = UserRole.ANONYMOUS
+    await db_session.commit()
+    token = create_access_token(data={"sub": verified_user.email, "uid": str(verified_user.id), "role": "AUTHENTICATED"})
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await async_client.put("/update-profile/", json={"bio": "Stale role"}, headers=headers)
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_demoted_or_locked_admin_is_refused_with_their_old_token(async_client, db_session, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert (await async_client.get("/admin/user-stats", headers=headers)).status_code == 200
+    admin_user.role = UserRole.AUTHENTICATED
+    await db_session.commit()
+    assert (await async_client.get("/admin/user-stats", headers=headers)).status_code == 403
+    assert (await async_client.post("/users/batch/lock", json={"user_ids": [str(admin_user.id)]}, headers=headers)).status_code == 403
+
+    admin_user.role, admin_user.is_locked = UserRole.ADMIN, True
+    await db_session.commit()
+    assert (await async_client.get("/admin/user-stats", headers=headers)).status_code == 403
+
+# Tests for batch administration endpoints
+@pytest.mark.asyncio
+async def test_batch_lock_users_by_id(async_client, admin_token, user, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    missing_id = "00000000-0000-0000-0000-000000000000"
+    payload = {"user_ids": [str(user.id), str(verified_user.id), missing_id]}
+    response = await async_client.post("/users/batch/lock", json=payload, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["updated"]) == {str(user.id), str(verified_user.id)}
+    assert data["not_found"] == [missing_id]
+    assert data["total_updated"] == 2
+
+@pytest.mark.asyncio
+async def test_batch_unlock_users_by_filter(async_client, db_session, admin_token, locked_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/users/batch/unlock", json={"filter": {"is_locked": True}}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["updated"] == [str(locked_user.id)]
+    assert await UserService.is_account_locked(db_session, locked_user.email) is False
+
+@pytest.mark.asyncio
+async def test_batch_set_role_requires_admin(async_client, manager_token, user):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    payload = {"user_ids": [str(user.id)], "role": "MANAGER"}
+    response = await async_client.post("/users/batch/role", json=payload, headers=headers)
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_batch_set_professional_emails_without_blocking_the_loop(async_client, admin_token, user, verified_user, app_database):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    payload = {"user_ids": [str(user.id), str(verified_user.id)], "is_professional": True}
+    loop = asyncio.get_running_loop()
+    pauses = []
+
+    async def measure_pauses():
+        while True:
+            started = loop.time()
+            await asyncio.sleep(0.01)
+            pauses.append(loop.time() - started)
+
+    def slow_send(*args):
+        time.sleep(0.2)  # A blocking SMTP round trip.
+
+    with patch('app.utils.smtp_connection.SMTPClient.connect', return_value=MagicMock()), \
+         patch('app.utils.smtp_connection.SMTPClient.send_email', side_effect=slow_send) as mock_send, \
+         patch.object(get_settings(), 'notification_rate_per_second', 0):
+        ticker = asyncio.create_task(measure_pauses())
+        response = await async_client.post("/users/batch/professional", json=payload, headers=headers)
+        await asyncio.gather(*NotificationService._tasks)
+        ticker.cancel()
+    assert response.status_code == 200
+    assert response.json()["total_updated"] == 2
+    assert {call.args[2] for call in mock_send.call_args_list} == {user.email, verified_user.email}
+    # The sends ran in worker threads: the loop kept serving the ticker while they blocked.
+    assert max(pauses) < 0.15
+
+@pytest.mark.asyncio
+async def test_batch_rejects_oversized_filter(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    with patch.object(get_settings(), 'max_batch_size', 10):
+        response = await async_client.post("/users/batch/lock", json={"filter": {"role": "AUTHENTICATED"}}, headers=headers)
+    assert response.status_code == 400
+    assert "limited to 10 users" in response.json()["detail"]
+
+@pytest.mark.asyncio
+async def test_batch_requires_single_selector(async_client, admin_token, user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    payload = {"user_ids": [str(user.id)], "filter": {"is_locked": False}}
+    response = await async_client.post("/users/batch/lock", json=payload, headers=headers)
+    assert response.status_code == 422
+
+
+# Query budgets: adding a query to these endpoints should be a deliberate change to the budget.
+# The first statement of each request loads the caller, whose current role authorizes it.
+@pytest.mark.asyncio
+async def test_create_user_query_budget(async_client, admin_user, admin_token, query_budget):
+    user_data = {"email": "budget.user@example.com", "nickname": "budget_user", "role": "ANONYMOUS", "password": "Secure*1234"}
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    with patch('app.services.email_service.EmailService.send_verification_email', new_callable=AsyncMock):
+        # The sixth and seventh statements are the INSERT and the user counter upsert in its transaction.
+        with query_budget(7):
+            response = await async_client.post("/users/", json=user_data, headers=headers)
+    assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_update_user_query_budget(async_client, admin_user, admin_token, query_budget):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    with query_budget(2):
+        response = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Budget"}, headers=headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_single_statement_write_query_budgets(async_client, verified_user, admin_token, query_budget, email_service):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    # One statement for the user, and one upsert of the user counters it changed.
+    with query_budget(3):
+        response = await async_client.put(f"/users/{verified_user.id}/set-professional/true", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["is_professional"] is True
+    with query_budget(3):
+        response = await async_client.delete(f"/users/{verified_user.id}", headers=headers)
+    assert response.status_code == 204
+    response = await async_client.put(f"/users/{verified_user.id}/set-professional/true", headers=headers)
+    assert response.status_code == 404
+
+
+# Conditional requests
+@pytest.mark.asyncio
+async def test_get_user_if_none_match_returns_304(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    response = await async_client.get(f"/users/{admin_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["ETag"] == etag
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_update_user_if_match(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    etag = (await async_client.get(f"/users/{admin_user.id}", headers=headers)).headers["ETag"]
+    response = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "First"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=headers)).headers["ETag"] == new_etag
+
+    # A second writer still holding the old ETag is rejected and changes nothing.
+    response = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Second"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 412
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=headers)).json()["first_name"] == "First"
+
+
+@pytest.mark.asyncio
+async def test_update_user_if_match_unknown_user_is_404(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}", "If-Match": '"00000000000000000000000000000000.0"'}
+    response = await async_client.put(f"/users/{uuid4()}", json={"first_name": "Nobody"}, headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_update_profile_stale_if_match(async_client, verified_user_and_token):
+    user, token = verified_user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await async_client.put("/update-profile/", json={"first_name": "Fresh"}, headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    response = await async_client.put("/update-profile/", json={"first_name": "Again"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+    response = await async_client.put("/update-profile/", json={"first_name": "Stale"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 412
+
+
+# User list response cache
+@pytest.mark.asyncio
+async def test_list_users_is_cached_until_a_write(async_client, admin_user, admin_token, manager_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    first = await async_client.get("/users/?skip=0&limit=10", headers=headers)
+    second = await async_client.get("/users/?skip=0&limit=10", headers=headers)
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert first.json() == second.json()
+
+    # The caller's role is part of the key.
+    response = await async_client.get("/users/?skip=0&limit=10", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.headers["X-Cache"] == "MISS"
+
+    await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Renamed"}, headers=headers)
+    response = await async_client.get("/users/?skip=0&limit=10", headers=headers)
+    assert response.headers["X-Cache"] == "MISS"
+    assert "Renamed" in [user["first_name"] for user in response.json()["items"]]
+
+    stats = (await async_client.get("/admin/cache-stats", headers=headers)).json()["list_users_cache"]
+    assert stats["hits"] == 1 and stats["invalidations"] >= 1
+
+
+# Content negotiation
+@pytest.mark.asyncio
+async def test_user_etag_is_per_representation(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}", "Accept": "application/msgpack"}
+    response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["email"] == admin_user.email
+    etag = response.headers["ETag"]
+    assert etag.endswith('-msgpack"')
+
+    # The suffixed tag still validates the cached copy and still guards updates.
+    response = await async_client.get(f"/users/{admin_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    response = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Packed"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+
+
+# Archival of unverified registrations
+@pytest.mark.asyncio
+async def test_archive_unverified_dry_run_requires_admin(async_client, admin_token, manager_token):
+    response = await async_client.post("/admin/archive-unverified?dry_run=true", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+    response = await async_client.post("/admin/archive-unverified?dry_run=true", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["dry_run"] is True and response.json()["rows"] == 0
+
+
+@pytest.fixture
+async def app_database():
+    """The application's own engine, as the background jobs use it, opened on this test's event loop."""
+    await Database.dispose()
+    Database.initialize(get_settings().database_url)
+    yield
+    await Database.dispose()
+    Database.initialize(get_settings().database_url)
+
+
+@pytest.mark.asyncio
+async def test_archive_unverified_runs_in_the_background(async_client, admin_token, app_database):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/admin/archive-unverified?older_than_days=30", headers=headers)
+    assert response.status_code == 202
+    assert response.json()["job"] == "archive_unverified_users"
+    assert response.json()["status_url"].endswith("/admin/scheduler")
+    for _ in range(500):
+        jobs = {job["name"]: job for job in (await async_client.get("/admin/scheduler", headers=headers)).json()["jobs"]}
+        cluster = jobs["archive_unverified_users"]["cluster"]
+        if cluster is not None and cluster["last_status"] != "RUNNING":
+            break
+        await asyncio.sleep(0.01)
+    assert cluster["last_status"] == "SUCCEEDED" and cluster["run_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_user_stats_requires_admin(async_client, admin_token, manager_token, query_budget):
+    response = await async_client.get("/admin/user-stats", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+    with query_budget(2):
+        response = await async_client.get("/admin/user-stats?days=3", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["by_role"]) == {"ANONYMOUS", "AUTHENTICATED", "MANAGER", "ADMIN"}
+    assert [day["count"] for day in body["daily_signups"]] == [0, 0, 0]
+
+
+@pytest.mark.asyncio
+async def test_search_users_validates_query(async_client, admin_token, user_token):
+    response = await async_client.get("/users/search?q=al", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 422
+    response = await async_client.get("/users/search?q=alice", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_suggest_users_from_database_then_index(async_client, admin_user, admin_token, manager_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/suggest?prefix=ADM", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["X-Suggest-Source"] == "database"
+    assert [item["nickname"] for item in response.json()["items"]] == ["admin_user"]
+
+    response = await async_client.post("/admin/suggest-index/rebuild", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+    response = await async_client.post("/admin/suggest-index/rebuild", headers=headers)
+    assert response.status_code == 200 and response.json()["ready"] is True
+
+    # Writes through the API are reflected without another rebuild.
+    response = await async_client.put(f"/users/{admin_user.id}", json={"nickname": "root_admin"}, headers=headers)
+    assert response.status_code == 200
+    response = await async_client.get("/users/suggest?prefix=root", headers=headers)
+    assert response.headers["X-Suggest-Source"] == "index"
+    assert [item["email"] for item in response.json()["items"]] == ["admin@example.com"]
+    assert (await async_client.get("/users/suggest?prefix=admin_", headers=headers)).json()["items"] == []
+
+@pytest.mark.asyncio
+async def test_register_retry_with_idempotency_key_is_not_run_twice(async_client, email_service):
+    user_data = {"email": "retry.register@example.com", "password": "ValidPassword123!", "role": UserRole.AUTHENTICATED.name}
+    headers = {"Idempotency-Key": "register-retry-1"}
+    first = await async_client.post("/register/", json=user_data, headers=headers)
+    retry = await async_client.post("/register/", json=user_data, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    # Without the key the repeat runs again and finds the email taken.
+    again = await async_client.post("/register/", json=user_data)
+    assert again.status_code == 400
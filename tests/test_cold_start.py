@@ -0,0 +1,27 @@
+import subprocess
+import sys
+from fastapi import FastAPI
+from app.main import create_app
+
+DEFERRED_MODULES = ("markdown2", "bcrypt", "jwt", "app.routers.user_routes")
+
+
+def loaded_modules(statement: str) -> str:
+    """Run `statement` in a fresh interpreter and report which deferred modules it loaded."""
+    check = f"import sys; {statement}; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_importing_main_does_not_build_the_app():
+    assert loaded_modules("import app.main") == ""
+
+
+def test_importing_user_service_defers_heavy_dependencies():
+    assert loaded_modules("import app.services.user_service") == ""
+
+
+def test_create_app_returns_independent_apps():
+    first, second = create_app(), create_app()
+    assert isinstance(first, FastAPI)
+    assert first is not second
+    assert any(route.path == "/users/{user_id}" for route in first.routes)
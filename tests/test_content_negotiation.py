@@ -0,0 +1,126 @@
+import gzip
+import json
+import brotli
+import msgpack
+import pytest
+from fastapi import FastAPI, Header, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import AsyncClient
+from app.utils.content_negotiation import ContentNegotiationMiddleware, choose_encoding, choose_media_type
+
+pytestmark = pytest.mark.asyncio
+
+PAYLOAD = {"items": [{"id": i, "nickname": f"user_{i}", "email": f"user{i}@example.com"} for i in range(100)]}
+
+
+def build_app(offload_size=65536):
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return PAYLOAD
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("x" * 5000)
+
+    @app.get("/etag")
+    async def etag(if_none_match: str = Header(None)):
+        if if_none_match:
+            return Response(status_code=304, headers={"ETag": '"v1"'})
+        return Response(content=json.dumps(PAYLOAD), media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b'{"a":', b"1}"]), media_type="application/json")
+
+    app.add_middleware(ContentNegotiationMiddleware, min_size=1024, offload_size=offload_size)
+    return app
+
+
+async def get_raw(app, path, **headers):
+    """Fetch without httpx decoding the body, so the bytes on the wire can be checked."""
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        async with client.stream("GET", path, headers={"Accept-Encoding": "identity", **headers}) as response:
+            return response, b"".join([chunk async for chunk in response.aiter_raw()])
+
+
+def test_choose_media_type_honours_quality():
+    assert choose_media_type("application/msgpack") == "application/msgpack"
+    assert choose_media_type("application/json, application/x-msgpack;q=0.5") == "application/json"
+    assert choose_media_type("application/msgpack, */*;q=0.1") == "application/msgpack"
+    assert choose_media_type("application/msgpack", msgpack_enabled=False) == "application/json"
+    assert choose_media_type(None) == "application/json"
+
+
+def test_choose_encoding_prefers_brotli():
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("*") == "br"
+    assert choose_encoding(None) is None
+
+
+@pytest.mark.parametrize("offload_size", [65536, 0])
+async def test_large_json_is_compressed(offload_size):
+    app = build_app(offload_size)
+    response, body = await get_raw(app, "/large", **{"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) == len(body)
+    assert json.loads(gzip.decompress(body)) == PAYLOAD
+    assert "Accept-Encoding" in response.headers["vary"]
+
+    response, body = await get_raw(app, "/large", **{"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(body)) == PAYLOAD
+
+
+async def test_msgpack_matches_json():
+    response, body = await get_raw(build_app(), "/large", Accept="application/msgpack")
+    assert response.headers["content-type"] == "application/msgpack"
+    assert "content-encoding" not in response.headers
+    assert msgpack.unpackb(body) == PAYLOAD
+
+    response, body = await get_raw(build_app(), "/large", Accept="application/msgpack", **{"Accept-Encoding": "gzip"})
+    assert msgpack.unpackb(gzip.decompress(body)) == PAYLOAD
+
+
+async def test_small_non_json_and_streaming_bodies_are_not_compressed():
+    app = build_app()
+    response, body = await get_raw(app, "/small", **{"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert json.loads(body) == {"status": "ok"}
+
+    response, body = await get_raw(app, "/text", **{"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers and len(body) == 5000
+
+    response, body = await get_raw(app, "/stream", **{"Accept-Encoding": "gzip"}, Accept="application/msgpack")
+    assert "content-encoding" not in response.headers
+    assert body == b'{"a":1}'
+
+
+@pytest.mark.parametrize("path", ["/large", "/small", "/text", "/stream"])
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip"])
+async def test_every_response_varies_on_accept_headers(path, accept_encoding):
+    response, _ = await get_raw(build_app(), path, **{"Accept-Encoding": accept_encoding})
+    assert [value.strip() for value in response.headers["vary"].split(",")] == ["Accept", "Accept-Encoding"]
+
+
+async def test_not_modified_carries_the_representation_etag():
+    app = build_app()
+    response, _ = await get_raw(app, "/etag", **{"Accept-Encoding": "gzip"})
+    etag = response.headers["etag"]
+    assert etag == '"v1-gzip"'
+
+    response, _ = await get_raw(app, "/etag", **{"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["etag"] == etag
+    assert "Accept-Encoding" in response.headers["vary"]
+    # A copy kept uncompressed (a body under the size limit) keeps its own tag.
+    response, _ = await get_raw(app, "/etag", **{"Accept-Encoding": "gzip", "If-None-Match": '"v1"'})
+    assert response.headers["etag"] == '"v1"'
+    response, _ = await get_raw(app, "/etag", Accept="application/msgpack", **{"If-None-Match": '"v1"'})
+    assert response.headers["etag"] == '"v1-msgpack"'
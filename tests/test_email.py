@@ -1,5 +1,7 @@
+from unittest.mock import patch
 import pytest
 from app.services.email_service import EmailService
+from app.utils.smtp_connection import SMTPClient
 from app.utils.template_manager import TemplateManager
 
     
@@ -12,3 +14,10 @@ async def test_send_markdown_email(email_service):
     }
     await email_service.send_user_email(user_data, 'email_verification')
     # Manual verification in Mailtrap
+
+
+def test_smtp_connections_use_the_configured_timeout():
+    client = SMTPClient("smtp.example.com", 2525, "user", "password", timeout=7.5)
+    with patch("app.utils.smtp_connection.smtplib.SMTP") as smtp:
+        client.connect()
+    smtp.assert_called_once_with("smtp.example.com", 2525, timeout=7.5)
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+from app.utils.etag import etag_matches, if_match_versions, user_etag
+
+
+def test_etag_round_trips_through_if_match():
+    user_id = uuid4()
+    updated_at = datetime(2024, 4, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    etag = user_etag(user_id, updated_at)
+    assert if_match_versions(etag, user_id) == [updated_at]
+    assert if_match_versions(f'"other", {etag}', user_id) == [updated_at]
+
+
+def test_if_match_rejects_weak_foreign_and_malformed_tags():
+    user_id = uuid4()
+    etag = user_etag(user_id, datetime.now(timezone.utc))
+    assert if_match_versions(f"W/{etag}", user_id) == []
+    assert if_match_versions(etag, uuid4()) == []
+    assert if_match_versions(f'"{user_id.hex}.zz"', user_id) == []
+    assert if_match_versions("*", user_id) is None
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = user_etag(uuid4(), datetime.now(timezone.utc))
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"x", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"x"', etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from httpx import AsyncClient
+from sqlalchemy import func, select, update
+from app.dependencies import get_db
+from app.models.idempotency_key_model import IdempotencyKey
+from app.services.idempotency_service import IdempotencyKeyBusy, IdempotencyService
+from app.utils.idempotency import IdempotencyMiddleware, IdempotentReplay, claim_idempotency_key, replay_response
+
+pytestmark = pytest.mark.asyncio
+
+
+def build_app(session_factory, delay=0.0):
+    """A stand-in endpoint that commits, like the user endpoints do, with a session per request as in production."""
+    app = FastAPI()
+    app.state.calls = 0
+
+    async def new_session():
+        async with session_factory() as session:
+            yield session
+
+    @app.post("/items/")
+    async def create_item(item: dict, db=Depends(get_db), claim=Depends(claim_idempotency_key)):
+        app.state.calls += 1
+        await db.execute(select(1))
+        await db.commit()
+        await asyncio.sleep(delay)
+        if item.get("fail"):
+            raise HTTPException(status_code=503, detail="Try again")
+        return {"call": app.state.calls, **item}
+
+    app.dependency_overrides[get_db] = new_session
+    app.add_exception_handler(IdempotentReplay, replay_response)
+    app.add_middleware(IdempotencyMiddleware, ttl_seconds=60)
+    return app
+
+
+async def post(client, body, key="k1", **headers):
+    return await client.post("/items/", json=body, headers={"Idempotency-Key": key, **headers})
+
+
+async def test_repeat_gets_the_stored_response_without_running_again(session_factory):
+    app = build_app(session_factory)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        first = await post(client, {"name": "a"})
+        repeat = await post(client, {"name": "a"})
+        other_key = await post(client, {"name": "a"}, key="k2")
+        without_key = await client.post("/items/", json={"name": "a"})
+    assert repeat.status_code == first.status_code == 200
+    assert repeat.json() == first.json() == {"call": 1, "name": "a"}
+    assert repeat.headers["idempotent-replayed"] == "true" and "idempotent-replayed" not in first.headers
+    assert other_key.json()["call"] == 2 and without_key.json()["call"] == 3
+
+
+async def test_concurrent_duplicates_wait_for_the_original(session_factory):
+    app = build_app(session_factory, delay=0.3)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        responses = await asyncio.gather(*[post(client, {"name": "a"}) for _ in range(3)])
+    assert app.state.calls == 1
+    assert [response.json() for response in responses] == [{"call": 1, "name": "a"}] * 3
+    assert sum(response.headers.get("idempotent-replayed") == "true" for response in responses) == 2
+
+
+async def test_duplicate_gives_up_waiting_with_409(session_factory, monkeypatch):
+    monkeypatch.setattr("app.utils.idempotency.get_settings", lambda: type("S", (), {
+        "idempotency_enabled": True, "idempotency_wait_seconds": 0.1, "idempotency_lease_seconds": 60,
+    })())
+    app = build_app(session_factory, delay=0.5)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        original, duplicate = await asyncio.gather(post(client, {"name": "a"}), post(client, {"name": "a"}))
+    assert original.status_code == 200 and duplicate.status_code == 409
+    assert app.state.calls == 1
+
+
+async def test_server_errors_release_the_key(session_factory):
+    app = build_app(session_factory)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for _ in range(2):
+            assert (await post(client, {"fail": True})).status_code == 503
+    assert app.state.calls == 2
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(IdempotencyKey)) == 0
+
+
+async def test_anonymous_callers_are_scoped_by_body_and_users_by_token(session_factory, admin_token):
+    app = build_app(session_factory)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        # Two anonymous clients picking the same key do not share a response.
+        assert (await post(client, {"name": "a"})).json()["call"] == 1
+        assert (await post(client, {"name": "b"})).json()["call"] == 2
+        # An authenticated caller reusing a key for a different request is refused.
+        authorization = {"Authorization": f"Bearer {admin_token}"}
+        assert (await post(client, {"name": "a"}, **authorization)).json()["call"] == 3
+        assert (await post(client, {"name": "b"}, **authorization)).status_code == 422
+
+
+async def test_claim_waits_for_the_claiming_transaction(session_factory):
+    async with session_factory() as first, session_factory() as second:
+        assert await IdempotencyService.claim(first, "scope", "k1", "body", lease_seconds=60, lock_timeout_ms=1000)
+        # The first claim is not committed yet: the second waits on it until the lock timeout.
+        with pytest.raises(IdempotencyKeyBusy):
+            await IdempotencyService.claim(second, "scope", "k1", "body", lease_seconds=60, lock_timeout_ms=100)
+        await first.commit()
+        assert not await IdempotencyService.claim(second, "scope", "k1", "body", lease_seconds=60, lock_timeout_ms=100)
+        await second.rollback()
+
+        # A lease whose request never stored a response is taken over once it expires.
+        await first.execute(update(IdempotencyKey).values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        await first.commit()
+        assert await IdempotencyService.claim(second, "scope", "k1", "body", lease_seconds=60, lock_timeout_ms=100)
+        await second.commit()
+
+
+async def test_purge_deletes_expired_keys(session_factory):
+    now = datetime.now(timezone.utc)
+    async with session_factory() as session:
+        session.add_all([
+            IdempotencyKey(scope="scope", key="old", fingerprint="body", expires_at=now - timedelta(hours=1)),
+            IdempotencyKey(scope="scope", key="new", fingerprint="body", expires_at=now + timedelta(hours=1)),
+        ])
+        await session.commit()
+    assert await IdempotencyService.purge(session_factory) == 1
+    async with session_factory() as session:
+        assert (await session.execute(select(IdempotencyKey.key))).scalars().all() == ["new"]
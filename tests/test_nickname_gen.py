@@ -0,0 +1,48 @@
+from builtins import len, set
+import re
+import pytest
+from app.utils.nickname_gen import allocate_nickname, generate_nickname, generate_nicknames, nickname_space_size
+
+pytestmark = pytest.mark.asyncio
+
+NICKNAME_PATTERN = re.compile(r'^[\w-]+$')
+
+
+def test_generate_nickname_is_url_safe():
+    nickname = generate_nickname()
+    assert NICKNAME_PATTERN.match(nickname)
+    assert 3 <= len(nickname) <= 50
+
+
+def test_nickname_space_is_large():
+    assert nickname_space_size() >= 10_000_000
+
+
+def test_generate_nicknames_are_distinct():
+    assert len(set(generate_nicknames(100))) == 100
+
+
+async def test_allocate_prefers_free_nickname():
+    async def find_taken(candidates):
+        return []
+    assert await allocate_nickname(find_taken, preferred="my_nick") == "my_nick"
+
+
+async def test_allocate_skips_taken_nickname():
+    async def find_taken(candidates):
+        return ["my_nick"]
+    nickname = await allocate_nickname(find_taken, preferred="my_nick")
+    assert nickname != "my_nick"
+    assert NICKNAME_PATTERN.match(nickname)
+
+
+async def test_allocate_terminates_when_everything_is_taken():
+    calls = []
+
+    async def find_taken(candidates):
+        calls.append(candidates)
+        return candidates
+    nickname = await allocate_nickname(find_taken, preferred="my_nick", max_rounds=3)
+    assert nickname.startswith("user_")
+    assert len(nickname) <= 50
+    assert len(calls) == 3
@@ -0,0 +1,50 @@
+from unittest.mock import patch
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy import select, text
+from app.dependencies import get_settings
+from app.models.user_model import User
+from app.utils import query_stats
+from app.utils.query_stats import QueryStatsMiddleware, track_queries
+from tests.conftest import engine
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_nested_tracking_counts_toward_parent(db_session):
+    with track_queries() as outer:
+        await db_session.execute(select(User.id))
+        with track_queries() as inner:
+            await db_session.execute(select(User.id))
+            await db_session.execute(select(User.id))
+    assert inner.count == 2
+    assert outer.count == 3
+    assert list(outer.repeated(3).values()) == [3]
+
+
+async def test_slow_query_logs_parameter_shape_not_values(db_session):
+    with patch.object(get_settings(), "db_slow_query_ms", 0), patch.object(query_stats, "logger") as mock_logger:
+        await db_session.execute(select(User).where(User.email == "secret@example.com", User.id.in_([])))
+    extra = mock_logger.warning.call_args.kwargs["extra"]
+    assert "secret@example.com" not in str(extra)
+    assert "str" in extra["parameters"].values()
+
+
+async def test_middleware_emits_headers_and_flags_repeated_statements():
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, emit_headers=True)
+
+    @app.get("/n-plus-one")
+    async def n_plus_one():
+        async with engine.connect() as connection:
+            for _ in range(3):
+                await connection.execute(text("SELECT 1"))
+        return {}
+
+    with patch.object(get_settings(), "db_repeated_query_threshold", 3), patch.object(query_stats, "logger") as mock_logger:
+        async with AsyncClient(app=app, base_url="http://testserver") as client:
+            response = await client.get("/n-plus-one")
+    assert response.headers["X-DB-Queries"] == "3"
+    assert float(response.headers["X-DB-Time"]) >= 0
+    assert "Possible N+1" in mock_logger.warning.call_args.args[0]
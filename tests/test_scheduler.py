@@ -0,0 +1,120 @@
+from builtins import len, range, sorted, zip
+from datetime import datetime, timedelta, timezone
+import asyncio
+import pytest
+from sqlalchemy import select
+from app.models.scheduled_job_model import ScheduledJobState
+from app.scheduler import CronSchedule, IntervalSchedule, Scheduler, utcnow
+from tests.conftest import engine
+
+NOW = datetime(2026, 10, 19, 8, 15, 30, tzinfo=timezone.utc)  # a Monday
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("30 3 * * *", datetime(2026, 10, 20, 3, 30, tzinfo=timezone.utc)),
+    ("*/20 * * * *", datetime(2026, 10, 19, 8, 20, tzinfo=timezone.utc)),
+    ("0 9-17/4 * * 1-5", datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)),
+    ("0 0 1 1 *", datetime(2027, 1, 1, tzinfo=timezone.utc)),
+    ("0 0 29 2 *", datetime(2028, 2, 29, tzinfo=timezone.utc)),
+    ("0 12 * * 0", datetime(2026, 10, 25, 12, 0, tzinfo=timezone.utc)),
+    # Both day fields restricted: either one matching fires, as in cron.
+    ("0 0 13 * 5", datetime(2026, 10, 23, tzinfo=timezone.utc)),
+])
+def test_cron_next_after(expression, expected):
+    assert CronSchedule(expression).next_after(NOW) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "61 * * * *", "*/0 * * * *", "a * * * *", "0 0 31 2 *"])
+def test_cron_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression).next_after(NOW)
+
+
+def test_interval_slots_are_aligned_across_workers():
+    schedule = IntervalSchedule(300)
+    assert schedule.next_after(NOW) == datetime(2026, 10, 19, 8, 20, tzinfo=timezone.utc)
+    assert schedule.next_after(NOW + timedelta(seconds=1)) == schedule.next_after(NOW)
+
+
+async def test_each_slot_runs_in_one_worker(setup_database):
+    calls = []
+
+    async def job():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+
+    workers = [Scheduler(engine=engine) for _ in range(3)]
+    jobs = [worker.every("cleanup", 60, job) for worker in workers]
+    due = utcnow()
+    outcomes = await asyncio.gather(*(worker.run(job, due) for worker, job in zip(workers, jobs)))
+    assert sorted(outcomes) == ["SKIPPED", "SKIPPED", "SUCCEEDED"]
+    assert len(calls) == 1
+
+    # A worker waking late for a slot that already ran skips it too; the next slot runs.
+    assert await workers[0].run(jobs[0], due) == "SKIPPED"
+    assert await workers[1].run(jobs[1], utcnow()) == "SUCCEEDED"
+    assert len(calls) == 2
+
+    async with engine.connect() as conn:
+        state = (await conn.execute(select(ScheduledJobState))).one()
+    assert state.run_count == 2 and state.last_status == "SUCCEEDED"
+    assert state.last_duration_ms >= 50
+
+
+async def test_timeouts_and_failures_are_recorded(setup_database):
+    async def slow():
+        await asyncio.sleep(5)
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    scheduler = Scheduler(engine=engine)
+    slow_job = scheduler.every("slow", 60, slow, timeout=0.05)
+    broken_job = scheduler.every("broken", 60, broken)
+    assert await scheduler.run(slow_job, utcnow()) == "TIMEOUT"
+    assert await scheduler.run(broken_job, utcnow()) == "FAILED"
+    assert slow_job.timeouts == 1 and broken_job.failures == 1
+    assert "RuntimeError: boom" in broken_job.to_dict()["last_error"]
+
+
+async def test_per_worker_jobs_run_in_every_worker(setup_database):
+    calls = []
+
+    async def refresh():
+        calls.append(1)
+
+    workers = [Scheduler(engine=engine) for _ in range(2)]
+    jobs = [worker.every("refresh", 60, refresh, per_worker=True) for worker in workers]
+    due = utcnow()
+    outcomes = await asyncio.gather(*(worker.run(job, due) for worker, job in zip(workers, jobs)))
+    assert outcomes == ["SUCCEEDED", "SUCCEEDED"] and len(calls) == 2
+    async with engine.connect() as conn:
+        assert (await conn.execute(select(ScheduledJobState))).first() is None
+
+
+async def test_triggered_runs_take_the_lock_and_are_recorded(setup_database):
+    calls = []
+
+    async def archive(days=30):
+        calls.append(days)
+        await asyncio.sleep(0.05)
+
+    workers = [Scheduler(engine=engine) for _ in range(2)]
+    jobs = [worker.on_demand("archive", archive) for worker in workers]
+    assert jobs[0].to_dict()["schedule"] == "on demand"
+    # Triggered on two workers at once, with a body of its own: one run, the other skipped.
+    outcomes = await asyncio.gather(
+        workers[0].trigger("archive", engine, lambda: archive(days=7)),
+        workers[1].trigger("archive", engine),
+    )
+    assert sorted(outcomes) == ["SKIPPED", "SUCCEEDED"] and len(calls) == 1
+    async with engine.connect() as conn:
+        state = (await conn.execute(select(ScheduledJobState))).one()
+    assert state.name == "archive" and state.last_status == "SUCCEEDED" and state.run_count == 1
+
+
+async def test_scheduler_jobs_endpoint(async_client, admin_token):
+    response = await async_client.get("/admin/scheduler", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    names = [job["name"] for job in response.json()["jobs"]]
+    assert "archive_unverified_users" in names and "resume_notification_jobs" in names
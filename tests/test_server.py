@@ -0,0 +1,27 @@
+from unittest.mock import patch
+from app.server import available_cpus, gunicorn_options, worker_count
+from settings.config import Settings
+
+
+def test_available_cpus_is_positive():
+    assert available_cpus() >= 1
+
+
+def test_worker_count_defaults_to_available_cpus():
+    with patch('app.server.available_cpus', return_value=6):
+        assert worker_count(Settings(web_workers=0)) == 6
+
+
+def test_worker_count_uses_configured_value():
+    assert worker_count(Settings(web_workers=3)) == 3
+
+
+def test_gunicorn_options_from_settings():
+    settings = Settings(web_workers=2, web_port=9000, web_worker_max_requests=500, web_graceful_timeout=15)
+    options = gunicorn_options(settings)
+    assert options["bind"] == "0.0.0.0:9000"
+    assert options["workers"] == 2
+    assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert options["preload_app"] is True
+    assert options["max_requests"] == 500
+    assert options["graceful_timeout"] == 15
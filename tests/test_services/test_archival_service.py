@@ -0,0 +1,92 @@
+from builtins import len, range, sorted
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import func, select, text
+from app.models.archived_user_model import ArchivedUser
+from app.models.user_model import User, UserRole
+from app.services.archival_service import ArchivalService
+from app.utils.security import hash_password
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def registrations(db_session):
+    """Five stale unverified registrations, plus users the job must leave alone."""
+    old = datetime.now(timezone.utc) - timedelta(days=90)
+    password = hash_password("MySuperPassword$1234")
+
+    def make(n, role=UserRole.ANONYMOUS, verified=False, created_at=old):
+        return User(nickname=f"archival_{n}", email=f"archival{n}@example.com", hashed_password=password,
+                    role=role, email_verified=verified, created_at=created_at)
+
+    stale = [make(n) for n in range(5)]
+    keep = [
+        make(5, created_at=datetime.now(timezone.utc)),
+        make(6, verified=True),
+        make(7, role=UserRole.AUTHENTICATED),
+    ]
+    db_session.add_all(stale + keep)
+    await db_session.commit()
+    return stale, keep
+
+
+async def count(session, model):
+    return (await session.execute(select(func.count()).select_from(model))).scalar()
+
+
+async def test_dry_run_reports_without_moving(db_session, session_factory, registrations):
+    report = await ArchivalService.archive_unverified(session_factory, older_than_days=30, dry_run=True, batch_size=2)
+    assert report["rows"] == 5
+    assert [batch["rows"] for batch in report["batches"]] == [2, 2, 1]
+    assert report["complete"] is True
+    assert await count(db_session, User) == 8
+    assert await count(db_session, ArchivedUser) == 0
+
+
+async def test_archive_moves_stale_users_in_batches(db_session, session_factory, registrations):
+    stale, keep = registrations
+    report = await ArchivalService.archive_unverified(session_factory, older_than_days=30, batch_size=2, pause_seconds=0)
+    assert report["rows"] == 5 and len(report["batches"]) == 3
+    assert all(batch["duration_ms"] >= 0 for batch in report["batches"])
+
+    remaining = (await db_session.execute(select(User.id))).scalars().all()
+    assert sorted(remaining) == sorted(user.id for user in keep)
+    archived = (await db_session.execute(select(ArchivedUser))).scalars().all()
+    assert sorted(user.email for user in archived) == sorted(user.email for user in stale)
+    assert all(user.hashed_password and user.archived_at for user in archived)
+
+    # Nothing is left to move on the next run.
+    report = await ArchivalService.archive_unverified(session_factory, older_than_days=30, batch_size=2)
+    assert report["rows"] == 0 and report["complete"] is True
+
+
+async def test_archive_stops_at_max_batches(session_factory, registrations):
+    report = await ArchivalService.archive_unverified(session_factory, older_than_days=30, batch_size=2, max_batches=1, pause_seconds=0)
+    assert report["rows"] == 2
+    assert report["complete"] is False
+    assert report["remaining"] == 3
+
+
+async def test_locked_candidates_leave_the_run_incomplete(session_factory, registrations):
+    stale, _ = registrations
+    async with session_factory() as other:
+        # Another transaction holds one candidate: the batch skips it and comes back short.
+        await other.execute(select(User).where(User.id == stale[0].id).with_for_update())
+        report = await ArchivalService.archive_unverified(session_factory, older_than_days=30, batch_size=10, pause_seconds=0)
+        assert report["rows"] == 4
+        assert report["remaining"] == 1 and report["complete"] is False
+    report = await ArchivalService.archive_unverified(session_factory, older_than_days=30, batch_size=10, pause_seconds=0)
+    assert report["rows"] == 1 and report["remaining"] == 0 and report["complete"] is True
+
+
+async def test_candidates_are_read_from_the_partial_index(db_session, registrations):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    for query in (
+        ArchivalService._candidates(cutoff, None, 10),
+        select(func.count()).select_from(User).where(*ArchivalService._is_candidate(cutoff)),
+    ):
+        plan = "\n".join((await db_session.execute(text("EXPLAIN " + str(query.compile(compile_kwargs={"literal_binds": True}))))).scalars())
+        assert "ix_users_unverified_created_at" in plan
+    await db_session.rollback()
@@ -0,0 +1,179 @@
+from builtins import len, sorted, str
+import asyncio
+from unittest.mock import MagicMock, patch
+import smtplib
+import pytest
+from app.models.notification_job_model import NotificationJobStatus
+from app.dependencies import get_settings
+from app.services.notification_service import NotificationService
+from app.utils.template_manager import TemplateManager
+from app.services.email_service import EmailService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def fanout_email_service():
+    return EmailService(template_manager=TemplateManager())
+
+
+@pytest.fixture
+def smtp_patches():
+    with patch('app.utils.smtp_connection.SMTPClient.connect', return_value=MagicMock()) as mock_connect, \
+         patch('app.utils.smtp_connection.SMTPClient.send_email') as mock_send:
+        yield mock_connect, mock_send
+
+
+# Test that a job sends one message per matching user and completes
+async def test_run_job_sends_to_all_matching_users(db_session, session_factory, fanout_email_service, smtp_patches, users_with_same_role_50_users, admin_user):
+    mock_connect, mock_send = smtp_patches
+    job = await NotificationService.create_job(db_session, "announcement", {"role": "AUTHENTICATED"}, {"message": "Hello everyone"})
+    with patch.object(get_settings(), 'notification_rate_per_second', 0), \
+         patch.object(get_settings(), 'notification_batch_size', 20):
+        finished = await NotificationService.run_job(job.id, fanout_email_service, session_factory)
+    assert finished.status == NotificationJobStatus.COMPLETED
+    assert finished.sent_count == 50
+    assert finished.failed_count == 0
+    assert mock_send.call_count == 50
+    # Connections are opened once per slot and reused for every message.
+    assert mock_connect.call_count <= 2
+
+
+# Test that a job resumes after its checkpoint instead of starting over
+async def test_run_job_resumes_from_checkpoint(db_session, session_factory, fanout_email_service, smtp_patches, users_with_same_role_50_users):
+    _, mock_send = smtp_patches
+    job = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Resumed"})
+    ordered_ids = sorted(user.id for user in users_with_same_role_50_users)
+    job.last_user_id = ordered_ids[29]
+    job.status = NotificationJobStatus.FAILED
+    await db_session.commit()
+    with patch.object(get_settings(), 'notification_rate_per_second', 0):
+        finished = await NotificationService.run_job(job.id, fanout_email_service, session_factory)
+    assert finished.sent_count == 20
+    assert finished.last_user_id == ordered_ids[-1]
+
+
+# Test that render and delivery failures are counted without stopping the job
+async def test_run_job_counts_failures(db_session, session_factory, fanout_email_service, smtp_patches, user, verified_user):
+    _, mock_send = smtp_patches
+    mock_send.side_effect = [None, smtplib.SMTPRecipientsRefused({})]
+    job = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Partial"})
+    with patch.object(get_settings(), 'notification_rate_per_second', 0), \
+         patch.object(get_settings(), 'notification_smtp_connections', 1):
+        finished = await NotificationService.run_job(job.id, fanout_email_service, session_factory)
+    assert finished.status == NotificationJobStatus.COMPLETED
+    assert finished.sent_count == 1
+    assert finished.failed_count == 1
+    assert finished.last_error is not None
+
+
+# Test that a job with a live heartbeat cannot be claimed twice
+async def test_claim_job_is_exclusive(db_session, fanout_email_service):
+    job = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Once"})
+    assert await NotificationService.claim_job(db_session, job.id) is True
+    assert await NotificationService.claim_job(db_session, job.id) is False
+
+
+# Test that an admin can start a job and poll its progress
+async def test_notification_job_endpoints(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    payload = {"email_type": "announcement", "filter": {"is_professional": True}, "context": {"message": "Hi"}}
+    with patch('app.routers.notification_routes.NotificationService.start') as mock_start:
+        response = await async_client.post("/notifications/jobs", json=payload, headers=headers)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert mock_start.called
+    status_response = await async_client.get(f"/notifications/jobs/{job_id}", headers=headers)
+    assert status_response.status_code == 200
+    assert status_response.json()["status"] == "PENDING"
+    assert status_response.json()["sent_count"] == 0
+
+
+# Test that a job can only be resumed when it is not completed or owned by a live worker
+async def test_resume_refuses_completed_and_running_jobs(async_client, admin_token, db_session):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    completed = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Hi"})
+    await NotificationService._finish(db_session, completed.id, NotificationJobStatus.COMPLETED)
+    running = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Hi"})
+    assert await NotificationService.claim_job(db_session, running.id)
+    failed = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Hi"})
+    await NotificationService._finish(db_session, failed.id, NotificationJobStatus.FAILED, "SMTP down")
+    with patch('app.routers.notification_routes.NotificationService.start') as mock_start:
+        assert (await async_client.post(f"/notifications/jobs/{completed.id}/resume", headers=headers)).status_code == 409
+        assert (await async_client.post(f"/notifications/jobs/{running.id}/resume", headers=headers)).status_code == 409
+        assert not mock_start.called
+        response = await async_client.post(f"/notifications/jobs/{failed.id}/resume", headers=headers)
+    assert response.status_code == 202
+    assert response.json()["status"] == "RUNNING"
+    mock_start.assert_called_once()
+    assert mock_start.call_args.kwargs["claimed"] is True
+
+
+# Test that a failed job waits for its cancelled producer before finishing
+async def test_failed_job_awaits_its_producer(db_session, session_factory, fanout_email_service, smtp_patches, users_with_same_role_50_users):
+    job = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Hello"})
+    produce = NotificationService._produce
+    producers = []
+
+    async def tracked_produce(*args):
+        producers.append(asyncio.current_task())
+        try:
+            await produce(*args)
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # Slow cleanup, e.g. closing a read session.
+            await asyncio.sleep(0.1)
+            raise
+
+    with patch.object(NotificationService, '_produce', side_effect=tracked_produce), \
+            patch.object(NotificationService, '_send_batch', side_effect=RuntimeError("SMTP down")):
+        finished = await NotificationService.run_job(job.id, fanout_email_service, session_factory)
+    assert finished.status == NotificationJobStatus.FAILED
+    assert producers and producers[0].done()
+
+
+# Test that managers cannot start fan-out jobs
+async def test_notification_job_requires_admin(async_client, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    response = await async_client.post("/notifications/jobs", json={"email_type": "announcement"}, headers=headers)
+    assert response.status_code == 403
+
+
+# Test that draining cancels a job still running at the deadline and hands it back as pending
+async def test_drain_releases_unfinished_job(db_session, session_factory, fanout_email_service, smtp_patches, admin_user):
+    job = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Hello"})
+
+    async def slow_batch(*args):
+        await asyncio.sleep(10)
+
+    try:
+        with patch.object(NotificationService, '_send_batch', side_effect=slow_batch):
+            task = NotificationService.start(job.id, fanout_email_service, session_factory)
+            while (await NotificationService.get_job(db_session, job.id)).status != NotificationJobStatus.RUNNING:
+                await asyncio.sleep(0.01)
+            assert await NotificationService.drain(0.05) == 1
+        assert task.cancelled()
+        assert NotificationService.start(job.id, fanout_email_service, session_factory) is None
+    finally:
+        NotificationService._accepting = True
+    released = await NotificationService.get_job(db_session, job.id)
+    assert released.status == NotificationJobStatus.PENDING
+    assert released.heartbeat_at is None
+
+
+# Test that the heartbeat keeps moving while a single batch takes longer than the beat interval
+async def test_heartbeat_is_refreshed_during_a_slow_batch(db_session, session_factory, fanout_email_service, smtp_patches, admin_user):
+    job = await NotificationService.create_job(db_session, "announcement", {}, {"message": "Slow"})
+    beats = set()
+
+    async def slow_batch(*args):
+        for _ in range(6):
+            await asyncio.sleep(0.05)
+            beats.add((await NotificationService.get_job(db_session, job.id)).heartbeat_at)
+        return 1, 0, None
+
+    with patch.object(NotificationService, '_send_batch', side_effect=slow_batch), \
+         patch.object(get_settings(), 'notification_heartbeat_seconds', 0.05):
+        finished = await NotificationService.run_job(job.id, fanout_email_service, session_factory)
+    assert finished.status == NotificationJobStatus.COMPLETED
+    assert len(beats) >= 3
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+from app.services.response_cache import ResponseCache
+
+
+def test_hit_after_set_and_miss_after_invalidation():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.set("page-1", b"[]", cache.generation)
+    assert cache.get("page-1") == b"[]"
+    cache.invalidate_all()
+    assert cache.get("page-1") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_body_read_before_a_write_is_not_stored():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate_all()
+    cache.set("page-1", b"[]", generation)
+    assert cache.get("page-1") is None
+
+
+def test_entries_expire_and_are_bounded():
+    cache = ResponseCache(max_entries=2, ttl=5)
+    with patch("app.services.response_cache.time.monotonic", return_value=100.0):
+        for key in ("a", "b", "c"):
+            cache.set(key, key.encode(), cache.generation)
+        assert cache.get("a") is None
+        assert cache.get("b") == b"b"
+        assert cache.stats()["evictions"] == 1
+    with patch("app.services.response_cache.time.monotonic", return_value=106.0):
+        assert cache.get("b") is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_entries=10, ttl=60, enabled=False)
+    cache.set("page-1", b"[]", cache.generation)
+    assert cache.get("page-1") is None
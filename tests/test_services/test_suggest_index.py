@@ -0,0 +1,70 @@
+from uuid import uuid4
+import pytest
+from app.models.user_model import User, UserRole
+from app.services.suggest_index import SuggestIndex
+from app.utils.security import hash_password
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def people(db_session):
+    password = hash_password("MySuperPassword$1234")
+    users = [
+        User(nickname=nickname, email=email, hashed_password=password, role=UserRole.AUTHENTICATED)
+        for nickname, email in [("Anna_K", "anna@example.com"), ("annabel", "bel@example.com"), ("bob", "ann.b@example.com")]
+    ]
+    db_session.add_all(users)
+    await db_session.commit()
+    return {user.nickname: user for user in users}
+
+
+def nicknames(items):
+    return [item["nickname"] for item in items]
+
+
+async def test_suggest_matches_nickname_and_email_prefixes(db_session, people):
+    index = SuggestIndex(max_bytes=1024 * 1024)
+    assert not index.ready
+    stats = await index.rebuild(db_session)
+    assert stats["ready"] and stats["users"] == 3 and stats["size_bytes"] > 0
+
+    # "ann" starts Anna_K's and annabel's nicknames and bob's email; matching ignores case and
+    # results follow the matched value ("ann.b@..." sorts before "anna_k").
+    assert nicknames(index.suggest("ANN")) == ["bob", "Anna_K", "annabel"]
+    assert nicknames(index.suggest("ann", limit=1)) == ["bob"]
+    assert index.suggest("anna_k")[0]["email"] == "anna@example.com"
+    assert index.suggest("zed") == []
+
+
+async def test_writes_update_the_index(db_session, people):
+    index = SuggestIndex(max_bytes=1024 * 1024)
+    await index.rebuild(db_session)
+    new_id = uuid4()
+    index.upsert(new_id, "annika", "annika@example.com")
+    assert "annika" in nicknames(index.suggest("anni"))
+    index.upsert(new_id, "zoe", "zoe@example.com")
+    assert index.suggest("anni") == [] and nicknames(index.suggest("zo")) == ["zoe"]
+    index.remove(people["bob"].id)
+    assert nicknames(index.suggest("ann")) == ["Anna_K", "annabel"]
+    assert index.stats()["users"] == 3
+
+
+async def test_writes_during_a_rebuild_are_replayed(db_session, people):
+    index = SuggestIndex(max_bytes=1024 * 1024)
+    original_sort = index._sorted_entries
+
+    def sort_after_concurrent_writes(records):
+        index.remove(people["bob"].id)
+        index.upsert(uuid4(), "annette", "annette@example.com")
+        return original_sort(records)
+
+    index._sorted_entries = sort_after_concurrent_writes
+    await index.rebuild(db_session)
+    assert nicknames(index.suggest("ann")) == ["Anna_K", "annabel", "annette"]
+
+
+async def test_index_over_budget_is_not_used(db_session, people):
+    index = SuggestIndex(max_bytes=500)
+    stats = await index.rebuild(db_session)
+    assert not stats["ready"] and stats["over_budget"] and stats["users"] == 0
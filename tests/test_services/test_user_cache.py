@@ -0,0 +1,171 @@
+from builtins import range, str
+import time
+import pytest
+from sqlalchemy import update
+from app.models.user_model import User, UserRole
+from app.services.user_cache import InMemoryUserCacheBackend, UserCache
+from app.services.user_service import UserService
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_record(index: int) -> dict:
+    return {"id": f"id-{index}", "email": f"user{index}@example.com", "nickname": f"nick_{index}"}
+
+
+# Test that the in-memory backend resolves every alias to the same record
+def test_backend_lookup_by_all_keys():
+    backend = InMemoryUserCacheBackend(max_size=10)
+    backend.set(make_record(1), ttl=60)
+    assert backend.get("id", "id-1")["nickname"] == "nick_1"
+    assert backend.get("email", "user1@example.com")["id"] == "id-1"
+    assert backend.get("nickname", "nick_1")["id"] == "id-1"
+
+
+# Test that the least recently used user is evicted along with its aliases
+def test_backend_lru_eviction():
+    backend = InMemoryUserCacheBackend(max_size=2)
+    backend.set(make_record(1), ttl=60)
+    backend.set(make_record(2), ttl=60)
+    backend.get("id", "id-1")
+    evicted = backend.set(make_record(3), ttl=60)
+    assert evicted == 1
+    assert len(backend) == 2
+    assert backend.get("email", "user2@example.com") is None
+    assert backend.get("id", "id-1") is not None
+
+
+# Test that expired entries are not returned
+def test_backend_ttl_expiry():
+    backend = InMemoryUserCacheBackend(max_size=10)
+    backend.set(make_record(1), ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("id", "id-1") is None
+    assert len(backend) == 0
+
+
+# Test that replacing a record drops aliases for its old email
+def test_backend_replace_drops_stale_aliases():
+    backend = InMemoryUserCacheBackend(max_size=10)
+    backend.set(make_record(1), ttl=60)
+    backend.set({**make_record(1), "email": "changed@example.com"}, ttl=60)
+    assert backend.get("email", "user1@example.com") is None
+    assert backend.get("email", "changed@example.com")["id"] == "id-1"
+
+
+# Test that repeated lookups are served from the cache
+async def test_lookup_hits_cache(db_session, user):
+    UserService.cache.clear()
+    hits_before = UserService.cache.hits
+    await UserService.get_by_email(db_session, user.email)
+    cached_user = await UserService.get_by_id(db_session, user.id)
+    assert cached_user.id == user.id
+    assert UserService.cache.hits == hits_before + 1
+
+
+# Test that a view lookup that misses fills the cache, so the next lookup (view or ORM) is a hit
+async def test_view_miss_fills_the_cache(db_session, user, query_budget):
+    UserService.cache.clear()
+    hits_before = UserService.cache.hits
+    view = await UserService.get_view_by_id(db_session, user.id)
+    with query_budget(0):
+        assert await UserService.get_view_by_id(db_session, user.id) == view
+        db_session.expunge_all()
+        cached_user = await UserService.get_by_email(db_session, user.email)
+    assert UserService.cache.hits == hits_before + 2
+    assert cached_user.hashed_password == user.hashed_password
+
+
+# Test that cache hits are attached to the caller's session
+async def test_cache_hit_is_attached_to_session(db_session, user):
+    await UserService.get_by_id(db_session, user.id)
+    db_session.expunge_all()
+    cached_user = await UserService.get_by_nickname(db_session, user.nickname)
+    assert cached_user in db_session
+    assert cached_user.email == user.email
+
+
+# Test that updates invalidate the cached record
+async def test_update_invalidates_cache(db_session, user):
+    old_email = user.email
+    await UserService.get_by_id(db_session, user.id)
+    await UserService.update(db_session, user.id, {"email": "cache_update@example.com"})
+    assert UserService.cache.backend.get("email", old_email) is None
+    assert (await UserService.get_by_id(db_session, user.id)).email == "cache_update@example.com"
+
+
+# Test that deleted users are no longer served from the cache
+async def test_delete_invalidates_cache(db_session, user):
+    await UserService.get_by_id(db_session, user.id)
+    assert await UserService.delete(db_session, user.id) is True
+    assert await UserService.get_by_id(db_session, user.id) is None
+
+
+# Test that failed logins invalidate the cached lock state
+async def test_failed_login_invalidates_cache(db_session, verified_user):
+    await UserService.get_by_email(db_session, verified_user.email)
+    for _ in range(3):
+        await UserService.login_user(db_session, verified_user.email, "wrongpassword")
+    assert UserService.cache.backend.get("id", str(verified_user.id)) is None
+    assert await UserService.is_account_locked(db_session, verified_user.email)
+
+
+# Test that a disabled cache never serves or stores records
+async def test_disabled_cache(db_session, user):
+    disabled = UserCache(InMemoryUserCacheBackend(max_size=10), ttl=60, enabled=False)
+    disabled.store(user, disabled.generation)
+    assert await disabled.get(db_session, "id", user.id) is None
+    assert disabled.stats()["size"] == 0
+
+
+# Test that a row read before a concurrent invalidation is not written back to the cache
+async def test_store_skips_rows_read_before_an_invalidation(db_session, user):
+    generation = UserService.cache.generation
+    UserService.cache.invalidate(user.id)  # a write committed while the row was being read
+    UserService.cache.store(user, generation)
+    assert UserService.cache.backend.get("id", str(user.id)) is None
+
+
+# Test that a write to another user while a row is being read does not keep it out of the cache
+async def test_store_keeps_rows_when_another_user_was_invalidated(db_session, user, verified_user):
+    generation = UserService.cache.generation
+    UserService.cache.invalidate(verified_user.id)
+    UserService.cache.store(user, generation)
+    assert UserService.cache.backend.get("id", str(user.id))["email"] == user.email
+
+
+# Test that forgetting old invalidations errs on the side of not storing
+async def test_store_skips_reads_older_than_forgotten_invalidations(db_session, user, monkeypatch):
+    monkeypatch.setattr("app.services.user_cache.MAX_TRACKED_INVALIDATIONS", 2)
+    cache = UserCache(InMemoryUserCacheBackend(max_size=10), ttl=60)
+    generation = cache.generation
+    cache.invalidate(user.id)
+    for index in range(2):
+        cache.invalidate(f"other-{index}")
+    # The read's own invalidation is no longer remembered, but the floor still rejects it.
+    cache.store(user, generation)
+    assert cache.stats()["size"] == 0
+    cache.store(user, cache.generation)
+    assert cache.stats()["size"] == 1
+
+
+# Test that a suspended cache (no change listener connected) neither serves nor stores
+async def test_suspended_cache_is_bypassed(db_session, user):
+    await UserService.get_by_id(db_session, user.id)
+    UserService.cache.suspended = True
+    assert UserService.cache.get_record("id", user.id) is None
+    UserService.cache.clear()
+    await UserService.get_by_id(db_session, user.id)
+    assert UserService.cache.backend.get("id", str(user.id)) is None
+
+
+# Test that authorization reads the caller from the database, not a stale cached copy
+async def test_auth_ignores_cached_role(async_client, db_session, verified_user_and_token):
+    user, token = verified_user_and_token
+    await UserService.get_by_email(db_session, user.email)
+    # Demoted by a write this process is never told about, as if made by another worker.
+    await db_session.execute(update(User).where(User.id == user.id).values(role=UserRole.ANONYMOUS))
+    await db_session.commit()
+    assert UserService.cache.backend.get("email", user.email) is not None
+    response = await async_client.put("/update-profile/", json={"first_name": "Changed"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
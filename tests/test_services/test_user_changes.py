@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from app.services.response_cache import ResponseCache
+from app.services.user_cache import InMemoryUserCacheBackend, UserCache
+from app.services.user_changes import UserChangeListener
+
+pytestmark = pytest.mark.asyncio
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.02)
+
+
+# Test that a write committed by another connection drops the user from this process's caches
+async def test_committed_change_invalidates_cached_user(db_session, user):
+    cache = UserCache(InMemoryUserCacheBackend(max_size=10), ttl=60)
+    list_cache = ResponseCache(max_entries=10, ttl=60)
+    listener = UserChangeListener(cache, list_cache)
+    listener.start(db_session.bind)
+    try:
+        assert cache.suspended
+        await wait_for(lambda: listener.listening)
+        assert not cache.suspended
+        cache.store(user, cache.generation)
+        list_generation = list_cache.generation
+
+        # Plain SQL on its own connection, as another worker or a script would write.
+        async with db_session.bind.begin() as connection:
+            await connection.execute(text("UPDATE users SET first_name = 'Changed' WHERE id = :id"), {"id": user.id})
+
+        await wait_for(lambda: listener.notifications == 1)
+        assert cache.backend.get("id", str(user.id)) is None
+        assert list_cache.generation > list_generation
+    finally:
+        await listener.stop()
+    assert cache.suspended and not listener.listening
@@ -1,10 +1,12 @@
-from builtins import range
+from builtins import isinstance, hasattr, len, range
+from uuid import uuid4
 import pytest
 from unittest.mock import AsyncMock, patch
-from sqlalchemy import select
+from sqlalchemy import event, select
+from sqlalchemy.engine.default import CACHE_HIT
 from app.dependencies import get_settings
 from app.models.user_model import User, UserRole
-from app.services.user_service import UserService
+from app.services.user_service import UserService, UserView
 from app.utils.nickname_gen import generate_nickname
 
 pytestmark = pytest.mark.asyncio
@@ -196,7 +198,8 @@ async def test_create_user_with_email_failure(db_session, email_service):
         assert second_user.verification_token is not None
         
         # Check that an error was logged due to email failure
-        mock_logger.error.assert_called_with("Error sending verification email: Email service failure")
+        message, *args = mock_logger.error.call_args.args
+        assert message % tuple(args) == "Error sending verification email: Email service failure"
 
 # Tests for create method
 @pytest.mark.asyncio
@@ -277,3 +280,66 @@ async def test_update_professional_status_invalid_user_id(db_session, email_serv
     updated_user = await UserService.update_professional_status(db_session, "invalid_id", True, email_service)
     assert updated_user is None
 
+
+# Test that taken nicknames are found in a single batched query
+async def test_find_taken_nicknames(db_session, user):
+    taken = await UserService.find_taken_nicknames(db_session, [user.nickname, "free_nickname_1", "free_nickname_2"])
+    assert taken == [user.nickname]
+
+# Test creating a user without a nickname allocates one
+async def test_create_user_without_nickname(db_session, email_service):
+    user_data = {
+        "email": "no_nickname@example.com",
+        "password": "ValidPassword123!",
+        "role": UserRole.ANONYMOUS.name
+    }
+    user = await UserService.create(db_session, user_data, email_service)
+    assert user is not None
+    assert user.nickname
+
+
+async def test_hot_lookups_reuse_compiled_and_prepared_statements(db_session, user):
+    sync_engine = db_session.get_bind()
+    executions = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executions.append((statement, context.cache_hit == CACHE_HIT))
+
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        lookups = [(UserService.get_by_id, user.id), (UserService.get_by_email, user.email), (UserService.get_by_nickname, user.nickname)]
+        for _ in range(2):
+            for lookup, value in lookups:
+                # The user cache would answer a repeated lookup without a query.
+                UserService.cache.clear()
+                assert (await lookup(db_session, value)).id == user.id
+            assert await UserService.count(db_session) == 1
+            assert len(await UserService.list_users(db_session, skip=0, limit=5)) == 1
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+
+    # The second round runs the same five SQL strings, all from SQLAlchemy's compiled cache...
+    first, second = executions[:5], executions[5:]
+    assert [statement for statement, _ in first] == [statement for statement, _ in second]
+    assert all(hit for _, hit in second)
+    # ...and prepared once on this connection by asyncpg.
+    connection = await (await db_session.connection()).get_raw_connection()
+    prepared = connection.dbapi_connection._prepared_statement_cache
+    assert all(statement in prepared for statement, _ in second)
+
+
+async def test_views_are_read_without_the_orm(db_session, user, query_budget):
+    db_session.expunge_all()
+    view = await UserService.get_view_by_id(db_session, user.id)
+    assert isinstance(view, UserView) and view.email == user.email and view.role == user.role
+    assert not hasattr(view, "hashed_password")
+    assert len(db_session.identity_map) == 0
+    assert await UserService.get_view_by_id(db_session, uuid4()) is None
+
+    # A user already in the record cache is answered without a query.
+    await UserService.get_by_email(db_session, user.email)
+    with query_budget(0):
+        assert await UserService.get_view_by_email(db_session, user.email) == view
+
+    views = await UserService.list_views(db_session, skip=0, limit=5)
+    assert views == [view]
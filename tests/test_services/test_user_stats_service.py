@@ -0,0 +1,90 @@
+from builtins import len, range
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import update
+from app.models.user_model import User, UserRole
+from app.services.archival_service import ArchivalService
+from app.services.user_service import UserService
+from app.services.user_stats_service import UserStatsService, changes, user_state
+
+pytestmark = pytest.mark.asyncio
+
+
+async def in_sync(session_factory) -> bool:
+    """True if the maintained counters match a recount of the users table."""
+    return await UserStatsService.reconcile(session_factory) == {}
+
+
+async def test_reconcile_fills_counters_from_users(db_session, session_factory, verified_user, locked_user):
+    drift = await UserStatsService.reconcile(session_factory)
+    assert drift["role:AUTHENTICATED"] == (0, 2) and "total" not in drift
+    stats = await UserStatsService.get_stats(db_session, days=7)
+    assert stats["total"] == 2
+    assert stats["by_role"]["AUTHENTICATED"] == 2 and stats["by_role"]["ADMIN"] == 0
+    assert (stats["verified"], stats["unverified"], stats["locked"], stats["professional"]) == (1, 1, 1, 0)
+    assert len(stats["daily_signups"]) == 7
+    assert stats["daily_signups"][-1] == {"date": datetime.now(timezone.utc).date(), "count": 2}
+    assert await in_sync(session_factory)
+
+
+async def test_counters_follow_service_writes(db_session, session_factory, email_service, user, locked_user):
+    await UserStatsService.reconcile(session_factory)
+
+    created = await UserService.create(db_session, {"email": "stats.user@example.com", "password": "Secure*1234", "role": "ANONYMOUS"}, email_service)
+    assert created is not None
+    assert await in_sync(session_factory)
+    assert await UserService.verify_email_with_token(db_session, created.id, created.verification_token)
+    assert await UserService.update(db_session, user.id, {"role": "MANAGER"})
+    assert await UserService.update_professional_status(db_session, user.id, True, email_service)
+    assert await UserService.unlock_user_account(db_session, locked_user.id)
+    assert await in_sync(session_factory)
+
+    await UserService.batch_update(db_session, {"is_professional": True}, 10, user_ids=[created.id, locked_user.id])
+    assert await UserService.reset_password(db_session, locked_user.id, "Another*Secure1")
+    assert await UserService.delete(db_session, user.id)
+    assert await in_sync(session_factory)
+
+    stats = await UserStatsService.get_stats(db_session)
+    assert stats["total"] == 2 and stats["professional"] == 2 and stats["locked"] == 0
+
+
+async def test_login_lockout_and_archival_update_counters(db_session, session_factory, verified_user):
+    old_registration = User(nickname="stats_stale", email="stats.stale@example.com", hashed_password="x",
+                            role=UserRole.ANONYMOUS, created_at=datetime.now(timezone.utc) - timedelta(days=90))
+    db_session.add(old_registration)
+    await db_session.commit()
+    await UserStatsService.reconcile(session_factory)
+
+    for _ in range(5):
+        await UserService.login_user(db_session, verified_user.email, "Wrong*Password1")
+    assert await UserService.is_account_locked(db_session, verified_user.email)
+    await ArchivalService.archive_unverified(session_factory, older_than_days=30, pause_seconds=0)
+    assert await in_sync(session_factory)
+    stats = await UserStatsService.get_stats(db_session)
+    assert stats["total"] == 1 and stats["locked"] == 1 and stats["by_role"]["ANONYMOUS"] == 0
+
+
+async def test_reconcile_corrects_drift(db_session, session_factory, verified_user):
+    await UserStatsService.reconcile(session_factory)
+    # A change made behind the service's back leaves the counters stale until reconciled.
+    await db_session.execute(update(User).where(User.id == verified_user.id).values(is_professional=True))
+    await db_session.commit()
+    assert (await UserStatsService.get_stats(db_session))["professional"] == 0
+
+    drift = await UserStatsService.reconcile(session_factory)
+    assert drift == {"professional": (0, 1)}
+    assert (await UserStatsService.get_stats(db_session))["professional"] == 1
+
+
+async def test_reconcile_does_not_wait_for_writers(session_factory, verified_user):
+    await UserStatsService.reconcile(session_factory)
+    async with session_factory() as writer:
+        # A write in progress holds its counter rows until it commits.
+        pending = User(nickname="stats_pending", email="stats.pending@example.com", hashed_password="x", role=UserRole.ANONYMOUS)
+        writer.add(pending)
+        await writer.flush()
+        await UserStatsService.apply(writer, changes(after=[user_state(pending)]))
+        assert await asyncio.wait_for(UserStatsService.reconcile(session_factory), timeout=5) == {}
+        await writer.commit()
+    assert await in_sync(session_factory)
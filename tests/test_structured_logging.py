@@ -0,0 +1,61 @@
+import json
+import logging
+import queue
+import pytest
+from app.utils.structured_logging import (
+    REQUEST_ID_HEADER, JsonFormatter, NonBlockingQueueHandler, RateLimitFilter, request_id_var,
+)
+
+
+def make_record(msg="hello %s", args=("world",), lineno=10, **extra):
+    record = logging.LogRecord("app.test", logging.INFO, __file__, lineno, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_request_id_and_extra_fields():
+    line = JsonFormatter().format(make_record(request_id="abc123", user_count=3))
+    payload = json.loads(line)
+    assert payload["message"] == "hello world"
+    assert payload["level"] == "INFO"
+    assert payload["request_id"] == "abc123"
+    assert payload["user_count"] == 3
+
+
+def test_rate_limit_filter_suppresses_and_reports_per_call_site():
+    rate_limit = RateLimitFilter(rate=0.001, burst=2)
+    results = [rate_limit.filter(make_record()) for _ in range(5)]
+    assert results == [True, True, False, False, False]
+    # A different call site has its own budget.
+    assert rate_limit.filter(make_record(lineno=11))
+    rate_limit._buckets[("app.test", __file__, 10)][0] = 1.0
+    record = make_record()
+    assert rate_limit.filter(record)
+    assert record.suppressed == 3
+
+
+def test_sample_rate_extra_drops_records():
+    rate_limit = RateLimitFilter(rate=0, burst=0)
+    assert not rate_limit.filter(make_record(sample_rate=0.0))
+    assert rate_limit.filter(make_record(sample_rate=1.0))
+
+
+def test_queue_handler_never_blocks_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert handler.dropped == 1
+    queued = handler.queue.get_nowait()
+    # Arguments are merged before the record leaves the calling thread.
+    assert queued.msg == "hello world" and queued.args is None
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_generated_and_echoed(async_client):
+    response = await async_client.get("/healthz")
+    assert len(response.headers[REQUEST_ID_HEADER]) == 32
+    response = await async_client.get("/healthz", headers={REQUEST_ID_HEADER: "trace-42"})
+    assert response.headers[REQUEST_ID_HEADER] == "trace-42"
+    response = await async_client.get("/healthz", headers={REQUEST_ID_HEADER: "bad id\n"})
+    assert response.headers[REQUEST_ID_HEADER] != "bad id\n"
+    assert request_id_var.get() is None
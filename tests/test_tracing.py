@@ -0,0 +1,122 @@
+from urllib.parse import urlencode
+from unittest.mock import patch
+import asyncio
+import pytest
+from fastapi import BackgroundTasks, FastAPI
+from httpx import AsyncClient
+from app.main import app
+from app.utils.tracing import RingBufferExporter, Trace, Tracer, TracingMiddleware, _current_trace, current_trace, span, traced, untraced
+
+
+def run_traced(func):
+    trace = Trace("trace-1", "GET /test")
+    token = _current_trace.set(trace)
+    try:
+        func()
+    finally:
+        _current_trace.reset(token)
+    return trace
+
+
+def test_spans_nest_under_the_current_span():
+    @traced("inner")
+    def inner():
+        pass
+
+    def work():
+        with span("outer", stage="db"):
+            inner()
+
+    trace = run_traced(work)
+    outer, inner_span = trace.spans
+    assert outer.name == "outer" and outer.parent_id is None
+    assert inner_span.parent_id == outer.span_id
+    assert outer.attributes == {"stage": "db"}
+    assert outer.end >= inner_span.end
+
+
+def test_span_is_a_noop_outside_a_trace():
+    with span("untraced") as recorded:
+        assert recorded is None
+
+
+def test_tail_sampling_keeps_slow_and_failed_requests():
+    buffer = RingBufferExporter(size=2)
+    tracer = Tracer(enabled=True, slow_ms=1000, sample_rate=0, exporters=[buffer])
+    fast, failed = Trace("fast", "GET /fast"), Trace("failed", "GET /failed")
+    failed.status_code = 500
+    tracer.finish(fast)
+    tracer.finish(failed)
+    assert [trace["trace_id"] for trace in buffer.query()] == ["failed"]
+    slow = Trace("slow", "GET /slow")
+    slow.start -= 2
+    tracer.finish(slow)
+    assert tracer.recorded == 3 and tracer.kept == 2
+    assert buffer.query(min_duration_ms=1000)[0]["trace_id"] == "slow"
+
+
+@pytest.mark.asyncio
+async def test_login_trace_is_queryable_by_admin(async_client, verified_user, admin_token):
+    tracer = app.state.tracer
+    tracer.buffer.clear()
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    with patch.object(tracer, "slow_ms", 0):
+        response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 200
+    request_id = response.headers["X-Request-ID"]
+
+    response = await async_client.get("/admin/traces", params={"name": "login"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["traces"][0]["trace_id"] == request_id
+
+    response = await async_client.get(f"/admin/traces/{request_id}", headers={"Authorization": f"Bearer {admin_token}"})
+    trace = response.json()
+    assert trace["name"] == "POST /login/"
+    names = {span["name"] for span in trace["spans"]}
+    assert {"route POST /login/", "dependencies", "endpoint login", "serialize", "UserService.login_user", "security.verify_password", "db.execute"} <= names
+
+
+@pytest.mark.asyncio
+async def test_traces_require_admin(async_client, user_token):
+    response = await async_client.get("/admin/traces", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_work_started_by_a_request_stays_out_of_its_trace():
+    buffer = RingBufferExporter(size=10)
+    tracer = Tracer(enabled=True, slow_ms=0, sample_rate=1, exporters=[buffer])
+    background_done, task_done = asyncio.Event(), asyncio.Event()
+    seen = {}
+
+    async def later():
+        await asyncio.sleep(0.05)
+        with span("background") as recorded:
+            seen["background"] = recorded
+        background_done.set()
+
+    async def in_task():
+        await asyncio.sleep(0)
+        seen["task_trace"] = current_trace()
+        with span("task"):
+            await asyncio.sleep(0.05)
+        task_done.set()
+
+    test_app = FastAPI()
+
+    @test_app.get("/work")
+    async def work(background_tasks: BackgroundTasks):
+        background_tasks.add_task(later)
+        asyncio.create_task(untraced(in_task()))
+        with span("endpoint"):
+            return {"ok": True}
+
+    test_app.add_middleware(TracingMiddleware, tracer=tracer)
+    async with AsyncClient(app=test_app, base_url="http://test") as client:
+        assert (await client.get("/work")).status_code == 200
+    await asyncio.wait_for(asyncio.gather(background_done.wait(), task_done.wait()), 1)
+
+    trace, = buffer.query()
+    assert [span["name"] for span in trace["spans"]] == ["endpoint"]
+    assert trace["duration_ms"] < 50
+    assert seen == {"background": None, "task_trace": None}
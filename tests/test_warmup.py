@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from app.main import create_app
+from app.utils import template_manager
+from app.warmup import warm_up
+from tests.conftest import engine
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_warm_up_runs_every_stage(setup_database):
+    app = create_app()
+    template_manager._template_cache.clear()
+    timings = await warm_up(app, engine, connections=2, timeout=10)
+    assert set(timings) == {"database", "templates", "openapi"}
+    assert app.openapi_schema is not None
+    assert any(path.name == "email_verification.md" for path in template_manager._template_cache)
+    assert engine.pool.checkedin() >= 2
+
+
+async def test_warm_up_survives_database_failure():
+    app = FastAPI()
+
+    class BrokenEngine:
+        def connect(self):
+            raise ConnectionRefusedError("database unavailable")
+
+    timings = await warm_up(app, BrokenEngine(), connections=1, timeout=1)
+    assert app.openapi_schema is not None
+    assert "database" in timings
+
+
+async def test_warm_up_timeout_closes_the_connections_it_opened(setup_database):
+    class HangingEngine:
+        """Opens the first connection, then hangs on the second."""
+
+        def __init__(self):
+            self.opened = []
+
+        async def connect(self):
+            if self.opened:
+                await asyncio.Event().wait()
+            self.opened.append(await engine.connect())
+            return self.opened[-1]
+
+    hanging = HangingEngine()
+    timings = await warm_up(FastAPI(), hanging, connections=2, timeout=0.5)
+    assert timings["database"] >= 500
+    assert len(hanging.opened) == 1 and hanging.opened[0].closed